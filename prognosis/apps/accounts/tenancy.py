@@ -0,0 +1,58 @@
+"""
+Тенант запроса: компании пользователя и активная компания.
+
+Роли пользователя читаются одним запросом при первом обращении
+и кешируются на время запроса. Представления фильтруют данные
+по company_id из контекста, без соединения с UserCompanyRole
+в каждом запросе.
+"""
+from collections import namedtuple
+
+from rest_framework.exceptions import PermissionDenied
+
+from .models import UserCompanyRole
+
+
+# Активная компания задаётся заголовком (slug или id компании)
+TENANT_HEADER = "X-Company"
+
+# company_ids — компании, данные которых видит запрос: все компании
+# пользователя или одна, выбранная заголовком. company и role —
+# активная компания (для записи) и роль в ней; None без привязки
+Tenant = namedtuple("Tenant", ["company_ids", "company", "role"])
+
+NO_TENANT = Tenant((), None, None)
+
+
+def get_tenant(request):
+	"""Тенант запроса (DRF Request или HttpRequest), один раз на запрос."""
+	http_request = getattr(request, "_request", request)
+	tenant = getattr(http_request, "tenant", None)
+	if tenant is None:
+		tenant = http_request.tenant = resolve_tenant(request)
+	return tenant
+
+
+def resolve_tenant(request):
+	user = request.user
+	if not user.is_authenticated:
+		return NO_TENANT
+	roles = list(
+		UserCompanyRole.objects.filter(user=user)
+		.select_related("company").order_by("pk"))
+
+	selected = request.headers.get(TENANT_HEADER, "").strip()
+	if selected:
+		role = next(
+			(r for r in roles
+				if selected in (r.company.slug, str(r.company_id))),
+			None)
+		if role is None:
+			raise PermissionDenied("Нет доступа к компании")
+		return Tenant((role.company_id,), role.company, role.role)
+
+	if not roles:
+		return NO_TENANT
+	# Без заголовка активна первая компания пользователя
+	return Tenant(
+		tuple(r.company_id for r in roles), roles[0].company, roles[0].role)
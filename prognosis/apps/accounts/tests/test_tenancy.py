@@ -0,0 +1,49 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory
+from rest_framework.exceptions import PermissionDenied
+
+from accounts.models import Company
+from accounts.tenancy import NO_TENANT, get_tenant
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestTenant:
+    def setup_method(self):
+        self.user = User.objects.create_user(email='tenant@example.com', password='p')
+        self.company1 = Company.objects.create(name='Co1')
+        self.company2 = Company.objects.create(name='Co2')
+        self.company1.user_roles.create(user=self.user, role='admin')
+        self.company2.user_roles.create(user=self.user, role='viewer')
+
+    def request(self, **headers):
+        request = RequestFactory().get('/', headers=headers)
+        request.user = self.user
+        return request
+
+    def test_resolved_once_per_request(self, django_assert_num_queries):
+        request = self.request()
+        with django_assert_num_queries(1):
+            tenant = get_tenant(request)
+            assert get_tenant(request) is tenant
+        assert tenant.company_ids == (self.company1.id, self.company2.id)
+        assert (tenant.company, tenant.role) == (self.company1, 'admin')
+
+    def test_header_selects_company(self):
+        tenant = get_tenant(self.request(**{'X-Company': self.company2.slug}))
+        assert tenant.company_ids == (self.company2.id,)
+        assert (tenant.company, tenant.role) == (self.company2, 'viewer')
+
+        tenant = get_tenant(self.request(**{'X-Company': str(self.company1.id)}))
+        assert tenant.company == self.company1
+
+    def test_header_with_foreign_company_is_denied(self):
+        other = Company.objects.create(name='Other')
+        with pytest.raises(PermissionDenied):
+            get_tenant(self.request(**{'X-Company': other.slug}))
+
+    def test_user_without_roles(self):
+        self.user.company_roles.all().delete()
+        assert get_tenant(self.request()) == NO_TENANT
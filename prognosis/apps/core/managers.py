@@ -1,4 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import OuterRef, Subquery
+
+
+# Поля периода, из которых БД вычисляет TimePeriod.period_key
+PERIOD_KEY_FIELDS = {"year", "quarter", "month"}
 
 
 class ActiveScenarioManager(models.Manager):
@@ -9,3 +14,38 @@ class ActiveScenarioManager(models.Manager):
 class OpenPeriodManager(models.Manager):
 	def get_queryset(self):
 		return super().get_queryset().filter(is_closed=False)
+
+
+class TimePeriodQuerySet(models.QuerySet):
+	"""
+	update() и bulk_update() полей периода копируют новый period_key
+	в строки FinancialLine, как TimePeriod.save(). Правка периодов
+	сырым SQL ключ строк не обновляет.
+	"""
+
+	def update(self, **kwargs):
+		if not PERIOD_KEY_FIELDS.intersection(kwargs):
+			return super().update(**kwargs)
+		with transaction.atomic(using=self.db):
+			# id до обновления: после него фильтр может не совпасть
+			period_ids = list(self.values_list("pk", flat=True))
+			updated = super().update(**kwargs)
+			sync_period_keys(self.model, period_ids)
+		return updated
+
+	def bulk_update(self, objs, fields, batch_size=None):
+		if not PERIOD_KEY_FIELDS.intersection(fields):
+			return super().bulk_update(objs, fields, batch_size=batch_size)
+		with transaction.atomic(using=self.db):
+			updated = super().bulk_update(objs, fields, batch_size=batch_size)
+			sync_period_keys(self.model, [obj.pk for obj in objs])
+		return updated
+
+
+def sync_period_keys(model, period_ids):
+	"""Ключ периода — в строки этих периодов, где он устарел."""
+	FinancialLine = model.financial_lines.rel.related_model
+	FinancialLine.objects.filter(period_id__in=period_ids).update(
+		period_key=Subquery(
+			model.objects.filter(pk=OuterRef("period_id"))
+			.values("period_key")[:1]))
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:02
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_scenario_core_scenar_company_1b4ad5_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeperiod',
+            name='period_key',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('year'), '*', models.Value(100)), '+', django.db.models.functions.comparison.Coalesce(models.F('month'), django.db.models.expressions.CombinedExpression(models.F('quarter'), '+', models.Value(12)), models.Value(0))), output_field=models.PositiveIntegerField(verbose_name='Ключ периода')),
+        ),
+    ]
@@ -1,9 +1,13 @@
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
 from django.forms import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.text import slugify
 
+from .managers import PERIOD_KEY_FIELDS, TimePeriodQuerySet
+
 
 class TimeStampedModel(models.Model):
 	"""
@@ -36,6 +40,15 @@ class CompanyRelatedModel(TimeStampedModel):
 		]
 
 
+def period_key(year, quarter=None, month=None):
+	"""Значение TimePeriod.period_key для периода — для фильтров по ключу."""
+	if month:
+		return year * 100 + month
+	if quarter:
+		return year * 100 + 12 + quarter
+	return year * 100
+
+
 class TimePeriod(CompanyRelatedModel):
 	"""
 	Период времени: год, квартал, месяц.
@@ -57,12 +70,22 @@ class TimePeriod(CompanyRelatedModel):
 		blank=True,
 		validators=[MinValueValidator(1), MaxValueValidator(12)]
 	)
+	# Сортируемый ключ: YYYYMM для месяца, YYYY13–YYYY16 для квартала,
+	# YYYY00 для года; копируется в FinancialLine.period_key
+	period_key = models.GeneratedField(
+		expression=F("year") * 100 + Coalesce(
+			F("month"), F("quarter") + 12, Value(0)),
+		output_field=models.PositiveIntegerField(_("Ключ периода")),
+		db_persist=True,
+	)
 	is_closed = models.BooleanField(
 		_("Период закрыт"),
 		default=False,
 		help_text=_("Запрет на редактирование данных после закрытия периода")
 	)
 
+	objects = TimePeriodQuerySet.as_manager()
+
 	class Meta:
 		verbose_name = _("Период")
 		verbose_name_plural = _("Периоды")
@@ -89,8 +112,19 @@ class TimePeriod(CompanyRelatedModel):
 	def save(self, *args, **kwargs):
 		if self.month is not None and self.quarter is None:
 			self.quarter = (self.month - 1) // 3 + 1
+		creating = self._state.adding
 		super().save(*args, **kwargs)
 
+		update_fields = kwargs.get("update_fields")
+		key_fields = update_fields or PERIOD_KEY_FIELDS
+		if creating or not PERIOD_KEY_FIELDS.intersection(key_fields):
+			return
+		# Ключ вычисляет БД; строки периода получают новый ключ
+		self.refresh_from_db(fields=["period_key"])
+		self.financial_lines.exclude(
+			period_key=self.period_key
+		).update(period_key=self.period_key)
+
 
 class Scenario(CompanyRelatedModel):
 	"""
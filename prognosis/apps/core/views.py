@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from accounts.tenancy import get_tenant
 from .models import TimePeriod, Scenario
 from .serializers import TimePeriodSerializer, ScenarioSerializer
 
@@ -15,7 +16,7 @@ class TimePeriodListView(APIView):
 
 	def get(self, request):
 		periods = TimePeriod.objects.filter(
-			company__user_roles__user=request.user).distinct()
+			company_id__in=get_tenant(request).company_ids)
 		serializer = TimePeriodSerializer(periods, many=True)
 		return Response(serializer.data)
 
@@ -29,7 +30,7 @@ class ScenarioListCreateView(APIView):
 
 	def get(self, request):
 		scenarios = Scenario.objects.filter(
-			company__user_roles__user=request.user).distinct()
+			company_id__in=get_tenant(request).company_ids)
 		# Опционально: фильтр по ?active=true
 		if request.query_params.get('active') == 'true':
 			scenarios = scenarios.filter(is_active=True)
@@ -53,20 +54,20 @@ class ScenarioDetailView(APIView):
 	"""
 	permission_classes = [IsAuthenticated]
 
-	def get_object(self, pk, user):
+	def get_object(self, pk):
 		return get_object_or_404(
 			Scenario,
 			slug=pk,
-			company__user_roles__user=user
+			company_id__in=get_tenant(self.request).company_ids
 		)
 
 	def get(self, request, slug):
-		scenario = self.get_object(slug, request.user)
+		scenario = self.get_object(slug)
 		serializer = ScenarioSerializer(scenario)
 		return Response(serializer.data)
 
 	def put(self, request, slug):
-		scenario = self.get_object(slug, request.user)
+		scenario = self.get_object(slug)
 		serializer = ScenarioSerializer(scenario, data=request.data)
 		if serializer.is_valid():
 			serializer.save()
@@ -74,7 +75,7 @@ class ScenarioDetailView(APIView):
 		return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 	def patch(self, request, slug):
-		scenario = self.get_object(slug, request.user)
+		scenario = self.get_object(slug)
 		serializer = ScenarioSerializer(scenario, data=request.data, partial=True)
 		if serializer.is_valid():
 			serializer.save()
@@ -82,6 +83,6 @@ class ScenarioDetailView(APIView):
 		return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 	def delete(self, request, slug):
-		scenario = self.get_object(slug, request.user)
+		scenario = self.get_object(slug)
 		scenario.delete()
 		return Response(status=status.HTTP_204_NO_CONTENT)
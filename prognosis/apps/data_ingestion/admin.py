@@ -1,7 +1,9 @@
 from django.contrib import admin
 from unfold.admin import ModelAdmin
 
+from .cancellation import cancel_import
 from .models import ImportTask
+from .readers import file_type_for
 from accounts.models import Company
 
 
@@ -27,6 +29,8 @@ class ImportTaskAdmin(ModelAdmin):
         "company",
         "status",
         "file_type",
+        "backend",
+        "mode",
         "scenario",
     )
 
@@ -39,14 +43,24 @@ class ImportTaskAdmin(ModelAdmin):
 
     ordering = ("-created_at",)
 
+    actions = ("cancel_imports",)
+
     readonly_fields = (
         "slug",
         "status",
+        "cancel_requested",
+        "content_hash",
+        "parent",
         "created_by",
         "rows_total",
         "rows_processed",
         "rows_success",
         "rows_failed",
+        "rows_inserted",
+        "rows_updated",
+        "rows_unchanged",
+        "rows_deleted",
+        "peak_memory_mb",
         "started_at",
         "finished_at",
     )
@@ -60,7 +74,13 @@ class ImportTaskAdmin(ModelAdmin):
                     "slug",
                     "file",
                     "file_type",
+                    "content_hash",
+                    "parent",
+                    "sheet",
+                    "backend",
+                    "mode",
                     "status",
+                    "cancel_requested",
                     "scenario",
                     "created_by",
                 )
@@ -74,6 +94,11 @@ class ImportTaskAdmin(ModelAdmin):
                     "rows_processed",
                     "rows_success",
                     "rows_failed",
+                    "rows_inserted",
+                    "rows_updated",
+                    "rows_unchanged",
+                    "rows_deleted",
+                    "peak_memory_mb",
                     "started_at",
                     "finished_at",
                 ),
@@ -91,6 +116,16 @@ class ImportTaskAdmin(ModelAdmin):
         ),
     )
 
+    @admin.action(description="Отменить импорт")
+    def cancel_imports(self, request, queryset):
+        # Файлы архива отменяются вместе с архивом
+        task_ids = queryset.filter(parent__isnull=True).values_list(
+            "id", flat=True)
+        cancelled = [
+            task_id for task_id in task_ids if cancel_import(task_id)]
+        self.message_user(
+            request, f"Отмена запрошена для задач: {len(cancelled)}")
+
     def save_model(self, request, obj, form, change):
         if not change:
             # Автоматически проставляем компанию и автора
@@ -104,8 +139,7 @@ class ImportTaskAdmin(ModelAdmin):
 
         # Автоматически определяем тип файла
         if obj.file and obj.file.name:
-            ext = obj.file.name.lower().split(".")[-1]
-            obj.file_type = "excel" if ext in ("xlsx", "xls") else "csv"
+            obj.file_type = file_type_for(obj.file.name)
 
         super().save_model(request, obj, form, change)
 
@@ -0,0 +1,79 @@
+"""
+Пакетный импорт из ZIP-архива.
+
+Архив — задача-родитель, каждый файл архива — дочерняя ImportTask
+со своими счётчиками, ошибками строк и прогрессом. Файлы импортируются
+по очереди в одной задаче Celery (см. tasks._run_archive) с общими
+DimensionResolver и PeriodResolver: справочники и карта периодов
+загружаются один раз на весь архив.
+"""
+import zipfile
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+
+from .models import ImportTask
+from .readers import (
+	ARCHIVE_FILE_TYPE, FILE_TYPES, estimate_rows, file_sha256
+)
+
+
+def archive_members(archive):
+	"""Файлы архива, которые можно импортировать, в порядке имён."""
+	members = sorted(
+		(info for info in archive.infolist() if _importable(info)),
+		key=lambda info: info.filename)
+	if not members:
+		raise ValueError("В архиве нет файлов CSV, Excel, Parquet или Arrow")
+	if len(members) > settings.IMPORT_ARCHIVE_MAX_FILES:
+		raise ValueError(
+			f"В архиве больше {settings.IMPORT_ARCHIVE_MAX_FILES} файлов")
+	size_mb = sum(info.file_size for info in members) / (1024 * 1024)
+	if size_mb > settings.IMPORT_ARCHIVE_MAX_SIZE_MB:
+		raise ValueError(
+			"Архив после распаковки больше "
+			f"{settings.IMPORT_ARCHIVE_MAX_SIZE_MB} МБ")
+	return members
+
+
+def _importable(info):
+	path = PurePosixPath(info.filename)
+	# Служебные файлы архиваторов macOS и скрытые файлы пропускаем
+	if info.is_dir() or path.name.startswith(".") or "__MACOSX" in path.parts:
+		return False
+	file_type = FILE_TYPES.get(path.suffix.lower())
+	return file_type is not None and file_type != ARCHIVE_FILE_TYPE
+
+
+def extract_archive(task):
+	"""
+	Создаёт дочерние задачи для файлов архива и возвращает их.
+	Повтор после сбоя возвращает уже созданные задачи.
+	"""
+	children = list(task.children.order_by("id"))
+	if children:
+		return children
+
+	with zipfile.ZipFile(task.file.path) as archive, transaction.atomic():
+		for info in archive_members(archive):
+			name = PurePosixPath(info.filename).name
+			with archive.open(info) as source:
+				member = File(source, name=name)
+				child = ImportTask(
+					company=task.company,
+					scenario=task.scenario,
+					created_by=task.created_by,
+					parent=task,
+					file_type=FILE_TYPES[PurePosixPath(name).suffix.lower()],
+					sheet=task.sheet,
+					backend=task.backend,
+					mode=task.mode,
+					content_hash=file_sha256(member),
+				)
+				child.file.save(name, member, save=False)
+			child.rows_total = estimate_rows(child)
+			child.save()
+			children.append(child)
+	return children
@@ -0,0 +1,244 @@
+"""
+Бэкенды записи импорта.
+
+orm — ImportEngine с FinancialLineWriter (bulk_create чанками).
+
+copy — строки потоком COPY FROM STDIN уходят в UNLOGGED-таблицу,
+коды измерений разрешаются JOIN'ами в SQL, слияние в FinancialLine —
+одним INSERT ... ON CONFLICT. Только PostgreSQL; на других СУБД
+используется orm.
+"""
+import io
+
+from django.db import connection
+from django.utils import timezone
+
+from core.models import TimePeriod
+from financials.models import FinancialLine
+from .engine import DIMENSION_COLUMNS, ImportEngine
+
+
+STAGE_TABLE = "data_ingestion_copy_stage_{task_id}"
+
+
+def copy_enabled(task):
+	"""
+	Импорт задачи идёт через COPY. COPY умеет только режим upsert:
+	delta и replace сравнивают суммы построчно через ORM.
+	"""
+	return (
+		task.backend == "copy"
+		and task.mode == "upsert"
+		and connection.vendor == "postgresql"
+	)
+
+
+def make_engine(task, **kwargs):
+	"""Движок импорта для бэкенда, выбранного в задаче."""
+	if copy_enabled(task):
+		return CopyImportEngine(task, **kwargs)
+	return ImportEngine(task, **kwargs)
+
+
+class CopyImportEngine(ImportEngine):
+	"""
+	Импорт через COPY. Проверка и разбор строк — как в ImportEngine,
+	справочники разрешаются в SQL на шаге finish().
+	"""
+
+	def __init__(self, task, **kwargs):
+		super().__init__(task, **kwargs)
+		self.stage = STAGE_TABLE.format(task_id=task.id)
+		self.writer = CopyStageWriter(self.stage)
+
+	def _resolve(self, frame):
+		# Периодов немного — их id известны заранее и уходят в COPY
+		if not frame.empty:
+			frame["period_id"] = self.periods.resolve(frame["period"])
+		return frame
+
+	def finish(self):
+		if not self.writer.created:
+			return  # ни одной корректной строки
+		try:
+			self._report_unknown_codes()
+			with connection.cursor() as cursor:
+				# Строки с неизвестными кодами в слияние не попадают
+				cursor.execute(
+					f"DELETE FROM {self.stage} s WHERE "
+					+ " OR ".join(
+						self._unknown_sql(field, model)
+						for field, model in DIMENSION_COLUMNS.values()),
+					{"company": self.company.id})
+				self.rows_failed += cursor.rowcount
+				self.success -= cursor.rowcount
+
+				cursor.execute(self._merge_sql(), self._merge_params())
+				updated, inserted, conflicts = cursor.fetchone()
+			self.writer.inserted = inserted
+			self.writer.updated = updated + conflicts
+		finally:
+			self.writer.drop()
+
+	def _unknown_sql(self, field, model):
+		return (
+			f"(s.{field} <> '' AND NOT EXISTS ("
+			f"SELECT 1 FROM {model._meta.db_table} d "
+			f"WHERE d.company_id = %(company)s AND d.code = s.{field}))")
+
+	def _report_unknown_codes(self):
+		"""
+		Неизвестные коды — по запросу на колонку. Серверный курсор
+		отдаёт строки пачками, память не зависит от числа ошибок.
+		"""
+		for column, (field, model) in DIMENSION_COLUMNS.items():
+			with connection.chunked_cursor() as cursor:
+				cursor.execute(
+					f"SELECT s.row_number, s.{field} FROM {self.stage} s "
+					f"WHERE {self._unknown_sql(field, model)}",
+					{"company": self.company.id})
+				while rows := cursor.fetchmany(self.chunk_size):
+					self._record_unknown(column, dict(rows))
+					self.flush_errors()
+
+	def _merge_sql(self):
+		fields = [field for field, _ in DIMENSION_COLUMNS.values()]
+		key = ["period_id"] + [f"{field}_id" for field in fields]
+
+		joins = []
+		for field, model in DIMENSION_COLUMNS.values():
+			kind = "JOIN" if field == "article" else "LEFT JOIN"
+			joins.append(
+				f"{kind} {model._meta.db_table} {field} "
+				f"ON {field}.company_id = %(company)s "
+				f"AND {field}.code = s.{field}")
+		# Ключ периода копируется в строку (FinancialLine.period_key)
+		joins.append(
+			f"JOIN {TimePeriod._meta.db_table} tp ON tp.id = s.period_id")
+		src_columns = ", ".join(
+			["s.period_id", "tp.period_key"]
+			+ [f"{field}.id AS {field}_id" for field in fields])
+		distinct = ", ".join(
+			["s.period_id"] + [f"{field}.id" for field in fields])
+		# period и article обязательны — для них обычное равенство,
+		# чтобы работал индекс (company, scenario, period)
+		same_key = " AND ".join(
+			f"{{t}}.{column} = src.{column}" if column in key[:2]
+			else f"{{t}}.{column} IS NOT DISTINCT FROM src.{column}"
+			for column in key)
+		# Выражения индекса unique_financial_line_key
+		conflict_target = ", ".join(
+			["company_id", "scenario_id"]
+			+ [
+				column if column in key[:2] else f"COALESCE({column}, 0)"
+				for column in key])
+		table = FinancialLine._meta.db_table
+
+		# Существующие строки обновляются по IS NOT DISTINCT FROM,
+		# ON CONFLICT страхует вставку от параллельного импорта
+		return f"""
+			WITH src AS (
+				SELECT DISTINCT ON ({distinct})
+					{src_columns}, s.cents
+				FROM {self.stage} s
+				{" ".join(joins)}
+				ORDER BY {distinct}, s.row_number DESC
+			),
+			updated AS (
+				UPDATE {table} f
+				SET amount = src.cents::numeric / 100, updated_at = %(now)s
+				FROM src
+				WHERE f.company_id = %(company)s
+					AND f.scenario_id = %(scenario)s
+					AND {same_key.format(t="f")}
+				RETURNING {", ".join(f"f.{column}" for column in key)}
+			),
+			inserted AS (
+				INSERT INTO {table} (
+					company_id, scenario_id, {", ".join(key)}, period_key,
+					amount, comment, source, created_at, updated_at
+				)
+				SELECT
+					%(company)s, %(scenario)s,
+					{", ".join(f"src.{column}" for column in key)},
+					src.period_key,
+					src.cents::numeric / 100, '', '', %(now)s, %(now)s
+				FROM src
+				WHERE NOT EXISTS (
+					SELECT 1 FROM updated u WHERE {same_key.format(t="u")}
+				)
+				ON CONFLICT ({conflict_target})
+				DO UPDATE SET amount = EXCLUDED.amount, updated_at = EXCLUDED.updated_at
+				RETURNING (xmax = 0) AS created
+			)
+			SELECT
+				(SELECT count(*) FROM updated),
+				count(*) FILTER (WHERE created),
+				count(*) FILTER (WHERE NOT created)
+			FROM inserted
+		"""
+
+	def _merge_params(self):
+		return {
+			"company": self.company.id,
+			"scenario": self.scenario.id,
+			"now": timezone.now(),
+		}
+
+
+class CopyStageWriter:
+	"""Writer для CopyImportEngine: чанк уходит в таблицу одним COPY."""
+
+	COLUMNS = (
+		["row_number", "period_id", "cents"]
+		+ [field for field, _ in DIMENSION_COLUMNS.values()]
+	)
+
+	def __init__(self, table):
+		self.table = table
+		self.created = False
+		# Счётчики как у FinancialLineWriter; заполняются при слиянии
+		self.inserted = 0
+		self.updated = 0
+		self.unchanged = 0
+		self.deleted = 0
+
+	def create(self):
+		codes = ", ".join(
+			f"{field} text NOT NULL" for field, _ in DIMENSION_COLUMNS.values())
+		with connection.cursor() as cursor:
+			cursor.execute(
+				f"CREATE UNLOGGED TABLE IF NOT EXISTS {self.table} ("
+				f"row_number bigint NOT NULL, period_id bigint NOT NULL, "
+				f"cents bigint NOT NULL, {codes})")
+		self.created = True
+
+	def drop(self):
+		with connection.cursor() as cursor:
+			cursor.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+	def write(self, frame):
+		if not self.created:
+			self.create()
+		data = frame[list(DIMENSION_COLUMNS)].copy()
+		data.columns = [field for field, _ in DIMENSION_COLUMNS.values()]
+		data.insert(0, "cents", frame["cents"])
+		data.insert(0, "period_id", frame["period_id"])
+
+		buffer = io.StringIO()
+		data.to_csv(buffer, header=False, index=True)
+		buffer.seek(0)
+
+		# Пустой код в CSV — пустое поле, которое COPY читает как NULL;
+		# FORCE_NOT_NULL оставляет его пустой строкой («кода нет»)
+		codes = ", ".join(field for field, _ in DIMENSION_COLUMNS.values())
+		sql = (
+			f"COPY {self.table} ({', '.join(self.COLUMNS)}) "
+			f"FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({codes}))")
+		with connection.cursor() as cursor:
+			raw = cursor.cursor
+			if hasattr(raw, "copy_expert"):  # psycopg2
+				raw.copy_expert(sql, buffer)
+			else:  # psycopg 3
+				with raw.copy(sql) as copy:
+					copy.write(buffer.getvalue())
@@ -0,0 +1,187 @@
+"""
+Замер скорости импорта на синтетических файлах.
+
+generate_file() пишет CSV/XLSX с заданным числом строк и мощностью
+справочников, run_benchmark() прогоняет process_import_task на локальной
+БД и возвращает rows/sec, число SQL-запросов и пиковую память.
+Каждый прогон идёт в транзакции, которая откатывается, — данные
+замера в БД не остаются. Запуск: manage.py benchmark_import.
+"""
+import csv
+import json
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import openpyxl
+from django.core.files import File
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from accounts.models import Company
+from core.models import Scenario
+from dimensions.models import BudgetArticle, CostCenter, Department
+from .engine import COLUMN_AMOUNT, COLUMN_ARTICLE, COLUMN_PERIOD
+from .models import ImportTask
+from .tasks import process_import_task
+
+
+COLUMNS = [
+	COLUMN_ARTICLE, "ЦФО", "Подразделение", COLUMN_PERIOD, COLUMN_AMOUNT]
+FILE_SUFFIXES = {"csv": ".csv", "excel": ".xlsx"}
+
+
+# Один прогон: формат и объём файла, мощность справочников, режим;
+# error_rate — доля строк с некорректной суммой
+BENCHMARK_DEFAULTS = {
+	"file_type": "csv",
+	"rows": 10000,
+	"articles": 300,
+	"cost_centers": 50,
+	"departments": 20,
+	"periods": 24,
+	"error_rate": 0.01,
+	"backend": "orm",
+	"mode": "upsert",
+	"chunk_size": 2000,
+	"seed": 0,
+}
+BenchmarkConfig = namedtuple(
+	"BenchmarkConfig",
+	list(BENCHMARK_DEFAULTS),
+	defaults=list(BENCHMARK_DEFAULTS.values()))
+
+
+def generate_rows(config):
+	"""Строки файла: коды A*/CC*/D*, месяцы с января 2024, суммы с копейками."""
+	rng = random.Random(config.seed)
+	for _ in range(config.rows):
+		month = rng.randrange(config.periods)
+		amount = f"{rng.uniform(-1e6, 1e6):.2f}"
+		if rng.random() < config.error_rate:
+			amount = "n/a"
+		yield [
+			f"A{rng.randrange(config.articles)}",
+			f"CC{rng.randrange(config.cost_centers)}",
+			f"D{rng.randrange(config.departments)}",
+			f"{2024 + month // 12}-{month % 12 + 1:02d}",
+			amount,
+		]
+
+
+def generate_file(path, config):
+	"""Пишет синтетический файл импорта в path."""
+	if config.file_type == "excel":
+		workbook = openpyxl.Workbook(write_only=True)
+		sheet = workbook.create_sheet()
+		sheet.append(COLUMNS)
+		for row in generate_rows(config):
+			sheet.append(row)
+		workbook.save(path)
+		return
+	with open(path, "w", newline="", encoding="utf-8") as f:
+		writer = csv.writer(f)
+		writer.writerow(COLUMNS)
+		writer.writerows(generate_rows(config))
+
+
+def create_fixtures(config):
+	"""Компания, сценарий и справочники под коды generate_rows()."""
+	company = Company.objects.create(name="Benchmark")
+	scenario = Scenario.objects.create(
+		company=company, name="Benchmark", type="budget")
+	for n in range(config.articles):
+		BudgetArticle.add_root(company=company, code=f"A{n}", name=f"A{n}")
+	for n in range(config.departments):
+		Department.add_root(company=company, code=f"D{n}", name=f"D{n}")
+	CostCenter.objects.bulk_create(
+		CostCenter(company=company, code=f"CC{n}", name=f"CC{n}", slug=f"cc{n}")
+		for n in range(config.cost_centers))
+	return company, scenario
+
+
+def run_benchmark(config):
+	"""Прогон одной конфигурации; возвращает словарь с результатами."""
+	with tempfile.TemporaryDirectory() as tmp:
+		path = Path(tmp) / f"benchmark{FILE_SUFFIXES[config.file_type]}"
+		generate_file(path, config)
+		file_size = path.stat().st_size
+
+		with transaction.atomic():
+			company, scenario = create_fixtures(config)
+			task = ImportTask(
+				company=company,
+				scenario=scenario,
+				file_type=config.file_type,
+				backend=config.backend,
+				mode=config.mode,
+			)
+			with open(path, "rb") as f:
+				task.file.save(path.name, File(f), save=False)
+			task.save()
+
+			counter = QueryCounter()
+			# Шарды требуют воркеров Celery — меряем один процесс
+			with override_settings(
+				IMPORT_CHUNK_SIZE=config.chunk_size, IMPORT_SHARD_COUNT=1
+			), connection.execute_wrapper(counter):
+				started = time.perf_counter()
+				process_import_task(task.id)
+				seconds = time.perf_counter() - started
+
+			task.refresh_from_db()
+			task.file.delete(save=False)
+			transaction.set_rollback(True)
+
+	return {
+		**config._asdict(),
+		"file_size_mb": round(file_size / (1024 * 1024), 2),
+		"status": task.status,
+		"rows_success": task.rows_success,
+		"rows_failed": task.rows_failed,
+		"seconds": round(seconds, 3),
+		"rows_per_sec": round(config.rows / seconds) if seconds else None,
+		"queries": counter.count,
+		"peak_memory_mb": task.peak_memory_mb,
+	}
+
+
+class QueryCounter:
+	"""execute_wrapper: считает запросы, не сохраняя их текст."""
+
+	def __init__(self):
+		self.count = 0
+
+	def __call__(self, execute, sql, params, many, context):
+		self.count += 1
+		return execute(sql, params, many, context)
+
+
+def run_benchmarks(configs):
+	"""Прогоны конфигураций с описанием окружения — для сравнения коммитов."""
+	return {
+		"commit": _git_commit(),
+		"created_at": timezone.now().isoformat(),
+		"database": connection.vendor,
+		"python": platform.python_version(),
+		"results": [run_benchmark(config) for config in configs],
+	}
+
+
+def report_json(report):
+	return json.dumps(report, ensure_ascii=False, indent=2)
+
+
+def _git_commit():
+	try:
+		return subprocess.run(
+			["git", "rev-parse", "--short", "HEAD"],
+			capture_output=True, text=True, check=True,
+		).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
@@ -0,0 +1,50 @@
+"""
+Отмена импорта.
+
+Задача в очереди отменяется сразу. Идущий импорт отменяется
+кооперативно: cancel_import() ставит флаг cancel_requested, воркер
+проверяет его перед каждым чанком (check_cancelled) и прерывает
+загрузку — промежуточные строки удаляются, FinancialLine до слияния
+не менялась, а COPY-импорт откатывается вместе со своей транзакцией.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ImportTask
+from .progress import FINISHED_STATUSES, ProgressReporter
+
+
+class ImportCancelled(Exception):
+	"""Импорт остановлен по запросу пользователя."""
+
+
+def cancel_import(task_id):
+	"""
+	Отмена задачи. Возвращает задачу или None, если она уже завершена.
+	Задача в очереди сразу получает статус cancelled; у идущей ставится
+	флаг, статус сменит воркер после текущего чанка.
+	"""
+	with transaction.atomic():
+		# Та же блокировка, что при захвате задачи воркером
+		task = ImportTask.objects.select_for_update().get(id=task_id)
+		if task.status in FINISHED_STATUSES:
+			return None
+		task.cancel_requested = True
+		update_fields = ["cancel_requested"]
+		if task.status == "pending":
+			task.status = "cancelled"
+			task.finished_at = timezone.now()
+			update_fields += ["status", "finished_at"]
+		task.save(update_fields=update_fields)
+
+	if task.status == "cancelled":
+		# Подписчики потока событий получают итоговый статус
+		ProgressReporter(task).clear()
+	return task
+
+
+def check_cancelled(task):
+	"""ImportCancelled, если отменена задача или её архив."""
+	ids = [task.id] if task.parent_id is None else [task.id, task.parent_id]
+	if ImportTask.objects.filter(id__in=ids, cancel_requested=True).exists():
+		raise ImportCancelled("Импорт отменён")
@@ -0,0 +1,62 @@
+"""
+Проверочный прогон импорта: разбор, разрешение справочников и проверки
+строк без записи в БД. Отчёт возвращается сразу в ответе API.
+"""
+from .engine import ImportEngine
+from .readers import iter_file_chunks
+from .resolvers import PeriodResolver
+
+
+# Сколько ошибок строк возвращать в отчёте
+DRY_RUN_ERROR_LIMIT = 1000
+
+
+class DryRunWriter:
+	"""Writer проверочного прогона: проверенные строки не пишутся."""
+
+	def write(self, frame):
+		pass
+
+
+def dry_run(task, path, chunk_size=None, error_limit=DRY_RUN_ERROR_LIMIT):
+	"""
+	Прогоняет файл через ImportEngine. task — несохранённая ImportTask
+	(компания, сценарий, тип файла, лист); недостающие периоды
+	не создаются — импорт создаст их сам.
+	"""
+	engine = ImportEngine(
+		task,
+		chunk_size=chunk_size,
+		periods=PeriodResolver(task.company, create=False),
+		writer=DryRunWriter(),
+		error_limit=error_limit,
+	)
+	chunks = iter_file_chunks(
+		path, task.file_type, engine.chunk_size, task.sheet)
+	for chunk in chunks:
+		engine.process_chunk(chunk)
+	return dry_run_report(engine, error_limit)
+
+
+def dry_run_report(engine, error_limit):
+	unknown_codes = [
+		{
+			"column": column,
+			"code": code,
+			"count": count,
+			"rows": [idx + 2 for idx in sample],
+		}
+		for column, codes in engine.unknown_codes.items()
+		for code, (count, sample) in codes.items()
+	]
+	return {
+		"valid": engine.rows_failed == 0,
+		"rows_total": engine.rows_processed,
+		"rows_valid": engine.success,
+		"rows_failed": engine.rows_failed,
+		"unknown_codes": unknown_codes,
+		"errors": [
+			error._asdict() for error in engine.row_errors
+		],
+		"errors_truncated": engine.row_errors_total > error_limit,
+	}
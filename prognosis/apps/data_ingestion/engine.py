@@ -0,0 +1,395 @@
+from collections import namedtuple
+
+import pandas as pd
+from django.conf import settings
+from pandas.api.types import (
+	is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
+)
+
+from core.models import TimePeriod
+from dimensions.models import (
+	BudgetArticle, CostCenter,
+	Department, Project, ChartOfAccounts
+)
+from financials.models import FinancialLine
+from .parsing import (
+	amounts_from_numbers, cents_to_decimal, decimal_to_cents,
+	parse_amounts, parse_periods, periods_from_dates, periods_from_numbers
+)
+from .resolvers import DimensionResolver, PeriodResolver
+
+
+# Колонки файла импорта
+COLUMN_ARTICLE = "Статья"
+COLUMN_PERIOD = "Период"
+COLUMN_AMOUNT = "Сумма"
+
+# Измерения: колонка файла -> (поле FinancialLine, модель справочника)
+DIMENSION_COLUMNS = {
+	COLUMN_ARTICLE: ("article", BudgetArticle),
+	"ЦФО": ("cost_center", CostCenter),
+	"Подразделение": ("department", Department),
+	"Проект": ("project", Project),
+	"Счет": ("account", ChartOfAccounts),
+}
+
+# Ключ строки внутри сценария — те же поля,
+# что и в unique_financial_line_key (без company/scenario)
+LINE_KEY_FIELDS = (
+	"period_id",
+	"article_id",
+	"cost_center_id",
+	"department_id",
+	"project_id",
+	"account_id",
+)
+
+# Сколько номеров строк хранить для одного неизвестного кода
+UNKNOWN_CODE_SAMPLE_ROWS = 10
+
+# Коды ошибок строк
+ERROR_REQUIRED = "required"
+ERROR_AMOUNT = "invalid_amount"
+ERROR_PERIOD = "invalid_period"
+ERROR_UNKNOWN_CODE = "unknown_code"
+
+# Ошибка строки: номер строки в файле (с заголовком), колонка, код, текст
+RowError = namedtuple("RowError", ["row", "column", "code", "message"])
+
+# Сколько ошибок строк держать в памяти (для ImportTask.error_log);
+# полный список пишется через error_writer
+ERROR_LOG_LIMIT = 200
+
+
+def numeric(values):
+	return is_numeric_dtype(values) and not is_bool_dtype(values)
+
+
+def typed(values):
+	"""Колонка уже типизирована (числа/даты), а не строки файла."""
+	return numeric(values) or is_datetime64_any_dtype(values)
+
+
+class ImportEngine:
+	"""
+	Пакетная загрузка строк импорта в FinancialLine.
+
+	Каждый чанк проходит три шага: проверка строк, разрешение
+	справочников по целым колонкам и запись через writer
+	(по умолчанию — FinancialLineWriter). Ошибки строк чанка
+	уходят одной пачкой в error_writer (RowErrorWriter); в памяти
+	остаются только первые error_limit — память не растёт
+	с числом ошибок.
+	"""
+
+	def __init__(
+		self, task, chunk_size=None,
+		resolver=None, periods=None, writer=None,
+		error_writer=None, error_limit=ERROR_LOG_LIMIT
+	):
+		self.task = task
+		self.company = task.company
+		self.scenario = task.scenario
+		self.chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+		self.resolver = resolver or DimensionResolver(self.company)
+		self.periods = periods or PeriodResolver(self.company)
+		self.writer = writer or FinancialLineWriter(
+			self.company, self.scenario, self.chunk_size, task.mode)
+		self.rows_processed = 0
+		self.rows_failed = 0
+		self.success = 0
+		self.error_writer = error_writer
+		self.error_limit = error_limit
+		self.row_errors = []
+		self.row_errors_total = 0
+		self._pending_errors = []
+		# {колонка: {код: [число строк, первые номера строк]}}
+		self.unknown_codes = {}
+
+	def process_chunk(self, chunk):
+		"""Обрабатывает один DataFrame; индекс строки — её номер в файле."""
+		frame = self._validate(chunk)
+		frame = self._resolve(frame)
+		if not frame.empty:
+			self.writer.write(frame)
+			self.success += len(frame)
+		self.rows_processed += len(chunk)
+		self.flush_errors()
+
+	def flush_errors(self):
+		"""Пишет накопленные ошибки строк через error_writer."""
+		if self._pending_errors:
+			self.error_writer.write(self._pending_errors)
+			self._pending_errors = []
+
+	def finish(self):
+		"""Вызывается после последнего чанка."""
+		# Строка с ошибкой не попала в запись, но её ключ мог быть
+		# в БД: replace с ошибками не удаляет ничего
+		if self.task.mode == "replace" and not self.rows_failed:
+			self.writer.delete_missing()
+
+	def add_error(self, idx, message, column=None, code=None):
+		error = RowError(idx + 2, column, code, message)
+		self.row_errors_total += 1
+		if len(self.row_errors) < self.error_limit:
+			self.row_errors.append(error)
+		self._queue_error(error)
+		self.rows_failed += 1
+
+	def _queue_error(self, error):
+		if self.error_writer is not None:
+			self._pending_errors.append(error)
+
+	@property
+	def errors(self):
+		return [
+			f"Строка {error.row}: {error.message}"
+			for error in self.row_errors
+		]
+
+	def restore_errors(self, errors):
+		"""
+		Ошибки до контрольной точки (RowError из ImportRowError в порядке
+		строк) при повторе импорта: из них заново собираются сводка
+		по кодам и первые ошибки строк. Счётчики строк не меняются.
+		"""
+		for error in errors:
+			if error.code == ERROR_UNKNOWN_CODE:
+				code = error.message.removeprefix("Код '").removesuffix(
+					"' не найден")
+				self._count_unknown(error.column, code, error.row - 2)
+			else:
+				self.row_errors_total += 1
+				if len(self.row_errors) < self.error_limit:
+					self.row_errors.append(error)
+
+	def error_lines(self, limit=None):
+		"""
+		Ошибки импорта: сводка по неизвестным кодам, затем ошибки строк.
+		limit — сколько строк сформировать (для лога хватает первых).
+		"""
+		lines = []
+		for column, codes in self.unknown_codes.items():
+			for code, (count, sample) in codes.items():
+				rows = ", ".join(str(idx + 2) for idx in sample)
+				if count > len(sample):
+					rows += f" и ещё {count - len(sample)}"
+				lines.append(f"{column}: код '{code}' не найден (строки {rows})")
+		for error in self.row_errors:
+			if limit is not None and len(lines) >= limit:
+				break
+			lines.append(f"Строка {error.row}: {error.message}")
+		return lines[:limit]
+
+	def _validate(self, chunk):
+		"""
+		Векторная проверка чанка: обязательные колонки, суммы, периоды.
+		Возвращает корректные строки; ошибки остальных — в errors.
+		"""
+		def column(name):
+			if name in chunk:
+				return chunk[name].fillna("").astype(str)
+			return pd.Series("", index=chunk.index, dtype=object)
+
+		def missing(name):
+			if name in chunk and typed(chunk[name]):
+				return chunk[name].isna()
+			return column(name) == ""
+
+		# Типизированные колонки (Parquet/Arrow) разбираются без строк
+		amounts = chunk.get(COLUMN_AMOUNT)
+		if amounts is not None and numeric(amounts):
+			cents, amount_errors = amounts_from_numbers(amounts)
+		else:
+			cents, amount_errors = parse_amounts(column(COLUMN_AMOUNT))
+
+		periods = chunk.get(COLUMN_PERIOD)
+		if periods is not None and is_datetime64_any_dtype(periods):
+			periods, period_errors = periods_from_dates(periods)
+		elif periods is not None and numeric(periods):
+			periods, period_errors = periods_from_numbers(periods)
+		else:
+			periods, period_errors = parse_periods(column(COLUMN_PERIOD))
+
+		# Порядок проверок как раньше: первой сообщается
+		# отсутствующая обязательная колонка, затем сумма, затем период
+		amount_ok = amount_errors.isna()
+		reasons = period_errors.where(amount_ok, amount_errors)
+		columns = pd.Series(COLUMN_PERIOD, index=chunk.index, dtype=object)
+		columns = columns.where(amount_ok, COLUMN_AMOUNT)
+		codes = pd.Series(ERROR_PERIOD, index=chunk.index, dtype=object)
+		codes = codes.where(amount_ok, ERROR_AMOUNT)
+		for name in (COLUMN_AMOUNT, COLUMN_PERIOD, COLUMN_ARTICLE):
+			empty = missing(name)
+			reasons[empty] = f"Колонка '{name}' обязательна"
+			columns[empty] = name
+			codes[empty] = ERROR_REQUIRED
+
+		invalid = reasons.notna()
+		for idx, reason, name, code in zip(
+			chunk.index[invalid], reasons[invalid],
+			columns[invalid], codes[invalid]
+		):
+			self.add_error(idx, reason, name, code)
+
+		frame = pd.DataFrame({
+			"cents": cents,
+			"period": periods,
+			**{name: column(name) for name in DIMENSION_COLUMNS},
+		}, index=chunk.index)
+		return frame[~invalid].copy()
+
+	def _resolve(self, frame):
+		if frame.empty:
+			return frame
+
+		failed = pd.Series(False, index=frame.index)
+		for column, (field, model) in DIMENSION_COLUMNS.items():
+			ids, unknown = self.resolver.resolve(model, frame[column])
+			frame[f"{field}_id"] = ids
+			if unknown.any():
+				self._record_unknown(column, frame.loc[unknown, column])
+				failed |= unknown
+		frame["period_id"] = self.periods.resolve(frame["period"])
+
+		self.rows_failed += int(failed.sum())
+		return frame[~failed]
+
+	def _record_unknown(self, column, codes):
+		for idx, code in codes.items():
+			self._count_unknown(column, code, idx)
+			# В лог неизвестные коды попадают сводкой, в таблицу — построчно
+			self._queue_error(RowError(
+				idx + 2, column, ERROR_UNKNOWN_CODE,
+				f"Код '{code}' не найден"))
+
+	def _count_unknown(self, column, code, idx):
+		entry = self.unknown_codes.setdefault(column, {}).setdefault(
+			code, [0, []])
+		entry[0] += 1
+		if len(entry[1]) < UNKNOWN_CODE_SAMPLE_ROWS:
+			entry[1].append(idx)
+
+
+class FinancialLineWriter:
+	"""
+	Запись строк сценария в FinancialLine одним bulk_create
+	с update_conflicts. Семантика та же, что у update_or_create:
+	существующая строка с тем же набором измерений обновляется,
+	пустые измерения сравниваются как равные.
+
+	mode — режим импорта ImportTask: upsert перезаписывает все строки,
+	delta и replace пропускают строки с той же суммой, replace вдобавок
+	удаляет через delete_missing() строки периодов файла, которых
+	в файле не было. Счётчики inserted/updated/unchanged/deleted —
+	по строкам файла после схлопывания повторов внутри чанка.
+	"""
+
+	def __init__(self, company, scenario, batch_size, mode="upsert"):
+		self.company = company
+		self.scenario = scenario
+		self.batch_size = batch_size
+		self.mode = mode
+		self.inserted = 0
+		self.updated = 0
+		self.unchanged = 0
+		self.deleted = 0
+		# Для replace: id строк из файла и периоды файла
+		self._kept_ids = set()
+		self._periods = set()
+		# id периода -> period_key; периодов в файле немного
+		self._period_keys = {}
+
+	def write(self, frame):
+		"""frame — колонки LINE_KEY_FIELDS и cents (сумма в копейках)."""
+		# Повтор ключа в файле — последняя строка побеждает,
+		# как при последовательных update_or_create
+		lines = {}
+		keys = frame[list(LINE_KEY_FIELDS)]
+		for key, cents in zip(keys.itertuples(index=False), frame["cents"]):
+			key = tuple(None if pd.isna(value) else int(value) for value in key)
+			lines[key] = cents
+
+		existing = self._existing(lines)
+		self._load_period_keys({key[0] for key in lines})
+
+		objs = []
+		for key, cents in lines.items():
+			pk, current = existing.get(key, (None, None))
+			if pk is None:
+				self.inserted += 1
+			elif current == cents:
+				self.unchanged += 1
+				if self.mode != "upsert":
+					self._keep(key, pk)
+					continue
+			else:
+				self.updated += 1
+			objs.append(FinancialLine(
+				pk=pk,
+				company=self.company,
+				scenario=self.scenario,
+				amount=cents_to_decimal(cents),
+				period_key=self._period_keys[key[0]],
+				**dict(zip(LINE_KEY_FIELDS, key)),
+			))
+
+		# Ключ — выражения COALESCE, bulk_create не может указать их
+		# в ON CONFLICT: существующие строки сопоставлены по ключу выше
+		# и конфликтуют по pk
+		FinancialLine.objects.bulk_create(
+			objs,
+			batch_size=self.batch_size,
+			update_conflicts=True,
+			unique_fields=["id"],
+			update_fields=["amount", "updated_at"],
+		)
+
+		if self.mode == "replace":
+			for obj in objs:
+				self._keep(tuple(getattr(obj, f) for f in LINE_KEY_FIELDS), obj.pk)
+
+	def delete_missing(self):
+		"""
+		replace: удаляет строки сценария в периодах файла, которых
+		в файле не было. Вызывать после записи всех чанков.
+		"""
+		stale = [
+			pk for pk in FinancialLine.objects.filter(
+				company=self.company,
+				scenario=self.scenario,
+				period_id__in=self._periods,
+			).values_list("id", flat=True).iterator(chunk_size=self.batch_size)
+			if pk not in self._kept_ids
+		]
+		for start in range(0, len(stale), self.batch_size):
+			deleted, _ = FinancialLine.objects.filter(
+				id__in=stale[start:start + self.batch_size]).delete()
+			self.deleted += deleted
+		return self.deleted
+
+	def _load_period_keys(self, period_ids):
+		missing = period_ids - self._period_keys.keys()
+		if missing:
+			self._period_keys.update(TimePeriod.objects.filter(
+				pk__in=missing).values_list("pk", "period_key"))
+
+	def _keep(self, key, pk):
+		self._kept_ids.add(pk)
+		self._periods.add(key[0])
+
+	def _existing(self, lines):
+		"""Ключ -> (id, сумма в копейках) для уже сохранённых строк."""
+		period_ids = {key[0] for key in lines}
+		article_ids = {key[1] for key in lines}
+		existing = FinancialLine.objects.filter(
+			company=self.company,
+			scenario=self.scenario,
+			period_id__in=period_ids,
+			article_id__in=article_ids,
+		).values_list("id", "amount", *LINE_KEY_FIELDS)
+		return {
+			tuple(row[2:]): (row[0], decimal_to_cents(row[1]))
+			for row in existing
+		}
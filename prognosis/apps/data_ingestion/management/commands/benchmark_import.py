@@ -0,0 +1,82 @@
+import itertools
+
+from django.core.management.base import BaseCommand
+
+from data_ingestion.benchmark import (
+	BENCHMARK_DEFAULTS, BenchmarkConfig, report_json, run_benchmarks
+)
+
+
+class Command(BaseCommand):
+	help = (
+		"Замер скорости импорта на синтетических CSV/XLSX: rows/sec, "
+		"число запросов и пиковая память по каждой конфигурации. "
+		"Конфигурации — все сочетания --rows, --format, --backend, "
+		"--mode и --chunk-size."
+	)
+
+	def add_arguments(self, parser):
+		defaults = BENCHMARK_DEFAULTS
+		parser.add_argument(
+			"--rows", type=int, nargs="+", default=[10000, 100000])
+		parser.add_argument(
+			"--format", nargs="+", default=["csv", "xlsx"],
+			choices=["csv", "xlsx"], dest="formats")
+		parser.add_argument(
+			"--backend", nargs="+", default=[defaults["backend"]],
+			choices=["orm", "copy"], dest="backends")
+		parser.add_argument(
+			"--mode", nargs="+", default=[defaults["mode"]],
+			choices=["upsert", "delta", "replace"], dest="modes")
+		parser.add_argument(
+			"--chunk-size", type=int, nargs="+",
+			default=[defaults["chunk_size"]], dest="chunk_sizes")
+		parser.add_argument(
+			"--articles", type=int, default=defaults["articles"])
+		parser.add_argument(
+			"--cost-centers", type=int, default=defaults["cost_centers"])
+		parser.add_argument(
+			"--departments", type=int, default=defaults["departments"])
+		parser.add_argument(
+			"--periods", type=int, default=defaults["periods"])
+		parser.add_argument(
+			"--error-rate", type=float, default=defaults["error_rate"])
+		parser.add_argument("--seed", type=int, default=defaults["seed"])
+		parser.add_argument(
+			"--output", help="Файл для отчёта JSON; по умолчанию — stdout")
+
+	def handle(self, *args, **options):
+		configs = [
+			BenchmarkConfig(
+				file_type="excel" if file_format == "xlsx" else "csv",
+				rows=rows,
+				backend=backend,
+				mode=mode,
+				chunk_size=chunk_size,
+				articles=options["articles"],
+				cost_centers=options["cost_centers"],
+				departments=options["departments"],
+				periods=options["periods"],
+				error_rate=options["error_rate"],
+				seed=options["seed"],
+			)
+			for file_format, rows, backend, mode, chunk_size
+			in itertools.product(
+				options["formats"], options["rows"], options["backends"],
+				options["modes"], options["chunk_sizes"])
+		]
+
+		report = run_benchmarks(configs)
+		for result in report["results"]:
+			self.stderr.write(
+				"{file_type} {rows} строк, {backend}/{mode}, чанк "
+				"{chunk_size}: {rows_per_sec} строк/с, {queries} запросов, "
+				"{peak_memory_mb} МБ".format(**result))
+
+		if options["output"]:
+			with open(options["output"], "w", encoding="utf-8") as f:
+				f.write(report_json(report))
+			self.stderr.write(
+				self.style.SUCCESS(f"Отчёт записан в {options['output']}"))
+		else:
+			self.stdout.write(report_json(report))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importtask',
+            name='peak_memory_mb',
+            field=models.PositiveIntegerField(blank=True, help_text='Пиковый RSS воркера во время импорта', null=True, verbose_name='Пик памяти, МБ'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_scenario_core_scenar_company_1b4ad5_idx'),
+        ('data_ingestion', '0002_importtask_peak_memory_mb'),
+        ('dimensions', '0002_department_created_at_department_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportStagingLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_number', models.PositiveIntegerField(verbose_name='Номер строки')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=19, verbose_name='Сумма')),
+                ('account', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dimensions.chartofaccounts')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dimensions.budgetarticle')),
+                ('cost_center', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dimensions.costcenter')),
+                ('department', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dimensions.department')),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.timeperiod')),
+                ('project', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dimensions.project')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='staging_lines', to='data_ingestion.importtask', verbose_name='Задача импорта')),
+            ],
+            options={
+                'verbose_name': 'Строка промежуточной загрузки',
+                'verbose_name_plural': 'Строки промежуточной загрузки',
+                'indexes': [models.Index(fields=['task', 'row_number'], name='data_ingest_task_id_a35f1f_idx')],
+            },
+        ),
+    ]
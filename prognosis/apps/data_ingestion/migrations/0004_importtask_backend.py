@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0003_importstagingline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importtask',
+            name='backend',
+            field=models.CharField(choices=[('orm', 'ORM (bulk_create)'), ('copy', 'COPY (только PostgreSQL)')], default='orm', help_text='COPY вне PostgreSQL заменяется на ORM', max_length=10, verbose_name='Способ загрузки'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0004_importtask_backend'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importtask',
+            name='sheet',
+            field=models.CharField(blank=True, help_text='Имя или номер листа Excel (с 0); по умолчанию — первый', max_length=100, verbose_name='Лист'),
+        ),
+    ]
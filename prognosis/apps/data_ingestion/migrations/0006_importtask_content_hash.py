@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('core', '0002_scenario_core_scenar_company_1b4ad5_idx'),
+        ('data_ingestion', '0005_importtask_sheet'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importtask',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='SHA-256 файла'),
+        ),
+        migrations.AddIndex(
+            model_name='importtask',
+            index=models.Index(fields=['company', 'scenario', 'content_hash'], name='data_ingest_company_175878_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0006_importtask_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importtask',
+            name='mode',
+            field=models.CharField(choices=[('upsert', 'Перезапись всех строк'), ('delta', 'Только изменения'), ('replace', 'Замена среза')], default='upsert', help_text='Только изменения — строки с той же суммой не перезаписываются; замена среза — вдобавок удаляются строки периодов файла, которых нет в файле', max_length=10, verbose_name='Режим'),
+        ),
+        migrations.AddField(
+            model_name='importtask',
+            name='rows_deleted',
+            field=models.PositiveIntegerField(default=0, verbose_name='Удалено'),
+        ),
+        migrations.AddField(
+            model_name='importtask',
+            name='rows_inserted',
+            field=models.PositiveIntegerField(default=0, verbose_name='Добавлено'),
+        ),
+        migrations.AddField(
+            model_name='importtask',
+            name='rows_unchanged',
+            field=models.PositiveIntegerField(default=0, verbose_name='Без изменений'),
+        ),
+        migrations.AddField(
+            model_name='importtask',
+            name='rows_updated',
+            field=models.PositiveIntegerField(default=0, verbose_name='Изменено'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0007_importtask_mode_write_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importtask',
+            name='checkpoint_row',
+            field=models.PositiveIntegerField(default=0, help_text='Строка файла, с которой продолжится прерванный импорт', verbose_name='Контрольная точка'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0008_importtask_checkpoint_row'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportRowError',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row', models.PositiveIntegerField(verbose_name='Строка файла')),
+                ('column', models.CharField(blank=True, max_length=100, verbose_name='Колонка')),
+                ('code', models.CharField(choices=[('required', 'Не заполнено обязательное поле'), ('invalid_amount', 'Некорректная сумма'), ('invalid_period', 'Некорректный период'), ('unknown_code', 'Неизвестный код справочника')], max_length=20, verbose_name='Код ошибки')),
+                ('message', models.CharField(max_length=255, verbose_name='Сообщение')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='row_errors', to='data_ingestion.importtask', verbose_name='Задача импорта')),
+            ],
+            options={
+                'verbose_name': 'Ошибка строки импорта',
+                'verbose_name_plural': 'Ошибки строк импорта',
+                'indexes': [models.Index(fields=['task', 'row'], name='data_ingest_task_id_f1cd09_idx'), models.Index(fields=['task', 'code', 'row'], name='data_ingest_task_id_aad007_idx'), models.Index(fields=['task', 'column', 'row'], name='data_ingest_task_id_534822_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0009_importrowerror'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importtask',
+            name='file_type',
+            field=models.CharField(choices=[('excel', 'Excel'), ('csv', 'CSV'), ('parquet', 'Parquet'), ('arrow', 'Arrow IPC / Feather')], max_length=10, verbose_name='Тип файла'),
+        ),
+    ]
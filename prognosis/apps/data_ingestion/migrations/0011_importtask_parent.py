@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0010_importtask_columnar_file_types'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importtask',
+            name='parent',
+            field=models.ForeignKey(blank=True, help_text='Задача архива, из которого извлечён файл', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='data_ingestion.importtask', verbose_name='Архив'),
+        ),
+        migrations.AlterField(
+            model_name='importtask',
+            name='file_type',
+            field=models.CharField(choices=[('excel', 'Excel'), ('csv', 'CSV'), ('parquet', 'Parquet'), ('arrow', 'Arrow IPC / Feather'), ('zip', 'ZIP-архив')], max_length=10, verbose_name='Тип файла'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0011_importtask_parent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importtask',
+            name='cancel_requested',
+            field=models.BooleanField(default=False, help_text='Воркер остановит импорт перед следующим чанком', verbose_name='Запрошена отмена'),
+        ),
+        migrations.AlterField(
+            model_name='importtask',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Ожидает'), ('processing', 'Обработка'), ('completed', 'Завершено'), ('failed', 'Ошибка'), ('cancelled', 'Отменено')], default='pending', max_length=20, verbose_name='Статус'),
+        ),
+    ]
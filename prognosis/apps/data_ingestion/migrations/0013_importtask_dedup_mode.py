@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('core', '0003_timeperiod_period_key'),
+        ('data_ingestion', '0012_importtask_cancel'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='importtask',
+            name='data_ingest_company_175878_idx',
+        ),
+        migrations.AddIndex(
+            model_name='importtask',
+            index=models.Index(fields=['company', 'scenario', 'content_hash', 'mode', 'backend'], name='data_ingest_company_37cac2_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0013_importtask_dedup_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importtask',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Воркер обновляет её на каждом чанке; повторная доставка продолжает импорт, только когда отметка устарела', null=True, verbose_name='Отметка воркера'),
+        ),
+    ]
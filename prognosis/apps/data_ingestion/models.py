@@ -15,28 +15,105 @@ class ImportTask(CompanyRelatedModel):
 		("processing", _("Обработка")),
 		("completed", _("Завершено")),
 		("failed", _("Ошибка")),
+		("cancelled", _("Отменено")),
 	]
+	BACKEND_CHOICES = [
+		("orm", _("ORM (bulk_create)")),
+		("copy", _("COPY (только PostgreSQL)")),
+	]
+	MODE_CHOICES = [
+		("upsert", _("Перезапись всех строк")),
+		("delta", _("Только изменения")),
+		("replace", _("Замена среза")),
+	]
+	# Повторная загрузка того же файла возвращает такую задачу,
+	# а не создаёт новую; после ошибки файл можно загрузить заново
+	DEDUPLICATED_STATUSES = ("pending", "processing", "completed")
 
 	slug = models.SlugField(max_length=255, blank=True)
 	file = models.FileField(_("Файл"), upload_to="imports/%Y/%m/%d/")
 	file_type = models.CharField(
 		_("Тип файла"),
 		max_length=10,
-		choices=[("excel", "Excel"), ("csv", "CSV")])
+		choices=[
+			("excel", "Excel"),
+			("csv", "CSV"),
+			("parquet", "Parquet"),
+			("arrow", "Arrow IPC / Feather"),
+			("zip", _("ZIP-архив")),
+		])
+	parent = models.ForeignKey(
+		"self",
+		on_delete=models.CASCADE,
+		null=True,
+		blank=True,
+		related_name="children",
+		verbose_name=_("Архив"),
+		help_text=_("Задача архива, из которого извлечён файл"))
+	content_hash = models.CharField(
+		_("SHA-256 файла"),
+		max_length=64,
+		blank=True,
+		editable=False)
+	sheet = models.CharField(
+		_("Лист"),
+		max_length=100,
+		blank=True,
+		help_text=_("Имя или номер листа Excel (с 0); по умолчанию — первый"))
 	status = models.CharField(
 		_("Статус"),
 		max_length=20,
 		choices=STATUS_CHOICES,
 		default="pending")
+	cancel_requested = models.BooleanField(
+		_("Запрошена отмена"),
+		default=False,
+		help_text=_("Воркер остановит импорт перед следующим чанком"))
 	scenario = models.ForeignKey(
 		"core.Scenario",
 		on_delete=models.PROTECT,
 		verbose_name=_("Сценарий"))
+	backend = models.CharField(
+		_("Способ загрузки"),
+		max_length=10,
+		choices=BACKEND_CHOICES,
+		default="orm",
+		help_text=_("COPY вне PostgreSQL заменяется на ORM"))
+	mode = models.CharField(
+		_("Режим"),
+		max_length=10,
+		choices=MODE_CHOICES,
+		default="upsert",
+		help_text=_(
+			"Только изменения — строки с той же суммой не перезаписываются; "
+			"замена среза — вдобавок удаляются строки периодов файла, "
+			"которых нет в файле"))
 	rows_total = models.PositiveIntegerField(_("Всего строк"), default=0)
 	rows_processed = models.PositiveIntegerField(_("Обработано"), default=0)
 	rows_success = models.PositiveIntegerField(_("Успешно"), default=0)
 	rows_failed = models.PositiveIntegerField(_("Ошибок"), default=0)
+	checkpoint_row = models.PositiveIntegerField(
+		_("Контрольная точка"),
+		default=0,
+		help_text=_("Строка файла, с которой продолжится прерванный импорт"))
+	heartbeat_at = models.DateTimeField(
+		_("Отметка воркера"),
+		null=True,
+		blank=True,
+		editable=False,
+		help_text=_(
+			"Воркер обновляет её на каждом чанке; повторная доставка "
+			"продолжает импорт, только когда отметка устарела"))
+	rows_inserted = models.PositiveIntegerField(_("Добавлено"), default=0)
+	rows_updated = models.PositiveIntegerField(_("Изменено"), default=0)
+	rows_unchanged = models.PositiveIntegerField(_("Без изменений"), default=0)
+	rows_deleted = models.PositiveIntegerField(_("Удалено"), default=0)
 	error_log = models.TextField(_("Лог ошибок"), blank=True)
+	peak_memory_mb = models.PositiveIntegerField(
+		_("Пик памяти, МБ"),
+		null=True,
+		blank=True,
+		help_text=_("Пиковый RSS воркера во время импорта"))
 	started_at = models.DateTimeField(_("Начало"), null=True, blank=True)
 	finished_at = models.DateTimeField(_("Завершение"), null=True, blank=True)
 	created_by = models.ForeignKey(
@@ -52,6 +129,8 @@ class ImportTask(CompanyRelatedModel):
 		unique_together = ("company", "slug")
 		indexes = [
 			models.Index(fields=["company", "slug"]),
+			models.Index(fields=[
+				"company", "scenario", "content_hash", "mode", "backend"]),
 		]
 
 	def __str__(self):
@@ -75,3 +154,88 @@ class ImportTask(CompanyRelatedModel):
 		if not self.slug:
 			self.slug = self._generate_unique_slug()
 		super().save(*args, **kwargs)
+
+
+class ImportStagingLine(models.Model):
+	"""
+	Проверенная строка импорта до слияния в FinancialLine.
+	Шарды параллельного импорта пишут только сюда; финальный шаг
+	переносит строки одной транзакцией и очищает таблицу.
+	"""
+	task = models.ForeignKey(
+		ImportTask,
+		on_delete=models.CASCADE,
+		related_name="staging_lines",
+		verbose_name=_("Задача импорта"))
+	row_number = models.PositiveIntegerField(_("Номер строки"))
+	period = models.ForeignKey(
+		"core.TimePeriod",
+		on_delete=models.CASCADE,
+		related_name="+")
+	article = models.ForeignKey(
+		"dimensions.BudgetArticle",
+		on_delete=models.CASCADE,
+		related_name="+")
+	cost_center = models.ForeignKey(
+		"dimensions.CostCenter",
+		null=True,
+		on_delete=models.CASCADE,
+		related_name="+")
+	department = models.ForeignKey(
+		"dimensions.Department",
+		null=True,
+		on_delete=models.CASCADE,
+		related_name="+")
+	project = models.ForeignKey(
+		"dimensions.Project",
+		null=True,
+		on_delete=models.CASCADE,
+		related_name="+")
+	account = models.ForeignKey(
+		"dimensions.ChartOfAccounts",
+		null=True,
+		on_delete=models.CASCADE,
+		related_name="+")
+	amount = models.DecimalField(_("Сумма"), max_digits=19, decimal_places=2)
+
+	class Meta:
+		verbose_name = _("Строка промежуточной загрузки")
+		verbose_name_plural = _("Строки промежуточной загрузки")
+		indexes = [
+			models.Index(fields=["task", "row_number"]),
+		]
+
+
+class ImportRowError(models.Model):
+	"""
+	Ошибка строки импорта. Пишется пачкой на каждый чанк;
+	в ImportTask.error_log остаются только первые строки.
+	"""
+	CODE_CHOICES = [
+		("required", _("Не заполнено обязательное поле")),
+		("invalid_amount", _("Некорректная сумма")),
+		("invalid_period", _("Некорректный период")),
+		("unknown_code", _("Неизвестный код справочника")),
+	]
+
+	task = models.ForeignKey(
+		ImportTask,
+		on_delete=models.CASCADE,
+		related_name="row_errors",
+		verbose_name=_("Задача импорта"))
+	row = models.PositiveIntegerField(_("Строка файла"))
+	column = models.CharField(_("Колонка"), max_length=100, blank=True)
+	code = models.CharField(
+		_("Код ошибки"),
+		max_length=20,
+		choices=CODE_CHOICES)
+	message = models.CharField(_("Сообщение"), max_length=255)
+
+	class Meta:
+		verbose_name = _("Ошибка строки импорта")
+		verbose_name_plural = _("Ошибки строк импорта")
+		indexes = [
+			models.Index(fields=["task", "row"]),
+			models.Index(fields=["task", "code", "row"]),
+			models.Index(fields=["task", "column", "row"]),
+		]
@@ -0,0 +1,159 @@
+"""
+Векторный разбор колонок файла импорта.
+
+Суммы переводятся в целые копейки (int64), периоды — в целочисленный
+код YYYYMM (YYYY00 — годовой период). Каждая функция возвращает
+значения и Series причин ошибок (<NA> для корректных строк).
+"""
+from decimal import ROUND_HALF_EVEN, Decimal, InvalidOperation
+
+import numpy as np
+import pandas as pd
+
+
+# До этой величины float64 различает копейки с большим запасом:
+# сумма с не более чем двумя знаками после запятой, умноженная на 100,
+# отстоит от целого меньше чем на AMOUNT_FAST_TOLERANCE
+AMOUNT_FAST_LIMIT = 1e11
+AMOUNT_FAST_TOLERANCE = 0.01
+# Предел по модулю, при котором копейки помещаются в int64
+AMOUNT_MAX = Decimal("1e16")
+CENT = Decimal("0.01")
+
+
+def parse_amounts(values):
+	"""
+	Строки сумм ('100.50', '100,5', '-12') -> (копейки int64, причины).
+
+	Большинство строк разбирается одним pd.to_numeric; строки с лишними
+	знаками после запятой или очень большие суммы — через Decimal
+	с округлением «к чётному», как при сохранении в DecimalField.
+	"""
+	normalized = values.str.replace(",", ".", regex=False)
+	numbers = pd.to_numeric(normalized, errors="coerce")
+	return _cents(numbers, normalized, values)
+
+
+def amounts_from_numbers(values):
+	"""
+	Типизированная колонка сумм (int/float, например из Parquet) ->
+	(копейки int64, причины) без разбора строк. Медленный путь
+	через Decimal — только для сумм вне быстрого диапазона.
+	"""
+	numbers = values.astype(np.float64)
+	return _cents(numbers, numbers.map(repr), values)
+
+
+def _cents(numbers, texts, values):
+	numbers = numbers.astype(np.float64).to_numpy()
+	scaled = numbers * 100
+	rounded = np.rint(scaled)
+	with np.errstate(invalid="ignore"):
+		fast = (
+			np.isfinite(scaled)
+			& (np.abs(numbers) < AMOUNT_FAST_LIMIT)
+			& (np.abs(scaled - rounded) < AMOUNT_FAST_TOLERANCE)
+		)
+
+	cents = pd.Series(
+		np.where(fast, rounded, 0).astype(np.int64), index=values.index)
+	reasons = pd.Series(pd.NA, index=values.index, dtype=object)
+
+	for idx, value in texts[~fast].items():
+		parsed = _parse_decimal(value)
+		if parsed is None:
+			reasons[idx] = f"Некорректная сумма: {values[idx]}"
+		else:
+			cents[idx] = parsed
+	return cents, reasons
+
+
+def _parse_decimal(value):
+	try:
+		amount = Decimal(value)
+	except InvalidOperation:
+		return None
+	if not amount.is_finite() or abs(amount) >= AMOUNT_MAX:
+		return None
+	return int(amount.quantize(CENT, rounding=ROUND_HALF_EVEN).scaleb(2))
+
+
+def parse_periods(values):
+	"""
+	Строки периодов 'YYYY-MM' / 'YYYY' -> (код YYYYMM int64, причины).
+	Периодов в файле немного, поэтому разбираются только уникальные
+	значения, а результат раскладывается по строкам через factorize.
+	"""
+	labels, uniques = pd.factorize(values)
+	parsed = [_parse_period(value) for value in uniques]
+	codes = np.array([code for code, _ in parsed] or [0], dtype=np.int64)
+	reasons = np.array(
+		[reason for _, reason in parsed] or [pd.NA], dtype=object)
+	return (
+		pd.Series(codes[labels], index=values.index),
+		pd.Series(reasons[labels], index=values.index, dtype=object),
+	)
+
+
+def periods_from_dates(values):
+	"""Колонка дат (datetime64) -> (код YYYYMM int64, причины)."""
+	valid = values.notna()
+	codes = (values.dt.year * 100 + values.dt.month).where(valid, 0)
+	reasons = pd.Series(pd.NA, index=values.index, dtype=object)
+	reasons[~valid] = "Некорректный формат периода: пусто"
+	return codes.astype(np.int64), reasons
+
+
+def periods_from_numbers(values):
+	"""
+	Целочисленная колонка периодов -> (код YYYYMM int64, причины).
+	Значение до 9999 — год, иначе — код YYYYMM.
+	"""
+	numbers = values.fillna(0).astype(np.int64)
+	codes = numbers.where(numbers > 9999, numbers * 100)
+	year, month = codes // 100, codes % 100
+	reasons = pd.Series(pd.NA, index=values.index, dtype=object)
+	reasons[month > 12] = "Некорректный месяц: " + month[month > 12].astype(str)
+	bad = (year <= 0) | values.isna() | (values % 1 != 0)
+	reasons[bad] = "Некорректный формат периода: " + values[bad].astype(str)
+	return codes.where(reasons.isna(), 0), reasons
+
+
+def _parse_period(value):
+	value = value.strip()
+	if "-" in value and len(value) == 7 and value.count("-") == 1:
+		year_str, month_str = value.split("-")
+		try:
+			year, month = int(year_str), int(month_str)
+		except ValueError:
+			return 0, f"Некорректный формат периода: {value}"
+		if not (1 <= month <= 12):
+			return 0, f"Некорректный месяц: {month}"
+		return period_code(year, month), pd.NA
+	try:
+		year = int(value)
+	except ValueError:
+		return 0, f"Некорректный формат периода: {value}"
+	if year <= 0:
+		return 0, f"Некорректный формат периода: {value}"
+	return period_code(year), pd.NA
+
+
+def period_code(year, month=None):
+	return year * 100 + (month or 0)
+
+
+def split_period_code(code):
+	"""Код YYYYMM -> (year, quarter, month); год — (year, None, None)."""
+	year, month = divmod(int(code), 100)
+	if not month:
+		return year, None, None
+	return year, (month - 1) // 3 + 1, month
+
+
+def cents_to_decimal(cents):
+	return Decimal(int(cents)).scaleb(-2)
+
+
+def decimal_to_cents(amount):
+	return int(Decimal(amount).scaleb(2))
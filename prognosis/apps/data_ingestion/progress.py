@@ -0,0 +1,150 @@
+import json
+import logging
+import time
+
+import redis
+from django.conf import settings
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+
+from .serializers import ImportTaskSerializer
+
+
+logger = logging.getLogger(__name__)
+
+# Ключ снимка задачи; канал Pub/Sub с обновлениями называется так же
+PROGRESS_KEY = "import-progress:{company_id}:{slug}"
+# Статусы, после которых обновлений задачи больше не будет
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+_client = None
+
+
+def get_redis():
+	"""Клиент Redis для канала прогресса (по умолчанию — брокер Celery)."""
+	global _client
+	if _client is None:
+		_client = redis.Redis.from_url(
+			settings.IMPORT_PROGRESS_REDIS_URL,
+			socket_connect_timeout=1,
+			socket_timeout=1,
+			retry=Retry(NoBackoff(), 0),
+		)
+	return _client
+
+
+def progress_key(company_id, slug):
+	return PROGRESS_KEY.format(company_id=company_id, slug=slug)
+
+
+def read_progress(company_ids, slug):
+	"""
+	Снимок задачи импорта из Redis для одной из компаний пользователя.
+	None — снимка нет или Redis недоступен.
+	"""
+	keys = [progress_key(company_id, slug) for company_id in company_ids]
+	if not keys:
+		return None
+	try:
+		values = get_redis().mget(keys)
+	except redis.RedisError:
+		return None
+	for value in values:
+		if value:
+			return json.loads(value)
+	return None
+
+
+class ProgressReporter:
+	"""
+	Прогресс импорта с ограничением частоты записи в БД.
+
+	Счётчики сохраняются в ImportTask не чаще чем раз в every_rows строк
+	или every_seconds секунд, плюс финальный flush(). Каждое обновление
+	публикуется в Redis: снимок для ImportTaskDetailView и сообщение
+	в канал задачи для потока событий (streams.import_progress_events).
+	"""
+
+	def __init__(self, task, every_rows=None, every_seconds=None):
+		self.task = task
+		if every_rows is None:
+			every_rows = settings.IMPORT_PROGRESS_EVERY_ROWS
+		if every_seconds is None:
+			every_seconds = settings.IMPORT_PROGRESS_EVERY_SECONDS
+		self.every_rows = every_rows
+		self.every_seconds = every_seconds
+		self._flushed_rows = task.rows_processed
+		self._flushed_at = time.monotonic()
+		self._snapshot = None
+		self._publish_enabled = True
+
+	def update(self, rows_processed, rows_success, rows_failed):
+		self.task.rows_processed = rows_processed
+		self.task.rows_success = rows_success
+		self.task.rows_failed = rows_failed
+
+		due_rows = rows_processed - self._flushed_rows >= self.every_rows
+		due_time = time.monotonic() - self._flushed_at >= self.every_seconds
+		if due_rows or due_time:
+			self.flush()
+		else:
+			self.publish()
+
+	def flush(self):
+		self.task.save(update_fields=[
+			"rows_total", "rows_processed", "rows_success", "rows_failed"])
+		self._flushed_rows = self.task.rows_processed
+		self._flushed_at = time.monotonic()
+		self.publish()
+
+	def publish(self):
+		"""Снимок задачи в Redis; ошибки канала импорт не прерывают."""
+		if not self._publish_enabled:
+			return
+		key = progress_key(self.task.company_id, self.task.slug)
+		payload = json.dumps(self._build_snapshot(), default=str)
+		try:
+			# Снимок и событие — одним обращением к Redis
+			pipe = get_redis().pipeline(transaction=False)
+			pipe.set(key, payload, ex=settings.IMPORT_PROGRESS_TTL)
+			pipe.publish(key, payload)
+			pipe.execute()
+		except redis.RedisError as e:
+			# Без Redis прогресс виден только через БД
+			logger.warning("Канал прогресса импорта недоступен: %s", e)
+			self._publish_enabled = False
+
+	def refresh(self):
+		"""Следующая публикация сериализует задачу заново, а не только счётчики."""
+		self._snapshot = None
+
+	def clear(self):
+		"""
+		Убирает снимок: после завершения источник истины — ImportTask.
+		Подписчикам канала уходит итоговое состояние задачи.
+		"""
+		key = progress_key(self.task.company_id, self.task.slug)
+		self.refresh()
+		try:
+			pipe = get_redis().pipeline(transaction=False)
+			pipe.publish(key, json.dumps(self._build_snapshot(), default=str))
+			pipe.delete(key)
+			pipe.execute()
+		except redis.RedisError:
+			pass
+
+	def _build_snapshot(self):
+		# Полное представление сериализуется один раз, дальше меняются
+		# только счётчики и статус
+		if self._snapshot is None:
+			self._snapshot = dict(ImportTaskSerializer(self.task).data)
+		task = self.task
+		self._snapshot.update(
+			status=task.status,
+			rows_total=task.rows_total,
+			rows_processed=task.rows_processed,
+			rows_success=task.rows_success,
+			rows_failed=task.rows_failed,
+			progress=ImportTaskSerializer().get_progress(task),
+		)
+		return self._snapshot
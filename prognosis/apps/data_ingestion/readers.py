@@ -0,0 +1,415 @@
+import csv
+import hashlib
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+
+from .engine import COLUMN_AMOUNT, COLUMN_PERIOD
+
+
+# Сколько байт начала файла читать для определения разделителя
+SNIFF_SAMPLE_SIZE = 64 * 1024
+CSV_DELIMITERS = ",;\t|"
+
+
+def sniff_delimiter(path, default=","):
+	"""Определяет разделитель CSV по началу файла."""
+	with open(path, "rb") as f:
+		sample = f.read(SNIFF_SAMPLE_SIZE)
+	text = sample.decode("utf-8-sig", errors="ignore")
+	# Последняя строка может быть обрезана — не показываем её Sniffer
+	if len(sample) == SNIFF_SAMPLE_SIZE and "\n" in text:
+		text = text[:text.rindex("\n")]
+	try:
+		return csv.Sniffer().sniff(text, delimiters=CSV_DELIMITERS).delimiter
+	except csv.Error:
+		return default
+
+
+def file_sha256(file):
+	"""SHA-256 содержимого файла; читается блоками через File.chunks()."""
+	digest = hashlib.sha256()
+	for block in file.chunks():
+		digest.update(block)
+	return digest.hexdigest()
+
+
+@contextmanager
+def uploaded_file_path(upload):
+	"""
+	Путь к загруженному файлу на диске: большие загрузки Django уже
+	держит во временном файле, маленькие (в памяти) сбрасываются в него.
+	"""
+	if hasattr(upload, "temporary_file_path"):
+		yield upload.temporary_file_path()
+		return
+	with tempfile.NamedTemporaryFile(suffix=Path(upload.name).suffix) as tmp:
+		for block in upload.chunks():
+			tmp.write(block)
+		tmp.flush()
+		yield tmp.name
+
+
+# Расширение файла -> ImportTask.file_type
+FILE_TYPES = {
+	".csv": "csv",
+	".xlsx": "excel",
+	".xls": "excel",
+	".parquet": "parquet",
+	".arrow": "arrow",
+	".feather": "arrow",
+	".ipc": "arrow",
+	".zip": "zip",
+}
+# Форматы, которые читаются через pyarrow
+COLUMNAR_FILE_TYPES = {"parquet", "arrow"}
+# Архив — пакет файлов, сам строк не содержит (см. archives)
+ARCHIVE_FILE_TYPE = "zip"
+
+
+def file_type_for(name):
+	"""Тип файла импорта по расширению."""
+	return FILE_TYPES.get(Path(name).suffix.lower(), "csv")
+
+
+def count_csv_rows(path):
+	"""
+	Число записей данных (без заголовка) — в той же нумерации, что
+	у iter_csv_chunks: перевод строки в кавычках запись не делит,
+	пустые строки не считаются. По нему строятся диапазоны шардов.
+	"""
+	with _open_csv(path) as f:
+		records = sum(1 for row in _csv_records(f, sniff_delimiter(path)) if row)
+	return max(records - 1, 0)
+
+
+def _open_csv(path):
+	# newline="" — переводы строк внутри кавычек разбирает csv
+	return open(path, encoding="utf-8-sig", errors="replace", newline="")
+
+
+def _csv_records(f, delimiter):
+	"""
+	Записи CSV через readline: после остановки файл стоит ровно
+	в начале следующей записи, и его можно отдать pandas.
+	"""
+	return csv.reader(iter(f.readline, ""), delimiter=delimiter)
+
+
+def skip_csv_records(f, delimiter, count):
+	"""Пропускает count непустых записей (пустые pandas не нумерует)."""
+	records = _csv_records(f, delimiter)
+	while count:
+		row = next(records, None)
+		if row is None:
+			return
+		if row:
+			count -= 1
+
+
+def strip_frame(df):
+	"""Обрезает пробелы во всех строковых колонках чанка."""
+	for column in df.columns:
+		if df[column].dtype == "object":
+			df[column] = df[column].str.strip()
+	return df
+
+
+def split_frame(df, chunk_size):
+	for start in range(0, len(df), chunk_size):
+		yield df.iloc[start:start + chunk_size]
+
+
+def iter_csv_chunks(path, chunk_size, start=0, stop=None):
+	"""
+	Потоковое чтение CSV чанками по chunk_size строк C-парсером.
+	Разделитель определяется один раз по началу файла; индекс чанков
+	сквозной, поэтому номер строки в файле сохраняется.
+	start/stop — диапазон строк данных (для шардов).
+	"""
+	options = dict(
+		sep=sniff_delimiter(path),
+		dtype=str,
+		keep_default_na=False,
+		engine="c",
+	)
+	columns = pd.read_csv(path, nrows=0, **options).columns
+	with _open_csv(path) as f:
+		# Заголовок и записи до start пропускаются потоком, по записям,
+		# а не по строкам файла — в нумерации индекса pandas. Память
+		# не зависит от смещения (skiprows строит множество номеров)
+		skip_csv_records(f, options["sep"], start + 1)
+		reader = pd.read_csv(
+			f,
+			header=None,
+			names=columns,
+			index_col=False,
+			chunksize=chunk_size,
+			nrows=stop - start if stop is not None else None,
+			**options,
+		)
+		with reader:
+			for chunk in reader:
+				if start:
+					chunk.index += start
+				yield strip_frame(chunk)
+
+
+def open_sheet(path, sheet=""):
+	"""
+	Лист xlsx в режиме read-only: строки читаются потоком из XML,
+	без объектной модели всей книги. sheet — имя или номер листа (с 0),
+	пустая строка — первый лист. Возвращает (книга, лист).
+	"""
+	workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+	try:
+		if not sheet:
+			return workbook, workbook.worksheets[0]
+		if sheet in workbook.sheetnames:
+			return workbook, workbook[sheet]
+		if sheet.isdigit() and int(sheet) < len(workbook.worksheets):
+			return workbook, workbook.worksheets[int(sheet)]
+	except Exception:
+		workbook.close()
+		raise
+	workbook.close()
+	raise ValueError(f"Лист '{sheet}' не найден")
+
+
+def _cell_text(value):
+	if value is None:
+		return ""
+	if isinstance(value, float) and value.is_integer():
+		# 100.0 -> '100', как в CSV
+		return str(int(value))
+	return str(value)
+
+
+def iter_excel_chunks(path, chunk_size, sheet="", start=0):
+	"""
+	Потоковое чтение xlsx чанками по chunk_size строк (values_only).
+	Индекс — номер строки данных, как у iter_csv_chunks: пустые строки
+	пропускаются, но нумерацию не сдвигают. start — с какой строки
+	данных начинать (продолжение прерванного импорта).
+	"""
+	if not str(path).lower().endswith((".xlsx", ".xlsm")):
+		yield from _iter_xls_chunks(path, chunk_size, sheet, start)
+		return
+
+	workbook, worksheet = open_sheet(path, sheet)
+	try:
+		rows = worksheet.iter_rows(values_only=True)
+		header = next(rows, None)
+		if header is None:
+			return
+		columns = [
+			_cell_text(name).strip() or f"Unnamed: {i}"
+			for i, name in enumerate(header)
+		]
+		width = len(columns)
+
+		index, batch = [], []
+		for idx, row in enumerate(rows):
+			if idx < start or all(value is None for value in row):
+				continue
+			cells = [_cell_text(value) for value in row[:width]]
+			cells += [""] * (width - len(cells))
+			index.append(idx)
+			batch.append(cells)
+			if len(batch) == chunk_size:
+				yield _excel_frame(batch, index, columns)
+				index, batch = [], []
+		if batch:
+			yield _excel_frame(batch, index, columns)
+	finally:
+		workbook.close()
+
+
+def _excel_frame(batch, index, columns):
+	return strip_frame(pd.DataFrame(batch, index=index, columns=columns))
+
+
+def _iter_xls_chunks(path, chunk_size, sheet, start):
+	# Старый .xls openpyxl не читает — целиком через pandas
+	sheet_name = int(sheet) if sheet.isdigit() else (sheet or 0)
+	df = pd.read_excel(
+		path, sheet_name=sheet_name, dtype=str, keep_default_na=False)
+	yield from split_frame(strip_frame(df.iloc[start:]), chunk_size)
+
+
+def count_excel_rows(path, sheet=""):
+	"""Оценка числа строк xlsx по размеру листа из его заголовка."""
+	if not str(path).lower().endswith((".xlsx", ".xlsm")):
+		return 0
+	workbook, worksheet = open_sheet(path, sheet)
+	try:
+		return max((worksheet.max_row or 1) - 1, 0)
+	finally:
+		workbook.close()
+
+
+def import_pyarrow():
+	"""pyarrow — необязательная зависимость, нужна только Parquet/Arrow."""
+	try:
+		import pyarrow
+		import pyarrow.ipc  # noqa: F401
+		import pyarrow.parquet  # noqa: F401
+	except ImportError:
+		raise ImportError(
+			"Для импорта Parquet/Arrow нужен пакет pyarrow") from None
+	return pyarrow
+
+
+def iter_parquet_chunks(path, chunk_size, start=0):
+	"""
+	Parquet через memory map, батчами по chunk_size строк. Сумма
+	и период остаются типизированными (см. _arrow_frame).
+	"""
+	pa = import_pyarrow()
+	parquet = pa.parquet.ParquetFile(path, memory_map=True)
+	offset = 0
+	for batch in parquet.iter_batches(batch_size=chunk_size):
+		if offset + batch.num_rows > start:
+			skip = max(start - offset, 0)
+			yield _arrow_frame(
+				pa, pa.Table.from_batches([batch.slice(skip)]), offset + skip)
+		offset += batch.num_rows
+
+
+def iter_arrow_chunks(path, chunk_size, start=0):
+	"""
+	Arrow IPC / Feather v2 через memory map: таблица не копируется
+	в память, чанки — срезы без копирования.
+	"""
+	pa = import_pyarrow()
+	table = _read_arrow(pa, path)
+	for offset in range(start, table.num_rows, chunk_size):
+		yield _arrow_frame(pa, table.slice(offset, chunk_size), offset)
+
+
+def _read_arrow(pa, path):
+	source = pa.memory_map(str(path), "r")
+	try:
+		return pa.ipc.open_file(source).read_all()
+	except pa.ArrowInvalid:
+		# Потоковый формат IPC (без футера)
+		source.seek(0)
+		return pa.ipc.open_stream(source).read_all()
+
+
+def _arrow_frame(pa, table, offset):
+	"""
+	Таблица Arrow -> DataFrame чанка. Числовые суммы и периоды-даты
+	или целые остаются типизированными — engine разбирает их без
+	строк; decimal до 15 знаков точно переводится во float64.
+	Остальные колонки — строки, как у CSV.
+	"""
+	types = pa.types
+	columns = {}
+	for name, values in zip(table.column_names, table.columns):
+		kind = values.type
+		if name == COLUMN_AMOUNT:
+			if types.is_integer(kind) or types.is_floating(kind):
+				columns[name] = values
+				continue
+			if types.is_decimal(kind) and kind.precision <= 15:
+				columns[name] = values.cast(pa.float64())
+				continue
+		if name == COLUMN_PERIOD and (
+			types.is_integer(kind)
+			or types.is_date(kind)
+			or types.is_timestamp(kind)
+		):
+			columns[name] = values
+			continue
+		columns[name] = values.cast(pa.string()).fill_null("")
+
+	df = pa.table(columns).to_pandas(date_as_object=False)
+	df.index += offset
+	return strip_frame(df)
+
+
+def count_columnar_rows(path, file_type):
+	pa = import_pyarrow()
+	if file_type == "parquet":
+		return pa.parquet.ParquetFile(path, memory_map=True).metadata.num_rows
+	return _read_arrow(pa, path).num_rows
+
+
+def estimate_rows(task):
+	if task.file_type == ARCHIVE_FILE_TYPE:
+		# Строки архива — сумма строк файлов, считается при распаковке
+		return 0
+	if task.file_type == "csv":
+		return count_csv_rows(task.file.path)
+	try:
+		if task.file_type in COLUMNAR_FILE_TYPES:
+			return count_columnar_rows(task.file.path, task.file_type)
+		return count_excel_rows(task.file.path, task.sheet)
+	except Exception:
+		# Нечитаемый файл разберёт сам импорт
+		return 0
+
+
+def iter_chunks(task, chunk_size, start=0, stop=None):
+	"""Чанки файла задачи импорта — DataFrame со строковыми колонками."""
+	return iter_file_chunks(
+		task.file.path, task.file_type, chunk_size, task.sheet, start, stop)
+
+
+def iter_file_chunks(
+	path, file_type, chunk_size, sheet="", start=0, stop=None
+):
+	if file_type == "excel":
+		return iter_excel_chunks(path, chunk_size, sheet, start)
+	if file_type == "parquet":
+		return iter_parquet_chunks(path, chunk_size, start)
+	if file_type == "arrow":
+		return iter_arrow_chunks(path, chunk_size, start)
+	return iter_csv_chunks(path, chunk_size, start, stop)
+
+
+def shard_ranges(rows_total, shard_count):
+	"""
+	Диапазоны записей [start, stop) для шардов. У последнего stop=None:
+	хвост файла дочитывает последний шард.
+	"""
+	size = -(-rows_total // shard_count)
+	ranges = []
+	for start in range(0, rows_total, size):
+		ranges.append([start, start + size])
+	ranges[-1][1] = None
+	return [tuple(r) for r in ranges]
+
+
+def reset_peak_rss():
+	"""
+	Сбрасывает пиковый RSS процесса (Linux), чтобы замер относился
+	к текущему импорту, а не ко всей жизни воркера.
+	"""
+	try:
+		with open("/proc/self/clear_refs", "w") as f:
+			f.write("5")
+	except OSError:
+		pass
+
+
+def peak_rss_mb():
+	"""Пиковый RSS процесса в мегабайтах."""
+	try:
+		with open("/proc/self/status") as f:
+			for line in f:
+				if line.startswith("VmHWM:"):
+					return int(line.split()[1]) // 1024
+	except OSError:
+		pass
+	import resource
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# ru_maxrss: килобайты в Linux, байты в macOS
+	if sys.platform == "darwin":
+		return peak // (1024 * 1024)
+	return peak // 1024
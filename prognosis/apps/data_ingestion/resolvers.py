@@ -0,0 +1,96 @@
+from django.conf import settings
+
+from core.models import TimePeriod
+from .parsing import period_code, split_period_code
+
+
+class DimensionResolver:
+	"""
+	Разрешение кодов справочников компании в id.
+
+	Справочник загружается целиком один раз за импорт, если в нём не больше
+	preload_limit записей. Для больших справочников карта строится на каждый
+	чанк — только по кодам, которые в нём встречаются.
+	"""
+
+	def __init__(self, company, preload_limit=None):
+		self.company = company
+		if preload_limit is None:
+			preload_limit = settings.IMPORT_DIMENSION_PRELOAD_LIMIT
+		self.preload_limit = preload_limit
+		self._maps = {}
+		# Справочники больше preload_limit: решение принимается
+		# один раз, count() на каждый чанк не повторяется
+		self._per_chunk = set()
+
+	def resolve(self, model, codes):
+		"""
+		codes — Series кодов, пустая строка означает «не указано».
+		Возвращает Series id (Int64, <NA> для пустых и неизвестных)
+		и маску строк с неизвестным кодом.
+		"""
+		present = codes != ""
+		mapping = self._mapping(model, set(codes[present].unique()))
+		ids = codes.map(mapping).astype("Int64")
+		unknown = present & ids.isna()
+		return ids, unknown
+
+	def _mapping(self, model, codes):
+		if model in self._maps:
+			return self._maps[model]
+
+		queryset = model.objects.filter(company=self.company)
+		if model not in self._per_chunk:
+			if queryset.count() <= self.preload_limit:
+				self._maps[model] = dict(queryset.values_list("code", "id"))
+				return self._maps[model]
+			self._per_chunk.add(model)
+
+		if not codes:
+			return {}
+		return dict(queryset.filter(code__in=codes).values_list("code", "id"))
+
+
+class PeriodResolver:
+	"""
+	Карта кода периода YYYYMM (YYYY00 — год) -> id периода компании.
+	Недостающие периоды создаются при первом обращении; с create=False
+	(проверочный прогон) их id остаются пустыми.
+	"""
+
+	def __init__(self, company, create=True):
+		self.company = company
+		self.create = create
+		self._ids = None
+
+	def resolve(self, codes):
+		"""codes — Series кодов YYYYMM; возвращает Series id."""
+		if self._ids is None:
+			self._ids = {}
+			periods = TimePeriod.objects.filter(
+				company=self.company
+			).values_list("id", "year", "quarter", "month")
+			for pk, year, quarter, month in periods:
+				# Квартальные периоды импорт не адресует
+				if month or quarter is None:
+					self._ids[period_code(year, month)] = pk
+
+		if self.create:
+			for code in set(codes.unique()) - self._ids.keys():
+				year, quarter, month = split_period_code(code)
+				period, _ = TimePeriod.objects.get_or_create(
+					company=self.company,
+					year=year,
+					quarter=quarter,
+					month=month,
+				)
+				self._ids[code] = period.id
+
+		return codes.map(self._ids)
+
+	def reset(self):
+		"""
+		Сбрасывает карту: периоды, созданные в откатившейся транзакции,
+		не должны достаться следующему файлу архива.
+		"""
+		self._ids = None
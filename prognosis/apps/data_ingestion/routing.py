@@ -0,0 +1,55 @@
+"""
+Маршрутизация задач импорта по очередям Celery.
+
+Тяжёлые импорты (большие файлы, архивы, шарды) идут в очередь
+imports_heavy, остальные — в imports_light, чтобы импорт на миллионы
+строк не задерживал мелкие. Подключается в CELERY_TASK_ROUTES.
+"""
+from django.conf import settings
+
+from .models import ImportTask
+from .readers import ARCHIVE_FILE_TYPE
+
+
+HEAVY_QUEUE = "imports_heavy"
+LIGHT_QUEUE = "imports_light"
+
+# Средний размер строки файла в байтах — оценка числа строк
+# без чтения файла (xlsx и parquet сжаты)
+BYTES_PER_ROW = {
+	"csv": 40,
+	"excel": 20,
+	"parquet": 8,
+	"arrow": 30,
+}
+
+
+def estimated_rows(task):
+	"""Число строк задачи: посчитанное, иначе — оценка по размеру файла."""
+	if task.rows_total:
+		return task.rows_total
+	try:
+		size = task.file.size
+	except (OSError, ValueError):
+		return 0
+	return size // BYTES_PER_ROW.get(task.file_type, BYTES_PER_ROW["csv"])
+
+
+def import_queue(task):
+	if task.file_type == ARCHIVE_FILE_TYPE:
+		return HEAVY_QUEUE
+	if estimated_rows(task) >= settings.IMPORT_HEAVY_MIN_ROWS:
+		return HEAVY_QUEUE
+	return LIGHT_QUEUE
+
+
+def route_import_task(name, args, kwargs, options, task=None, **kw):
+	"""Роутер Celery: очередь process_import_task — по объёму файла."""
+	if name != "data_ingestion.tasks.process_import_task":
+		return None
+	task_id = args[0] if args else kwargs.get("task_id")
+	import_task = ImportTask.objects.filter(id=task_id).only(
+		"file", "file_type", "rows_total").first()
+	if import_task is None:
+		return None
+	return {"queue": import_queue(import_task)}
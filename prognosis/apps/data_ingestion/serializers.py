@@ -1,11 +1,20 @@
+from importlib.util import find_spec
+
 from rest_framework import serializers
-from .models import ImportTask
+from .models import ImportRowError, ImportTask
+from .readers import (
+	ARCHIVE_FILE_TYPE, COLUMNAR_FILE_TYPES, FILE_TYPES, file_type_for
+)
 
 
 class ImportTaskCreateSerializer(serializers.ModelSerializer):
+	# Только проверка файла: задача не создаётся, отчёт — в ответе
+	dry_run = serializers.BooleanField(
+		required=False, default=False, write_only=True)
+
 	class Meta:
 		model = ImportTask
-		fields = ("file", "scenario")
+		fields = ("file", "scenario", "backend", "sheet", "mode", "dry_run")
 
 	def validate_file(self, value):
 		if value is None:
@@ -13,11 +22,15 @@ class ImportTaskCreateSerializer(serializers.ModelSerializer):
 
 		# Проверяем расширение
 		file_name = value.name.lower()
-		allowed_extensions = {'.csv', '.xls', '.xlsx'}
-		if not any(file_name.endswith(ext) for ext in allowed_extensions):
+		if not any(file_name.endswith(ext) for ext in FILE_TYPES):
 			raise serializers.ValidationError(
-				"Поддерживаются только файлы с расширениями: .csv, .xls, .xlsx"
+				"Поддерживаются только файлы с расширениями: "
+				+ ", ".join(FILE_TYPES)
 			)
+		columnar = file_type_for(file_name) in COLUMNAR_FILE_TYPES
+		if columnar and find_spec("pyarrow") is None:
+			raise serializers.ValidationError(
+				"Импорт Parquet/Arrow недоступен: не установлен pyarrow")
 
 		# Ограничение размера
 		max_size = 50 * 1024 * 1024  # 50 MB
@@ -26,10 +39,47 @@ class ImportTaskCreateSerializer(serializers.ModelSerializer):
 
 		return value
 
+	def validate(self, attrs):
+		archive = file_type_for(attrs["file"].name) == ARCHIVE_FILE_TYPE
+		if attrs.get("dry_run") and archive:
+			raise serializers.ValidationError({
+				"dry_run": "Проверочный прогон для архивов не поддерживается"})
+		return attrs
+
+	def create(self, validated_data):
+		validated_data.pop("dry_run", None)
+		return super().create(validated_data)
+
+
+class ImportTaskFileSerializer(serializers.ModelSerializer):
+	"""Результат по одному файлу архива."""
+
+	class Meta:
+		model = ImportTask
+		fields = (
+			"slug",
+			"file",
+			"file_type",
+			"status",
+			"rows_total",
+			"rows_processed",
+			"rows_success",
+			"rows_failed",
+			"rows_inserted",
+			"rows_updated",
+			"rows_unchanged",
+			"rows_deleted",
+			"error_log",
+			"started_at",
+			"finished_at")
+		read_only_fields = fields
+
 
 class ImportTaskSerializer(serializers.ModelSerializer):
 	progress = serializers.SerializerMethodField()
 	scenario_name = serializers.CharField(source="scenario.name", read_only=True)
+	# Файлы ZIP-архива; у обычной задачи список пуст
+	children = ImportTaskFileSerializer(many=True, read_only=True)
 
 	class Meta:
 		model = ImportTask
@@ -40,13 +90,26 @@ class ImportTaskSerializer(serializers.ModelSerializer):
 			"rows_processed",
 			"rows_success",
 			"rows_failed",
+			"rows_inserted",
+			"rows_updated",
+			"rows_unchanged",
+			"rows_deleted",
 			"error_log",
+			"cancel_requested",
+			"peak_memory_mb",
 			"started_at",
 			"finished_at",
 			"created_by",
-			"company")
+			"company",
+			"parent")
 
 	def get_progress(self, obj):
 		if obj.rows_total == 0:
 			return 0
 		return round((obj.rows_processed / obj.rows_total) * 100, 1)
+
+
+class ImportRowErrorSerializer(serializers.ModelSerializer):
+	class Meta:
+		model = ImportRowError
+		fields = ("row", "column", "code", "message")
@@ -0,0 +1,101 @@
+import pandas as pd
+
+from .engine import LINE_KEY_FIELDS, FinancialLineWriter
+from .models import ImportRowError, ImportStagingLine
+from .parsing import cents_to_decimal, decimal_to_cents
+
+
+class StagingWriter:
+	"""
+	Writer для ImportEngine: строки пишутся в ImportStagingLine.
+	Таблица без уникальных ограничений, поэтому параллельные шарды
+	не блокируют друг друга.
+	"""
+
+	def __init__(self, task, batch_size):
+		self.task = task
+		self.batch_size = batch_size
+
+	def write(self, frame):
+		keys = frame[list(LINE_KEY_FIELDS)]
+		objs = []
+		for idx, key, cents in zip(
+			frame.index, keys.itertuples(index=False), frame["cents"]
+		):
+			values = {
+				field: None if pd.isna(value) else int(value)
+				for field, value in zip(LINE_KEY_FIELDS, key)
+			}
+			objs.append(ImportStagingLine(
+				task=self.task,
+				row_number=idx,
+				amount=cents_to_decimal(cents),
+				**values,
+			))
+		ImportStagingLine.objects.bulk_create(objs, batch_size=self.batch_size)
+
+
+class RowErrorWriter:
+	"""error_writer для ImportEngine: ошибки чанка — одним bulk_create."""
+
+	def __init__(self, task, batch_size):
+		self.task = task
+		self.batch_size = batch_size
+		self.max_message = ImportRowError._meta.get_field(
+			"message").max_length
+
+	def write(self, errors):
+		ImportRowError.objects.bulk_create([
+			ImportRowError(
+				task=self.task,
+				row=error.row,
+				column=error.column or "",
+				code=error.code,
+				message=error.message[:self.max_message],
+			)
+			for error in errors
+		], batch_size=self.batch_size)
+
+
+def merge_staging(task, chunk_size):
+	"""
+	Переносит строки задачи из ImportStagingLine в FinancialLine
+	в порядке строк файла с учётом режима задачи (task.mode).
+	replace удаляет отсутствующие строки, только если в файле
+	не было ошибок (task.rows_failed). Вызывать внутри transaction.atomic().
+	Возвращает FinancialLineWriter со счётчиками записи.
+	"""
+	writer = FinancialLineWriter(
+		task.company, task.scenario, chunk_size, task.mode)
+	rows = ImportStagingLine.objects.filter(
+		task=task
+	).order_by("row_number").values_list(
+		"row_number", *LINE_KEY_FIELDS, "amount")
+	columns = ["row_number", *LINE_KEY_FIELDS, "cents"]
+
+	batch = []
+	for row in rows.iterator(chunk_size=chunk_size):
+		batch.append((*row[:-1], decimal_to_cents(row[-1])))
+		if len(batch) == chunk_size:
+			writer.write(_frame(batch, columns))
+			batch = []
+	if batch:
+		writer.write(_frame(batch, columns))
+	if task.mode == "replace" and not task.rows_failed:
+		writer.delete_missing()
+	return writer
+
+
+def clear_staging(task):
+	ImportStagingLine.objects.filter(task=task).delete()
+
+
+def clear_row_errors(task):
+	"""Ошибки строк прежней попытки — перед импортом файла с начала."""
+	ImportRowError.objects.filter(task=task).delete()
+
+
+def _frame(rows, columns):
+	# object — чтобы id и NULL не превращались во float
+	frame = pd.DataFrame(rows, columns=columns, dtype=object)
+	return frame.set_index("row_number")
@@ -0,0 +1,122 @@
+"""
+Поток прогресса импорта (Server-Sent Events).
+
+Воркер публикует каждое обновление задачи в канал Redis (см.
+progress.ProgressReporter), асинхронное представление пересылает
+сообщения канала клиенту. БД читается при подключении — проверка
+доступа и начальное состояние (повторно — если после подписки снимка
+в Redis нет); дальше наблюдатель стоит только подписки в Redis.
+Работает под ASGI (prognosis.asgi).
+"""
+import functools
+import json
+
+import redis
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import ImportTask
+from .progress import FINISHED_STATUSES, progress_key
+from .serializers import ImportTaskSerializer
+
+
+async def import_progress_events(request, slug):
+	"""
+	GET .../imports/<slug>/events/ — text/event-stream с событиями
+	progress (JSON как у ImportTaskDetailView). Поток закрывается после
+	события с итоговым статусом. EventSource не умеет передавать
+	заголовки, поэтому access-токен принимается и в ?token=.
+	"""
+	user = await sync_to_async(_user)(request)
+	if user is None:
+		return JsonResponse(
+			{"detail": "Учетные данные не были предоставлены."}, status=401)
+
+	task = await sync_to_async(_task_state)(user, slug)
+	if task is None:
+		return JsonResponse({"detail": "Не найдено."}, status=404)
+
+	reload = functools.partial(sync_to_async(_task_state), user, slug)
+	response = StreamingHttpResponse(
+		_events(progress_key(task["company"], slug), task, reload),
+		content_type="text/event-stream")
+	response["Cache-Control"] = "no-cache"
+	# Без буферизации в nginx события доходят сразу
+	response["X-Accel-Buffering"] = "no"
+	return response
+
+
+def _user(request):
+	"""
+	Пользователь access-токена. Как в JWTAuthentication: удалённый
+	или неактивный пользователь с живым токеном не проходит.
+	"""
+	header = request.headers.get("Authorization", "")
+	prefix = "Bearer "
+	raw = header[len(prefix):] if header.startswith(prefix) else None
+	raw = raw or request.GET.get("token")
+	if not raw:
+		return None
+	try:
+		return JWTAuthentication().get_user(AccessToken(raw))
+	except (TokenError, AuthenticationFailed):
+		return None
+
+
+def _task_state(user, slug):
+	task = ImportTask.objects.filter(
+		slug=slug,
+		company__user_roles__user=user,
+	).select_related("scenario").first()
+	if task is None:
+		return None
+	return ImportTaskSerializer(task).data
+
+
+async def _events(key, task, reload):
+	client = aioredis.Redis.from_url(settings.IMPORT_PROGRESS_REDIS_URL)
+	pubsub = client.pubsub()
+	try:
+		try:
+			# Подписка до чтения снимка — обновление между ними не потеряется
+			await pubsub.subscribe(key)
+			snapshot = await client.get(key)
+		except redis.RedisError:
+			# Без Redis отдаём состояние из БД, клиент вернётся к поллингу
+			yield _event(task)
+			return
+
+		if snapshot:
+			state = json.loads(snapshot)
+		else:
+			# Снимка нет — задача могла завершиться (и удалить снимок)
+			# после первого чтения из БД: итоговое событие уже ушло
+			# до подписки, поэтому состояние читается заново
+			state = await reload() or task
+		yield _event(state)
+		while state["status"] not in FINISHED_STATUSES:
+			try:
+				message = await pubsub.get_message(
+					ignore_subscribe_messages=True,
+					timeout=settings.IMPORT_PROGRESS_HEARTBEAT)
+			except redis.RedisError:
+				return
+			if message is None:
+				# Комментарий SSE держит соединение открытым через прокси
+				yield ": keepalive\n\n"
+				continue
+			state = json.loads(message["data"])
+			yield _event(state)
+	finally:
+		await pubsub.aclose()
+		await client.aclose()
+
+
+def _event(state):
+	return f"event: progress\ndata: {json.dumps(state, default=str)}\n\n"
@@ -1,170 +1,485 @@
-from celery import shared_task
-from decimal import Decimal
-import pandas as pd
-from django.db import transaction
+from datetime import timedelta
+from pathlib import Path
+
+from celery import chord, shared_task
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, transaction
+from django.db.models import F
 from django.utils import timezone
 
+from accounts.models import Company
+from .archives import extract_archive
+from .backends import copy_enabled, make_engine
+from .cancellation import ImportCancelled, check_cancelled
+from .engine import ImportEngine, RowError
 from .models import ImportTask
-from financials.models import FinancialLine
-from dimensions.models import (
-	BudgetArticle, CostCenter,
-	Department, Project, ChartOfAccounts
+from .progress import FINISHED_STATUSES, ProgressReporter
+from .readers import (
+	ARCHIVE_FILE_TYPE, estimate_rows, iter_chunks, peak_rss_mb,
+	reset_peak_rss, shard_ranges
+)
+from .resolvers import DimensionResolver, PeriodResolver
+from .staging import (
+	RowErrorWriter, StagingWriter, clear_row_errors, clear_staging,
+	merge_staging
 )
-from core.models import TimePeriod
 
 
-@shared_task(bind=True, max_retries=3, default_retry_delay=60)
-def process_import_task(self, task_id):
+@shared_task(
+	bind=True,
+	max_retries=3,
+	default_retry_delay=60,
+	acks_late=True,
+	reject_on_worker_lost=True)
+def process_import_task(self, task_id, deferrals=0):
 	"""
 	Асинхронная обработка импорта финансовых данных из Excel/CSV.
-	Поддерживает создание/обновление строк,
-	обработку ошибок по строкам и прогресс.
+	Повторная доставка продолжает импорт с контрольной точки;
+	deferrals — сколько раз задача уже откладывалась очередью компании.
 	"""
 	try:
 		# Блокируем задачу, чтобы избежать гонки
-		task = ImportTask.objects.select_for_update().get(id=task_id)
+		# (select_for_update работает только внутри транзакции)
+		with transaction.atomic():
+			task = ImportTask.objects.select_for_update().get(id=task_id)
+			if task.status in FINISHED_STATUSES:
+				return  # повторная доставка или задача отменена в очереди
+
+			# processing — повтор после сбоя, продолжаем с контрольной точки
+			resuming = task.status == "processing"
+			leased = resuming and _lease_alive(task)
+			deferred = not resuming and _tenant_busy(task)
+			if deferred and deferrals >= settings.TENANT_MAX_DEFERRALS:
+				# Очередь компании не освобождается — не ждём бесконечно
+				task.status = "failed"
+				task.error_log = "Не дождались очереди импортов компании"
+				task.finished_at = timezone.now()
+				task.save(update_fields=["status", "error_log", "finished_at"])
+				return
+			if not leased and not deferred:
+				if not resuming:
+					task.status = "processing"
+					task.started_at = timezone.now()
+					task.rows_total = estimate_rows(task)
+				task.heartbeat_at = timezone.now()
+				task.save(update_fields=[
+					"status", "started_at", "rows_total", "heartbeat_at"])
 	except ImportTask.DoesNotExist:
 		return  # задача удалена — ничего не делаем
 
-	# Начало обработки
-	task.status = "processing"
-	task.started_at = timezone.now()
-	task.save(update_fields=["status", "started_at"])
+	if leased:
+		# Импорт ещё идёт (повторная доставка при acks_late):
+		# проверим снова, когда аренда может истечь
+		process_import_task.apply_async(
+			(task_id,), countdown=settings.IMPORT_LEASE_SECONDS)
+		return
+
+	if deferred:
+		process_import_task.apply_async(
+			(task_id,), {"deferrals": deferrals + 1},
+			countdown=settings.TENANT_DEFER_SECONDS)
+		return
 
-	errors = []
-	success = 0
+	if _should_shard(task):
+		if resuming:
+			# Шарды продлевают аренду задачи; раз она истекла, прежний
+			# chord не дошёл до конца — запускаем шарды заново
+			clear_staging(task)
+			task.rows_processed = 0
+			task.save(update_fields=["rows_processed"])
+		clear_row_errors(task)
+		ranges = shard_ranges(task.rows_total, settings.IMPORT_SHARD_COUNT)
+		# Если шард упадёт вне своего try или потеряется, колбэк chord
+		# не вызовется — задачу завершает fail_import_task
+		chord(
+			process_import_shard.s(task.id, start, stop)
+			for start, stop in ranges
+		)(finalize_import_task.s(task.id).on_error(
+			fail_import_task.s(task.id)))
+		return
 
+	retrying = False
 	try:
-		with transaction.atomic():
-			# Чтение файла — всё как строки,
-			# чтобы избежать автоматических преобразований
-			if task.file_type == "excel":
-				df = pd.read_excel(task.file.path, dtype=str, keep_default_na=False)
-			else:  # csv
-				df = pd.read_csv(
-					task.file.path,
-					dtype=str,
-					keep_default_na=False,
-					sep=None,
-					engine="python")
-
-			# Убираем пустые строки и пробелы
-			df = df.dropna(how="all")
-			df = df.apply(lambda x: x.str.strip() if x.dtype == "object" else x)
-
-			task.rows_total = len(df)
-			task.save(update_fields=["rows_total"])
-
-			for idx, row in df.iterrows():
-				try:
-					# Обязательные поля
-					article_code = row.get("Статья")
-					if not article_code:
-						raise ValueError("Колонка 'Статья' обязательна")
-
-					period_str = row.get("Период")
-					if not period_str:
-						raise ValueError("Колонка 'Период' обязательна")
-
-					amount_str = row.get("Сумма")
-					if not amount_str:
-						raise ValueError("Колонка 'Сумма' обязательна")
-					amount_val = Decimal(str(amount_str).replace(",", "."))
-
-					# Получаем справочники
-					article = BudgetArticle.objects.get(
-						company=task.company,
-						code=article_code)
-
-					# Парсинг периода
-					period_str = period_str.strip()
-					if "-" in period_str and len(
-						period_str) == 7 and period_str.count("-") == 1:
-						year_str, month_str = period_str.split("-")
-						year, month = int(year_str), int(month_str)
-						if not (1 <= month <= 12):
-							raise ValueError(f"Некорректный месяц: {month}")
-						quarter = (month - 1) // 3 + 1
-						period, _ = TimePeriod.objects.get_or_create(
-							company=task.company,
-							year=year,
-							quarter=quarter,
-							month=month,
-						)
-					else:
-						try:
-							year = int(period_str)
-						except ValueError:
-							raise ValueError(f"Некорректный формат периода: {period_str}")
-						period, _ = TimePeriod.objects.get_or_create(
-							company=task.company,
-							year=year,
-							quarter=None,
-							month=None,
-						)
-
-					# Опциональные измерения (пример — расширь по необходимости)
-					cost_center = None
-					if row.get("ЦФО"):
-						cc_code = str(row["ЦФО"]).strip()
-						if cc_code:
-							cost_center = CostCenter.objects.get(company=task.company, code=cc_code)
-
-					department = None
-					if row.get("Подразделение"):
-						dept_code = str(row["Подразделение"]).strip()
-						if dept_code:
-							department = Department.objects.get(
-								company=task.company,
-								code=dept_code)
-
-					project = None
-					if row.get("Проект"):
-						proj_code = str(row["Проект"]).strip()
-						if proj_code:
-							project = Project.objects.get(company=task.company, code=proj_code)
-
-					account = None
-					if row.get("Счет"):
-						acc_code = str(row["Счет"]).strip()
-						if acc_code:
-							account = ChartOfAccounts.objects.get(
-								company=task.company,
-								code=acc_code)
-
-					# Создаём или обновляем финансовую строку
-					obj, created = FinancialLine.objects.update_or_create(
-						company=task.company,
-						scenario=task.scenario,
-						period=period,
-						article=article,
-						cost_center=cost_center,
-						department=department,
-						project=project,
-						account=account,
-						defaults={"amount": amount_val},
-					)
-					success += 1
-
-				except Exception as e:
-					errors.append(f"Строка {idx + 2}: {str(e)}")
-
-				# Обновляем прогресс после каждой строки
-				task.rows_processed = idx + 1
-				task.rows_success = success
-				task.rows_failed = len(errors)
-				task.save(update_fields=["rows_processed", "rows_success", "rows_failed"])
-
-			# Финальный статус
-			task.status = "completed" if not errors else "failed"
-			if errors:
-				task.error_log = "\n".join(errors[:200])
+		# Файл читается потоково, чанками по IMPORT_CHUNK_SIZE строк:
+		# пиковая память не зависит от размера файла
+		reset_peak_rss()
+		if task.file_type == ARCHIVE_FILE_TYPE:
+			_run_archive(task)
+		elif copy_enabled(task):
+			_run_copy(task)
+		else:
+			_run_checkpointed(task)
+
+	except ImportCancelled as e:
+		_cancel(task, e)
+
+	except OperationalError as e:
+		# Потеряно соединение с БД — повтор продолжит с контрольной точки
+		if self.request.retries < self.max_retries:
+			retrying = True
+			_release(task)
+			raise self.retry(exc=e)
+		_fail(task, e)
 
 	except Exception as e:
 		# Критическая ошибка (например, файл не читается)
+		_fail(task, e)
+
+	finally:
+		if not retrying:
+			task.finished_at = timezone.now()
+			task.peak_memory_mb = peak_rss_mb()
+			task.save(update_fields=[
+				*RESULT_FIELDS, "peak_memory_mb", "finished_at"])
+			ProgressReporter(task).clear()
+
+
+@shared_task
+def fail_import_task(request, exc, traceback, task_id):
+	"""
+	Обработчик ошибки chord шардов: finalize_import_task не будет
+	вызван, поэтому задача завершается ошибкой здесь.
+	"""
+	with transaction.atomic():
+		task = ImportTask.objects.select_for_update().filter(
+			id=task_id).first()
+		if task is None or task.status in FINISHED_STATUSES:
+			return
+		_fail(task, exc)
+		task.finished_at = timezone.now()
+		task.save(update_fields=[*RESULT_FIELDS, "finished_at"])
+	ProgressReporter(task).clear()
+
+
+def _run_archive(task):
+	"""
+	Файлы архива импортируются по очереди, каждый — своей дочерней
+	задачей. Справочники и карта периодов общие на весь архив.
+	Ошибка одного файла не останавливает остальные; после каждого
+	файла счётчики архива пересчитываются как сумма по файлам.
+	Отмена останавливает текущий файл, остальные не импортируются.
+	"""
+	children = extract_archive(task)
+	reporter = ProgressReporter(task)
+	resolver = DimensionResolver(task.company)
+	periods = PeriodResolver(task.company)
+
+	for child in children:
+		if child.status not in ("completed", "failed"):
+			_run_child(child, resolver, periods)
+		_sum_children(task, children)
+		reporter.refresh()
+		reporter.flush()
+		check_cancelled(task)
+
+	failed = [child for child in children if child.status == "failed"]
+	task.status = "failed" if failed else "completed"
+	lines = []
+	for child in failed:
+		first_error, _, _ = child.error_log.partition("\n")
+		lines.append(f"{Path(child.file.name).name}: {first_error}")
+	task.error_log = "\n".join(lines)
+
+
+def _run_child(child, resolver, periods):
+	"""Импорт одного файла архива с общими справочниками."""
+	if child.status != "processing":
+		child.status = "processing"
+		child.started_at = timezone.now()
+		child.save(update_fields=["status", "started_at"])
+	try:
+		if copy_enabled(child):
+			_run_copy(child, resolver=resolver, periods=periods)
+		else:
+			_run_checkpointed(child, resolver=resolver, periods=periods)
+	except OperationalError:
+		# Повтор задачи архива продолжит этот файл с контрольной точки
+		raise
+	except ImportCancelled as e:
+		_cancel(child, e)
+	except Exception as e:
+		_fail(child, e)
+		periods.reset()
+	child.finished_at = timezone.now()
+	child.save(update_fields=[*RESULT_FIELDS, "finished_at"])
+	ProgressReporter(child).clear()
+
+
+def _sum_children(task, children):
+	fields = ("rows_processed", "rows_success", "rows_failed")
+	for field in (*fields, *WRITE_STATS_FIELDS):
+		setattr(task, field, sum(getattr(child, field) for child in children))
+	task.rows_total = sum(child.rows_total for child in children)
+
+
+def _run_checkpointed(task, **engine_kwargs):
+	"""
+	Импорт с контрольными точками. Проверенные строки чанка пишутся
+	в ImportStagingLine и в той же транзакции фиксируются счётчики
+	и checkpoint_row — номер записи данных (не строки файла: CSV
+	пропускается по записям), с которой продолжать.
+	В FinancialLine строки переносятся в конце одной транзакцией,
+	вместе с очисткой промежуточной таблицы.
+	"""
+	reporter = ProgressReporter(task)
+
+	engine = ImportEngine(task, **engine_kwargs)
+	engine.writer = StagingWriter(task, engine.chunk_size)
+	engine.error_writer = RowErrorWriter(task, engine.chunk_size)
+	if task.checkpoint_row:
+		# После повтора счётчики и ошибки продолжаются с контрольной точки
+		engine.rows_processed = task.rows_processed
+		engine.success = task.rows_success
+		engine.rows_failed = task.rows_failed
+		engine.restore_errors(
+			RowError(*values) for values in task.row_errors.order_by(
+				"row", "id").values_list("row", "column", "code", "message")
+			.iterator(chunk_size=engine.chunk_size))
+	else:
+		clear_row_errors(task)
+
+	chunks = iter_chunks(task, engine.chunk_size, start=task.checkpoint_row)
+	for chunk in chunks:
+		check_cancelled(task)
+		with transaction.atomic():
+			_beat(task)
+			engine.process_chunk(chunk)
+			task.checkpoint_row = int(chunk.index[-1]) + 1
+			task.rows_processed = engine.rows_processed
+			task.rows_success = engine.success
+			task.rows_failed = engine.rows_failed
+			task.error_log = "\n".join(engine.error_lines(200))
+			task.save(update_fields=CHECKPOINT_FIELDS)
+		reporter.publish()
+
+	check_cancelled(task)
+	with transaction.atomic():
+		_beat(task)
+		writer = merge_staging(task, engine.chunk_size)
+		clear_staging(task)
+	_complete(task, engine, writer)
+
+
+def _run_copy(task, **engine_kwargs):
+	"""
+	COPY-импорт: весь файл — одна транзакция, без контрольных точек.
+	Отмена откатывает транзакцию целиком.
+	"""
+	with transaction.atomic():
+		_beat(task)
+		clear_row_errors(task)
+		# Счётчики пишутся в БД с ограничением частоты,
+		# живой прогресс — в Redis
+		reporter = ProgressReporter(task)
+
+		engine = make_engine(task, **engine_kwargs)
+		engine.error_writer = RowErrorWriter(task, engine.chunk_size)
+		for chunk in iter_chunks(task, engine.chunk_size):
+			check_cancelled(task)
+			engine.process_chunk(chunk)
+			reporter.update(
+				engine.rows_processed,
+				engine.success,
+				engine.rows_failed)
+		check_cancelled(task)
+		engine.finish()
+		_complete(task, engine, engine.writer)
+		reporter.flush()
+
+
+def _beat(task):
+	"""
+	Продлевает аренду задачи, для файла архива — и аренду архива.
+	UPDATE держит блокировку строки до конца транзакции: повторная
+	доставка ждёт её и затем видит свежую отметку.
+	"""
+	task.heartbeat_at = timezone.now()
+	ImportTask.objects.filter(
+		id__in=[task.id, task.parent_id]
+	).update(heartbeat_at=task.heartbeat_at)
+
+
+def _lease_alive(task):
+	"""Задачу ведёт другой воркер: отметка свежее IMPORT_LEASE_SECONDS."""
+	lease = timedelta(seconds=settings.IMPORT_LEASE_SECONDS)
+	return (
+		task.heartbeat_at is not None
+		and timezone.now() - task.heartbeat_at < lease)
+
+
+def _release(task):
+	"""Снимает аренду перед self.retry: повтор продолжит сразу."""
+	try:
+		ImportTask.objects.filter(
+			id__in=[task.id, task.parent_id]).update(heartbeat_at=None)
+	except DatabaseError:
+		pass  # соединения нет — повтор дождётся истечения аренды
+
+
+def _complete(task, engine, writer):
+	task.rows_total = engine.rows_processed
+	task.rows_processed = engine.rows_processed
+	task.rows_success = engine.success
+	task.rows_failed = engine.rows_failed
+	_set_write_stats(task, writer)
+
+	# Финальный статус
+	task.status = "completed" if not engine.rows_failed else "failed"
+	task.error_log = "\n".join(engine.error_lines(200))
+
+
+def _fail(task, error):
+	# Компенсация: промежуточные строки задачи удаляются,
+	# FinancialLine до слияния не менялась
+	clear_staging(task)
+	task.status = "failed"
+	task.checkpoint_row = 0
+	task.error_log = f"Критическая ошибка: {str(error)}"
+
+
+def _cancel(task, error):
+	# Как при ошибке: промежуточные строки удаляются,
+	# необработанные файлы архива тоже отменяются
+	clear_staging(task)
+	task.status = "cancelled"
+	task.checkpoint_row = 0
+	task.error_log = str(error)
+	task.children.exclude(status__in=FINISHED_STATUSES).update(
+		status="cancelled", finished_at=timezone.now())
+
+
+CHECKPOINT_FIELDS = [
+	"checkpoint_row", "rows_processed", "rows_success",
+	"rows_failed", "error_log"]
+
+
+WRITE_STATS_FIELDS = (
+	"rows_inserted", "rows_updated", "rows_unchanged", "rows_deleted")
+
+
+# Поля, которые сохраняются по завершении задачи
+RESULT_FIELDS = (
+	"status", "rows_total", "rows_processed", "rows_success",
+	"rows_failed", "checkpoint_row", "error_log", *WRITE_STATS_FIELDS)
+
+
+def _set_write_stats(task, writer):
+	task.rows_inserted = writer.inserted
+	task.rows_updated = writer.updated
+	task.rows_unchanged = writer.unchanged
+	task.rows_deleted = writer.deleted
+
+
+def _tenant_busy(task):
+	"""
+	У компании задачи уже занят лимит одновременных импортов.
+	Блокировка строки компании упорядочивает захват задач одной
+	компании, чтобы два воркера не превысили лимит вместе.
+	Импорт без свежей отметки воркера (воркер убит) лимит не занимает.
+	"""
+	limit = settings.IMPORT_TENANT_CONCURRENCY
+	if not limit:
+		return False
+	Company.objects.select_for_update().filter(id=task.company_id).first()
+	running = ImportTask.objects.filter(
+		company_id=task.company_id,
+		parent__isnull=True,
+		status="processing",
+		heartbeat_at__gte=timezone.now() - timedelta(
+			seconds=settings.IMPORT_LEASE_SECONDS),
+	).count()
+	return running >= limit
+
+
+def _should_shard(task):
+	return (
+		task.file_type == "csv"
+		and settings.IMPORT_SHARD_COUNT > 1
+		and task.rows_total >= settings.IMPORT_SHARD_MIN_ROWS
+	)
+
+
+@shared_task
+def process_import_shard(task_id, start, stop):
+	"""
+	Шард параллельного импорта: строки [start, stop) проверяются
+	и складываются в ImportStagingLine. FinancialLine шард не трогает,
+	поэтому шарды не конкурируют за уникальный индекс.
+	Исключения не пробрасываются — их разбирает finalize_import_task.
+	"""
+	task = ImportTask.objects.select_related(
+		"company", "scenario").get(id=task_id)
+	reset_peak_rss()
+	try:
+		engine = ImportEngine(task)
+		engine.writer = StagingWriter(task, engine.chunk_size)
+		engine.error_writer = RowErrorWriter(task, engine.chunk_size)
+		for chunk in iter_chunks(task, engine.chunk_size, start, stop):
+			check_cancelled(task)
+			_beat(task)
+			engine.process_chunk(chunk)
+		ImportTask.objects.filter(id=task_id).update(
+			rows_processed=F("rows_processed") + engine.rows_processed)
+	except ImportCancelled:
+		return {"cancelled": True}
+	except Exception as e:
+		return {"critical": f"Строки {start + 2}+: {str(e)}"}
+
+	return {
+		"rows_processed": engine.rows_processed,
+		"rows_success": engine.success,
+		"rows_failed": engine.rows_failed,
+		"errors": engine.error_lines(200),
+		"peak_memory_mb": peak_rss_mb(),
+	}
+
+
+@shared_task
+def finalize_import_task(results, task_id):
+	"""
+	Колбэк chord: суммирует результаты шардов и одной транзакцией
+	переносит промежуточные строки в FinancialLine. Если хотя бы один
+	шард упал или импорт отменён, в FinancialLine не пишется ничего.
+	"""
+	task = ImportTask.objects.select_related(
+		"company", "scenario").get(id=task_id)
+	critical = [r["critical"] for r in results if r.get("critical")]
+
+	try:
+		if any(r.get("cancelled") for r in results):
+			raise ImportCancelled("Импорт отменён")
+		check_cancelled(task)
+		if critical:
+			raise RuntimeError("; ".join(critical))
+
+		task.rows_processed = sum(r["rows_processed"] for r in results)
+		task.rows_success = sum(r["rows_success"] for r in results)
+		task.rows_failed = sum(r["rows_failed"] for r in results)
+		task.rows_total = task.rows_processed
+		task.peak_memory_mb = max(r["peak_memory_mb"] for r in results)
+
+		with transaction.atomic():
+			writer = merge_staging(task, settings.IMPORT_CHUNK_SIZE)
+		_set_write_stats(task, writer)
+
+		task.status = "completed" if not task.rows_failed else "failed"
+		if task.rows_failed:
+			errors = [line for r in results for line in r["errors"]]
+			task.error_log = "\n".join(errors[:200])
+
+	except ImportCancelled as e:
+		task.status = "cancelled"
+		task.error_log = str(e)
+
+	except Exception as e:
 		task.status = "failed"
 		task.error_log = f"Критическая ошибка: {str(e)}"
 
 	finally:
+		clear_staging(task)
 		task.finished_at = timezone.now()
-		task.save(update_fields=["status", "error_log", "finished_at"])
+		task.save(update_fields=[
+			"status", "rows_total", "rows_processed", "rows_success",
+			"rows_failed", *WRITE_STATS_FIELDS, "error_log",
+			"peak_memory_mb", "finished_at"])
+		ProgressReporter(task).clear()
@@ -38,3 +38,18 @@ class TestImportTaskAdmin:
         assert obj.status == "pending"
         assert obj.file_type == "excel"
         assert obj.company == self.company1
+
+    def test_cancel_imports_action(self, monkeypatch):
+        scenario = Scenario.objects.create(company=self.company1, name="B2025", type="budget", version=1)
+        pending = ImportTask.objects.create(company=self.company1, scenario=scenario)
+        done = ImportTask.objects.create(company=self.company1, scenario=scenario, status="completed")
+        messages = []
+        monkeypatch.setattr(self.admin, "message_user", lambda request, message: messages.append(message))
+
+        self.admin.cancel_imports(self.request, ImportTask.objects.all())
+
+        pending.refresh_from_db()
+        done.refresh_from_db()
+        assert pending.status == "cancelled"
+        assert done.status == "completed"
+        assert messages == ["Отмена запрошена для задач: 1"]
@@ -0,0 +1,92 @@
+import pytest
+from decimal import Decimal
+from django.core.files.base import ContentFile
+from django.db import connection
+
+from accounts.models import Company
+from core.models import Scenario
+from dimensions.models import BudgetArticle
+from financials.models import FinancialLine
+from data_ingestion.backends import CopyImportEngine, make_engine
+from data_ingestion.engine import ImportEngine
+from data_ingestion.models import ImportTask
+from data_ingestion.tasks import process_import_task
+
+
+@pytest.fixture
+def task(db):
+    company = Company.objects.create(name="C1")
+    scenario = Scenario.objects.create(
+        company=company, name="B2025", type="budget", version=1)
+    BudgetArticle.add_root(company=company, code="A1", name="Article 1")
+    task = ImportTask(
+        company=company, scenario=scenario, file_type="csv", backend="copy")
+    task.file.save(
+        "import.csv",
+        ContentFile("Статья,Период,Сумма\nA1,2025-01,100.50\n".encode()))
+    task.save()
+    return task
+
+
+@pytest.mark.skipif(
+    connection.vendor == "postgresql", reason="проверка запасного пути")
+def test_copy_backend_falls_back_to_orm(task):
+    engine = make_engine(task)
+    assert type(engine) is ImportEngine
+
+    process_import_task(task.id)
+
+    task.refresh_from_db()
+    assert task.status == "completed"
+    assert task.rows_success == 1
+    line = FinancialLine.objects.get(company=task.company)
+    assert line.amount == Decimal("100.50")
+
+
+def test_orm_backend_is_default(task):
+    task.backend = "orm"
+    assert type(make_engine(task)) is ImportEngine
+
+
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="COPY только в PostgreSQL")
+def test_copy_backend_updates_and_reports_unknown_codes(task):
+    task.file.save(
+        "import.csv",
+        ContentFile((
+            "Статья,Период,Сумма\n"
+            "A1,2025-01,100.50\n"
+            "A1,2025-01,7.00\n"
+            "ZZ,2025-01,1.00\n"
+        ).encode()))
+    engine = make_engine(task)
+    assert isinstance(engine, CopyImportEngine)
+
+    process_import_task(task.id)
+
+    task.refresh_from_db()
+    assert task.rows_success == 2
+    assert task.rows_failed == 1
+    assert "код 'ZZ' не найден (строки 4)" in task.error_log
+    line = FinancialLine.objects.get(company=task.company)
+    assert line.amount == Decimal("7.00")
+
+
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="COPY только в PostgreSQL")
+def test_copy_backend_accepts_empty_optional_dimensions(task):
+    task.file.save(
+        "import.csv",
+        ContentFile((
+            "Статья,Период,Сумма,ЦФО,Отдел,Проект,Счёт\n"
+            "A1,2025-01,100.50,,,,\n"
+        ).encode()))
+
+    process_import_task(task.id)
+
+    task.refresh_from_db()
+    assert task.status == "completed"
+    assert task.rows_success == 1
+    line = FinancialLine.objects.get(company=task.company)
+    assert line.cost_center is None
+    assert line.account is None
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+from django.core.management import call_command
+
+from data_ingestion.benchmark import BenchmarkConfig, generate_rows, run_benchmark
+from data_ingestion.models import ImportTask
+from financials.models import FinancialLine
+
+
+def test_generate_rows_is_reproducible():
+    config = BenchmarkConfig(rows=50, articles=3, error_rate=0.2, seed=7)
+    rows = list(generate_rows(config))
+    assert rows == list(generate_rows(config))
+    assert {row[0] for row in rows} <= {"A0", "A1", "A2"}
+    assert any(row[4] == "n/a" for row in rows)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("file_type", ["csv", "excel"])
+def test_run_benchmark_reports_metrics_and_rolls_back(file_type):
+    config = BenchmarkConfig(file_type=file_type, rows=300, articles=10, cost_centers=5, departments=3, chunk_size=100)
+
+    result = run_benchmark(config)
+
+    assert result["rows_success"] + result["rows_failed"] == 300
+    assert result["rows_failed"] > 0
+    assert result["rows_per_sec"] > 0
+    assert result["queries"] > 0
+    assert not ImportTask.objects.exists()
+    assert not FinancialLine.objects.exists()
+
+
+@pytest.mark.django_db
+def test_benchmark_command_writes_json(tmp_path):
+    output = tmp_path / "bench.json"
+    call_command(
+        "benchmark_import", "--rows", "100", "--format", "csv",
+        "--articles", "5", "--cost-centers", "2", "--departments", "2",
+        "--output", str(output))
+
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert report["database"]
+    assert [r["rows"] for r in report["results"]] == [100]
@@ -0,0 +1,167 @@
+import pytest
+import pandas as pd
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+
+from accounts.models import Company
+from core.models import Scenario, TimePeriod
+from dimensions.models import BudgetArticle, CostCenter
+from financials.models import FinancialLine
+from data_ingestion.engine import ImportEngine
+from data_ingestion.models import ImportTask
+from data_ingestion.readers import split_frame
+
+
+User = get_user_model()
+
+
+def make_frame(rows):
+    df = pd.DataFrame(rows, dtype=str)
+    return df.fillna("")
+
+
+@pytest.mark.django_db
+class TestImportEngine:
+    def setup_method(self):
+        self.user = User.objects.create_user(email="u@example.com", password="p")
+        self.company = Company.objects.create(name="C1")
+        self.scenario = Scenario.objects.create(
+            company=self.company,
+            name="B2025",
+            type="budget",
+            version=1,
+        )
+        self.article = BudgetArticle.add_root(company=self.company, code="A1", name="Article 1")
+        self.cost_center = CostCenter.objects.create(company=self.company, code="CC1", name="CC 1")
+        self.task = ImportTask.objects.create(
+            company=self.company,
+            scenario=self.scenario,
+            created_by=self.user,
+            file_type="csv",
+        )
+
+    def run_engine(self, df, chunk_size=2):
+        engine = ImportEngine(self.task, chunk_size=chunk_size)
+        for chunk in split_frame(df, chunk_size):
+            engine.process_chunk(chunk)
+        return engine
+
+    def test_updates_existing_line_with_empty_dimensions(self):
+        period = TimePeriod.objects.create(company=self.company, year=2025, quarter=1, month=1)
+        line = FinancialLine.objects.create(
+            company=self.company,
+            scenario=self.scenario,
+            period=period,
+            article=self.article,
+            amount=Decimal("1.00"),
+        )
+
+        engine = self.run_engine(make_frame([
+            {"Статья": "A1", "Период": "2025-01", "Сумма": "10,50"},
+        ]))
+
+        assert engine.success == 1
+        assert engine.errors == []
+        line.refresh_from_db()
+        assert line.amount == Decimal("10.50")
+        assert FinancialLine.objects.count() == 1
+
+    def test_collects_row_errors_and_writes_valid_rows(self):
+        engine = self.run_engine(make_frame([
+            {"Статья": "A1", "Период": "2025-01", "Сумма": "1", "ЦФО": "CC1"},
+            {"Статья": "NOPE", "Период": "2025-01", "Сумма": "2", "ЦФО": ""},
+            {"Статья": "A1", "Период": "2025-13", "Сумма": "3", "ЦФО": ""},
+            {"Статья": "A1", "Период": "2025-02", "Сумма": "", "ЦФО": ""},
+            {"Статья": "A1", "Период": "2025-03", "Сумма": "5", "ЦФО": "CC9"},
+        ]))
+
+        assert engine.rows_processed == 5
+        assert engine.success == 1
+        assert engine.rows_failed == 4
+        assert engine.error_lines() == [
+            "Статья: код 'NOPE' не найден (строки 3)",
+            "ЦФО: код 'CC9' не найден (строки 6)",
+            "Строка 4: Некорректный месяц: 13",
+            "Строка 5: Колонка 'Сумма' обязательна",
+        ]
+        line = FinancialLine.objects.get()
+        assert line.cost_center == self.cost_center
+
+    def test_duplicate_keys_in_file_last_row_wins(self):
+        engine = self.run_engine(make_frame([
+            {"Статья": "A1", "Период": "2025", "Сумма": "1"},
+            {"Статья": "A1", "Период": "2025", "Сумма": "2"},
+            {"Статья": "A1", "Период": "2025", "Сумма": "3"},
+        ]))
+
+        assert engine.success == 3
+        line = FinancialLine.objects.get()
+        assert line.amount == Decimal("3")
+        assert line.period.month is None
+
+    def test_query_count_does_not_grow_with_rows(self, django_assert_max_num_queries):
+        df = make_frame([
+            {"Статья": "A1", "Период": f"2025-{m:02d}", "Сумма": str(m)}
+            for m in range(1, 13)
+        ] * 20)
+        TimePeriod.objects.bulk_create([
+            TimePeriod(company=self.company, year=2025, quarter=(m - 1) // 3 + 1, month=m)
+            for m in range(1, 13)
+        ])
+        engine = ImportEngine(self.task, chunk_size=len(df))
+        with django_assert_max_num_queries(20):
+            engine.process_chunk(df)
+        assert engine.success == 240
+        assert FinancialLine.objects.count() == 12
+
+    def test_delta_mode_skips_unchanged_lines(self):
+        self.run_engine(make_frame([
+            {"Статья": "A1", "Период": "2025-01", "Сумма": "1"},
+            {"Статья": "A1", "Период": "2025-02", "Сумма": "2"},
+        ]))
+        unchanged = FinancialLine.objects.get(period__month=1)
+
+        self.task.mode = "delta"
+        engine = self.run_engine(make_frame([
+            {"Статья": "A1", "Период": "2025-01", "Сумма": "1.00"},
+            {"Статья": "A1", "Период": "2025-02", "Сумма": "5"},
+            {"Статья": "A1", "Период": "2025-03", "Сумма": "3"},
+        ]))
+
+        writer = engine.writer
+        assert (writer.inserted, writer.updated, writer.unchanged) == (1, 1, 1)
+        assert FinancialLine.objects.get(period__month=1).updated_at == unchanged.updated_at
+        assert FinancialLine.objects.get(period__month=2).amount == Decimal("5")
+
+    def test_replace_mode_deletes_lines_missing_in_file_periods(self):
+        self.run_engine(make_frame([
+            {"Статья": "A1", "Период": "2025-01", "Сумма": "1", "ЦФО": ""},
+            {"Статья": "A1", "Период": "2025-01", "Сумма": "2", "ЦФО": "CC1"},
+            {"Статья": "A1", "Период": "2025-02", "Сумма": "3", "ЦФО": ""},
+        ]))
+
+        self.task.mode = "replace"
+        engine = self.run_engine(make_frame([
+            {"Статья": "A1", "Период": "2025-01", "Сумма": "1", "ЦФО": ""},
+        ]))
+        engine.finish()
+
+        assert engine.writer.unchanged == 1
+        assert engine.writer.deleted == 1
+        # Период 2025-02 в файле не встречался — его строки не трогаем
+        assert sorted(FinancialLine.objects.values_list("period__month", flat=True)) == [1, 2]
+
+    def test_accepts_typed_columns(self):
+        df = pd.DataFrame({
+            "Статья": ["A1", "A1", "A1"],
+            "Период": pd.to_datetime(["2025-01-15", "2025-02-01", None]),
+            "Сумма": [10.5, 2.0, 3.0],
+        })
+
+        engine = self.run_engine(df, chunk_size=3)
+
+        assert engine.success == 2
+        assert [e.code for e in engine.row_errors] == ["required"]
+        amounts = FinancialLine.objects.order_by("period__month").values_list(
+            "amount", flat=True)
+        assert list(amounts) == [Decimal("10.50"), Decimal("2.00")]
@@ -0,0 +1,73 @@
+import pandas as pd
+from decimal import Decimal
+
+from data_ingestion.parsing import (
+    amounts_from_numbers, cents_to_decimal, parse_amounts, parse_periods,
+    periods_from_dates, periods_from_numbers, split_period_code
+)
+
+
+def test_parse_amounts_to_exact_cents():
+    values = pd.Series(["100.50", "100,5", "-12", "+0,07", ",5", "1.005", "1.015", "1.0051", "0"])
+    cents, reasons = parse_amounts(values)
+    assert cents.tolist() == [10050, 10050, -1200, 7, 50, 100, 102, 101, 0]
+    assert reasons.isna().all()
+
+
+def test_parse_amounts_reports_invalid_values():
+    values = pd.Series(["abc", "1.2.3", "-", "1 000", "12345678901234567", "NaN"])
+    cents, reasons = parse_amounts(values)
+    assert reasons.tolist() == [f"Некорректная сумма: {v}" for v in values]
+    assert (cents == 0).all()
+
+
+def test_parse_amounts_matches_decimal_for_valid_rows():
+    values = pd.Series(["0.01", "99999999.99", "-5,555", "7.125"])
+    cents, _ = parse_amounts(values)
+    expected = [
+        Decimal(v.replace(",", ".")).quantize(Decimal("0.01"))
+        for v in values
+    ]
+    assert [cents_to_decimal(c) for c in cents] == expected
+
+
+def test_parse_periods():
+    values = pd.Series(["2025-04", "2025", "2025-13", "2025/04", "Q1", "2025-4"])
+    codes, reasons = parse_periods(values)
+    assert codes[:2].tolist() == [202504, 202500]
+    assert reasons.tolist() == [
+        pd.NA, pd.NA,
+        "Некорректный месяц: 13",
+        "Некорректный формат периода: 2025/04",
+        "Некорректный формат периода: Q1",
+        "Некорректный формат периода: 2025-4",
+    ]
+
+
+def test_amounts_from_numbers():
+    values = pd.Series([100.5, -12, 0.07, 1.005, float("nan"), 1e17])
+    cents, reasons = amounts_from_numbers(values)
+    assert cents[:4].tolist() == [10050, -1200, 7, 100]
+    assert reasons[:4].isna().all()
+    assert reasons[4:].notna().all()
+
+
+def test_periods_from_numbers():
+    values = pd.Series([202504, 2025, 202513, 0, 2025.5])
+    codes, reasons = periods_from_numbers(values)
+    assert codes[:2].tolist() == [202504, 202500]
+    assert reasons[:2].isna().all()
+    assert reasons[2] == "Некорректный месяц: 13"
+    assert reasons[3:].notna().all()
+
+
+def test_periods_from_dates():
+    values = pd.Series(pd.to_datetime(["2025-04-01", None, "2024-12-31"]))
+    codes, reasons = periods_from_dates(values)
+    assert codes.tolist() == [202504, 0, 202412]
+    assert reasons.isna().tolist() == [True, False, True]
+
+
+def test_split_period_code():
+    assert split_period_code(202504) == (2025, 2, 4)
+    assert split_period_code(202500) == (2025, None, None)
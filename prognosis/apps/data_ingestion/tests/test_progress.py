@@ -0,0 +1,221 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import Company, UserCompanyRole
+from core.models import Scenario
+from data_ingestion import progress, streams
+from data_ingestion.models import ImportTask
+from data_ingestion.progress import ProgressReporter, progress_key
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.published = []
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        pass
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(progress, "_client", client)
+    return client
+
+
+@pytest.mark.django_db
+class TestProgressReporter:
+    def setup_method(self):
+        self.user = get_user_model().objects.create_user(email="u@example.com", password="p")
+        self.company = Company.objects.create(name="C1")
+        UserCompanyRole.objects.create(user=self.user, company=self.company, role="admin")
+        self.scenario = Scenario.objects.create(company=self.company, name="B2025", type="budget", version=1)
+        self.task = ImportTask.objects.create(
+            company=self.company,
+            scenario=self.scenario,
+            created_by=self.user,
+            status="processing",
+            rows_total=100,
+        )
+
+    def test_flushes_to_db_only_every_n_rows(self, fake_redis, django_assert_num_queries):
+        reporter = ProgressReporter(self.task, every_rows=50, every_seconds=3600)
+        reporter.publish()  # первое представление задачи
+
+        with django_assert_num_queries(0):
+            reporter.update(20, 20, 0)
+            reporter.update(40, 39, 1)
+        with django_assert_num_queries(1):
+            reporter.update(60, 59, 1)
+
+        self.task.refresh_from_db()
+        assert self.task.rows_processed == 60
+        key = progress_key(self.company.id, self.task.slug)
+        assert b'"rows_processed": 60' in fake_redis.data[key].encode()
+
+    def test_detail_view_reads_snapshot_while_running(self, fake_redis):
+        reporter = ProgressReporter(self.task, every_rows=1000, every_seconds=3600)
+        reporter.update(30, 30, 0)
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        url = reverse("data_ingestion:import-detail", kwargs={"slug": self.task.slug})
+        resp = client.get(url)
+        assert resp.status_code == 200
+        assert resp.data["rows_processed"] == 30
+        assert resp.data["progress"] == 30.0
+
+        reporter.clear()
+        resp = client.get(url)
+        assert resp.data["rows_processed"] == 0
+
+    def test_unavailable_redis_does_not_break_import(self, settings, monkeypatch):
+        monkeypatch.setattr(progress, "_client", None)
+        settings.IMPORT_PROGRESS_REDIS_URL = "redis://127.0.0.1:1/0"
+        reporter = ProgressReporter(self.task, every_rows=10, every_seconds=3600)
+        reporter.update(20, 20, 0)
+        self.task.refresh_from_db()
+        assert self.task.rows_processed == 20
+
+
+class FakeAsyncRedis:
+    """Канал с заранее опубликованными сообщениями."""
+
+    def __init__(self, snapshot, messages):
+        self.snapshot = snapshot
+        self.messages = list(messages)
+        self.subscribed = []
+        self.closed = False
+
+    def pubsub(self):
+        return self
+
+    async def subscribe(self, channel):
+        self.subscribed.append(channel)
+
+    async def get(self, key):
+        return self.snapshot
+
+    async def get_message(self, ignore_subscribe_messages, timeout):
+        if not self.messages:
+            return None
+        return {"data": json.dumps(self.messages.pop(0))}
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.mark.django_db
+class TestProgressEvents:
+    def setup_method(self):
+        self.user = get_user_model().objects.create_user(email="u@example.com", password="p")
+        self.company = Company.objects.create(name="C1")
+        UserCompanyRole.objects.create(user=self.user, company=self.company, role="admin")
+        scenario = Scenario.objects.create(company=self.company, name="B2025", type="budget", version=1)
+        self.task = ImportTask.objects.create(
+            company=self.company, scenario=scenario, created_by=self.user, status="processing", rows_total=100)
+
+    def stream(self, monkeypatch, client, **params):
+        monkeypatch.setattr(streams.aioredis.Redis, "from_url", lambda url: client)
+        url = reverse("data_ingestion:import-events", kwargs={"slug": self.task.slug})
+        request = RequestFactory().get(url, params)
+        response = async_to_sync(streams.import_progress_events)(request, self.task.slug)
+
+        async def collect():
+            return [chunk async for chunk in response.streaming_content]
+
+        return response, async_to_sync(collect)()
+
+    def test_streams_updates_until_finished(self, monkeypatch, settings, django_assert_max_num_queries):
+        settings.IMPORT_PROGRESS_HEARTBEAT = 0
+        snapshot = json.dumps({"status": "processing", "rows_processed": 10})
+        client = FakeAsyncRedis(snapshot, [
+            {"status": "processing", "rows_processed": 50},
+            {"status": "completed", "rows_processed": 100},
+            {"status": "completed", "rows_processed": 100},
+        ])
+        token = str(AccessToken.for_user(self.user))
+
+        with django_assert_max_num_queries(3):
+            response, chunks = self.stream(monkeypatch, client, token=token)
+
+        assert response["Content-Type"] == "text/event-stream"
+        events = [json.loads(c.decode().split("data: ", 1)[1]) for c in chunks]
+        assert [e["rows_processed"] for e in events] == [10, 50, 100]
+        assert client.subscribed == [progress_key(self.company.id, self.task.slug)]
+        assert client.closed
+
+    def test_finished_task_sends_state_from_db_and_closes(self, monkeypatch):
+        self.task.status = "completed"
+        self.task.save()
+        client = FakeAsyncRedis(None, [{"status": "processing"}])
+        token = str(AccessToken.for_user(self.user))
+
+        _, chunks = self.stream(monkeypatch, client, token=token)
+
+        assert len(chunks) == 1
+        assert '"status": "completed"' in chunks[0].decode()
+
+    def test_task_finished_before_subscribe_closes_stream(self, monkeypatch):
+        task_id = self.task.id
+
+        class FinishingRedis(FakeAsyncRedis):
+            async def subscribe(self, channel):
+                # Итоговое событие ушло и снимок удалён до подписки
+                await sync_to_async(ImportTask.objects.filter(id=task_id).update)(status="completed")
+                await super().subscribe(channel)
+
+        client = FinishingRedis(None, [])
+        token = str(AccessToken.for_user(self.user))
+
+        _, chunks = self.stream(monkeypatch, client, token=token)
+
+        assert len(chunks) == 1
+        assert '"status": "completed"' in chunks[0].decode()
+
+    def test_requires_token(self, monkeypatch):
+        response = async_to_sync(streams.import_progress_events)(
+            RequestFactory().get("/"), self.task.slug)
+        assert response.status_code == 401
+
+    def test_rejects_inactive_user(self):
+        token = str(AccessToken.for_user(self.user))
+        self.user.is_active = False
+        self.user.save()
+
+        response = async_to_sync(streams.import_progress_events)(
+            RequestFactory().get("/", {"token": token}), self.task.slug)
+        assert response.status_code == 401
+
+    def test_publish_sends_event_to_channel(self, fake_redis):
+        reporter = ProgressReporter(self.task, every_rows=1000, every_seconds=3600)
+        reporter.update(30, 30, 0)
+        self.task.status = "completed"
+        reporter.clear()
+
+        key = progress_key(self.company.id, self.task.slug)
+        assert [(c, m["status"]) for c, m in fake_redis.published] == [(key, "processing"), (key, "completed")]
+        assert key not in fake_redis.data
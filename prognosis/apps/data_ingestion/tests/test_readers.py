@@ -0,0 +1,173 @@
+import openpyxl
+import pandas as pd
+import pytest
+
+from data_ingestion.readers import (
+    count_columnar_rows, count_csv_rows, count_excel_rows, file_type_for,
+    iter_arrow_chunks, iter_csv_chunks, iter_excel_chunks,
+    iter_parquet_chunks, peak_rss_mb, shard_ranges, sniff_delimiter
+)
+
+
+def write_csv(tmp_path, content, name="import.csv"):
+    path = tmp_path / name
+    path.write_text(content, encoding="utf-8")
+    return str(path)
+
+
+def test_sniff_delimiter_semicolon(tmp_path):
+    path = write_csv(tmp_path, "Статья;Период;Сумма\nA1;2025-01;100,50\n")
+    assert sniff_delimiter(path) == ";"
+
+
+def test_sniff_delimiter_falls_back_to_comma(tmp_path):
+    path = write_csv(tmp_path, "Статья\nA1\n")
+    assert sniff_delimiter(path) == ","
+
+
+def test_iter_csv_chunks_keeps_row_numbers_and_strips(tmp_path):
+    rows = "".join(f" A{i} ;2025-01; {i} \n" for i in range(5))
+    path = write_csv(tmp_path, "Статья;Период;Сумма\n" + rows)
+
+    chunks = list(iter_csv_chunks(path, chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert chunks[2].index.tolist() == [4]
+    assert chunks[1]["Статья"].tolist() == ["A2", "A3"]
+    assert chunks[0]["Сумма"].tolist() == ["0", "1"]
+
+
+def test_count_csv_rows(tmp_path):
+    assert count_csv_rows(write_csv(tmp_path, "h\n1\n2\n")) == 2
+    assert count_csv_rows(write_csv(tmp_path, "h\n1\n2", "b.csv")) == 2
+    assert count_csv_rows(write_csv(tmp_path, "", "c.csv")) == 0
+
+
+def test_peak_rss_mb_is_positive():
+    assert peak_rss_mb() > 0
+
+
+def write_xlsx(tmp_path, sheets):
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in sheets.items():
+        worksheet = workbook.create_sheet(title)
+        for row in rows:
+            worksheet.append(row)
+    path = tmp_path / "import.xlsx"
+    workbook.save(path)
+    return str(path)
+
+
+def test_iter_excel_chunks_streams_rows_as_text(tmp_path):
+    path = write_xlsx(tmp_path, {"Данные": [
+        ["Статья", "Период", "Сумма"],
+        [" A1 ", "2025-01", 100.5],
+        [None, None, None],
+        ["A2", 2025, 200.0],
+        ["A3", "2025-02"],
+    ]})
+
+    chunks = list(iter_excel_chunks(path, chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    # Пустая строка пропущена, но номера строк не сдвинулись
+    assert chunks[0].index.tolist() == [0, 2]
+    assert chunks[0]["Статья"].tolist() == ["A1", "A2"]
+    assert chunks[0]["Период"].tolist() == ["2025-01", "2025"]
+    assert chunks[0]["Сумма"].tolist() == ["100.5", "200"]
+    assert chunks[1]["Сумма"].tolist() == [""]
+
+
+def test_iter_excel_chunks_selects_sheet(tmp_path):
+    path = write_xlsx(tmp_path, {
+        "Первый": [["Статья"], ["A1"]],
+        "План": [["Статья"], ["B1"], ["B2"]],
+    })
+
+    by_name = list(iter_excel_chunks(path, 10, sheet="План"))
+    by_index = list(iter_excel_chunks(path, 10, sheet="1"))
+
+    assert by_name[0]["Статья"].tolist() == ["B1", "B2"]
+    assert by_index[0]["Статья"].tolist() == ["B1", "B2"]
+    assert count_excel_rows(path, "План") == 2
+    with pytest.raises(ValueError, match="Лист 'Факт' не найден"):
+        list(iter_excel_chunks(path, 10, sheet="Факт"))
+
+
+def test_file_type_for():
+    assert file_type_for("a/b.CSV") == "csv"
+    assert file_type_for("b.xls") == "excel"
+    assert file_type_for("b.parquet") == "parquet"
+    assert file_type_for("b.feather") == "arrow"
+
+
+def arrow_table():
+    pa = pytest.importorskip("pyarrow")
+    return pa, pa.table({
+        "Статья": ["A1", None, "A3"],
+        "Период": pa.array([202501, 2025, 202503], pa.int32()),
+        "Сумма": [100.5, 200.0, None],
+    })
+
+
+def test_iter_parquet_chunks_keeps_typed_columns(tmp_path):
+    pa, table = arrow_table()
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "import.parquet")
+    pq.write_table(table, path, row_group_size=2)
+
+    chunks = list(iter_parquet_chunks(path, 2))
+
+    assert [chunk.index.tolist() for chunk in chunks] == [[0, 1], [2]]
+    assert chunks[0]["Статья"].tolist() == ["A1", ""]
+    assert chunks[0]["Период"].tolist() == [202501, 2025]
+    assert chunks[0]["Сумма"].tolist() == [100.5, 200.0]
+    assert count_columnar_rows(path, "parquet") == 3
+
+
+def test_iter_arrow_chunks_reads_feather(tmp_path):
+    pa, table = arrow_table()
+    feather = pytest.importorskip("pyarrow.feather")
+    path = str(tmp_path / "import.feather")
+    feather.write_feather(table, path)
+
+    chunks = list(iter_arrow_chunks(path, 2, start=1))
+
+    assert [chunk.index.tolist() for chunk in chunks] == [[1, 2]]
+    assert chunks[0]["Период"].tolist() == [2025, 202503]
+    assert count_columnar_rows(path, "arrow") == 3
+
+
+def test_iter_csv_chunks_reads_shard_range(tmp_path):
+    rows = "".join(f"A{i},2025-01,{i}\n" for i in range(6))
+    path = tmp_path / "import.csv"
+    path.write_bytes(("﻿Статья,Период,Сумма\n" + rows).encode("utf-8"))
+
+    chunks = list(iter_csv_chunks(str(path), chunk_size=2, start=2, stop=5))
+
+    assert [chunk.index.tolist() for chunk in chunks] == [[2, 3], [4]]
+    assert chunks[0]["Статья"].tolist() == ["A2", "A3"]
+    assert list(chunks[0].columns) == ["Статья", "Период", "Сумма"]
+
+
+def test_csv_shards_count_records_not_lines(tmp_path):
+    # Пустая строка и перевод строки в кавычках не сдвигают нумерацию
+    path = write_csv(tmp_path, (
+        "Статья,Период,Сумма,Комментарий\n"
+        "A0,2025-01,0,\n"
+        "\n"
+        "A1,2025-01,1,\"две\nстроки\"\n"
+        "A2,2025-01,2,\n"
+        "A3,2025-01,3,\n"
+    ))
+    assert count_csv_rows(path) == 4
+
+    shards = [
+        pd.concat(iter_csv_chunks(path, chunk_size=2, start=start, stop=stop))
+        for start, stop in shard_ranges(count_csv_rows(path), 2)
+    ]
+
+    assert [shard.index.tolist() for shard in shards] == [[0, 1], [2, 3]]
+    assert [code for shard in shards for code in shard["Статья"]] == ["A0", "A1", "A2", "A3"]
+    assert shards[0]["Комментарий"].tolist() == ["", "две\nстроки"]
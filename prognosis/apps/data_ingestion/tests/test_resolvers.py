@@ -0,0 +1,56 @@
+import pytest
+import pandas as pd
+
+from accounts.models import Company
+from core.models import TimePeriod
+from dimensions.models import CostCenter
+from data_ingestion.resolvers import DimensionResolver, PeriodResolver
+
+
+@pytest.mark.django_db
+class TestDimensionResolver:
+    def setup_method(self):
+        self.company = Company.objects.create(name="C1")
+        self.other = Company.objects.create(name="C2")
+        self.cc1 = CostCenter.objects.create(company=self.company, code="CC1", name="CC 1")
+        self.cc2 = CostCenter.objects.create(company=self.company, code="CC2", name="CC 2")
+        CostCenter.objects.create(company=self.other, code="CC3", name="Foreign")
+
+    def test_resolves_column_and_marks_unknown_codes(self):
+        resolver = DimensionResolver(self.company)
+        codes = pd.Series(["CC1", "", "CC3", "CC2", "CC1"])
+
+        ids, unknown = resolver.resolve(CostCenter, codes)
+
+        assert ids.tolist() == [self.cc1.id, pd.NA, pd.NA, self.cc2.id, self.cc1.id]
+        assert unknown.tolist() == [False, False, True, False, False]
+
+    def test_small_catalog_is_loaded_once(self, django_assert_num_queries):
+        resolver = DimensionResolver(self.company, preload_limit=10)
+        with django_assert_num_queries(2):
+            resolver.resolve(CostCenter, pd.Series(["CC1"]))
+        with django_assert_num_queries(0):
+            resolver.resolve(CostCenter, pd.Series(["CC2", "CC9"]))
+
+    def test_large_catalog_is_queried_per_chunk(self, django_assert_num_queries):
+        resolver = DimensionResolver(self.company, preload_limit=1)
+        with django_assert_num_queries(2):
+            ids, _ = resolver.resolve(CostCenter, pd.Series(["CC2"]))
+        assert ids.tolist() == [self.cc2.id]
+        # Размер справочника проверяется один раз — дальше только коды чанка
+        with django_assert_num_queries(1):
+            ids, _ = resolver.resolve(CostCenter, pd.Series(["CC1"]))
+        assert ids.tolist() == [self.cc1.id]
+
+
+@pytest.mark.django_db
+def test_period_resolver_creates_missing_periods_once():
+    company = Company.objects.create(name="C1")
+    existing = TimePeriod.objects.create(company=company, year=2025, month=1)
+    resolver = PeriodResolver(company)
+
+    ids = resolver.resolve(pd.Series([202501, 202500, 202501]))
+
+    yearly = TimePeriod.objects.get(company=company, year=2025, month=None)
+    assert ids.tolist() == [existing.id, yearly.id, existing.id]
+    assert TimePeriod.objects.filter(company=company).count() == 2
@@ -0,0 +1,93 @@
+import pytest
+from datetime import timedelta
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from accounts.models import Company
+from core.models import Scenario
+from data_ingestion import tasks
+from data_ingestion.models import ImportTask
+from data_ingestion.routing import (
+    HEAVY_QUEUE, LIGHT_QUEUE, import_queue, route_import_task
+)
+
+
+@pytest.mark.django_db
+class TestImportRouting:
+    def setup_method(self):
+        self.company = Company.objects.create(name="C1")
+        self.scenario = Scenario.objects.create(company=self.company, name="B2025", type="budget", version=1)
+
+    def make_task(self, content=b"", file_type="csv", name="import.csv", **fields):
+        task = ImportTask(company=self.company, scenario=self.scenario, file_type=file_type, **fields)
+        task.file.save(name, ContentFile(content))
+        task.save()
+        return task
+
+    def test_queue_by_estimated_rows(self, settings):
+        settings.IMPORT_HEAVY_MIN_ROWS = 100
+        small = self.make_task(b"x" * 40 * 99)
+        big = self.make_task(b"x" * 40 * 100)
+        counted = self.make_task(b"x", rows_total=500)
+
+        assert import_queue(small) == LIGHT_QUEUE
+        assert import_queue(big) == HEAVY_QUEUE
+        assert import_queue(counted) == HEAVY_QUEUE
+
+    def test_archive_goes_to_heavy_queue(self):
+        archive = self.make_task(b"PK", file_type="zip", name="close.zip")
+        assert import_queue(archive) == HEAVY_QUEUE
+
+    def test_router_handles_only_import_task(self):
+        task = self.make_task(b"a,b\n")
+        name = "data_ingestion.tasks.process_import_task"
+        assert route_import_task(name, (task.id,), {}, {}) == {"queue": LIGHT_QUEUE}
+        assert route_import_task(name, (0,), {}, {}) is None
+        assert route_import_task("reports.tasks.generate_report_task", (task.id,), {}, {}) is None
+
+    def defer_calls(self, monkeypatch):
+        deferred = []
+        monkeypatch.setattr(
+            tasks.process_import_task, "apply_async",
+            lambda args, kwargs, countdown: deferred.append((args, kwargs, countdown)))
+        return deferred
+
+    def test_tenant_limit_defers_import(self, settings, monkeypatch):
+        settings.IMPORT_TENANT_CONCURRENCY = 1
+        ImportTask.objects.create(company=self.company, scenario=self.scenario, status="processing", heartbeat_at=timezone.now())
+        task = self.make_task(b"a,b\n")
+        deferred = self.defer_calls(monkeypatch)
+
+        tasks.process_import_task(task.id)
+
+        task.refresh_from_db()
+        assert task.status == "pending"
+        assert deferred == [((task.id,), {"deferrals": 1}, settings.TENANT_DEFER_SECONDS)]
+
+    def test_stale_import_does_not_hold_tenant_limit(self, settings, monkeypatch):
+        settings.IMPORT_TENANT_CONCURRENCY = 1
+        ImportTask.objects.create(
+            company=self.company, scenario=self.scenario, status="processing",
+            heartbeat_at=timezone.now() - timedelta(seconds=settings.IMPORT_LEASE_SECONDS + 1))
+        task = self.make_task(b"a,b\n")
+        deferred = self.defer_calls(monkeypatch)
+
+        tasks.process_import_task(task.id)
+
+        task.refresh_from_db()
+        assert deferred == []
+        assert task.status != "pending"
+
+    def test_tenant_limit_fails_import_after_max_deferrals(self, settings, monkeypatch):
+        settings.IMPORT_TENANT_CONCURRENCY = 1
+        settings.TENANT_MAX_DEFERRALS = 3
+        ImportTask.objects.create(company=self.company, scenario=self.scenario, status="processing", heartbeat_at=timezone.now())
+        task = self.make_task(b"a,b\n")
+        deferred = self.defer_calls(monkeypatch)
+
+        tasks.process_import_task(task.id, deferrals=3)
+
+        task.refresh_from_db()
+        assert deferred == []
+        assert task.status == "failed"
+        assert task.finished_at is not None
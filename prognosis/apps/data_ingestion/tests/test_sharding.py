@@ -0,0 +1,164 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from accounts.models import Company
+from core.models import Scenario
+from dimensions.models import BudgetArticle
+from financials.models import FinancialLine
+from data_ingestion import tasks
+from data_ingestion.models import ImportStagingLine, ImportTask
+from data_ingestion.readers import shard_ranges
+
+
+class EagerChord:
+    """chord, выполняющий шарды и колбэк синхронно."""
+
+    def __init__(self, header):
+        self.header = list(header)
+
+    def __call__(self, body):
+        results = [sig.apply().get() for sig in self.header]
+        return body.apply(args=(results,))
+
+
+def test_shard_ranges_cover_file_and_leave_tail_open():
+    assert shard_ranges(10, 3) == [(0, 4), (4, 8), (8, None)]
+    assert shard_ranges(2, 4) == [(0, 1), (1, None)]
+
+
+@pytest.mark.django_db
+class TestShardedImport:
+    def setup_method(self):
+        self.company = Company.objects.create(name="C1")
+        self.scenario = Scenario.objects.create(company=self.company, name="B2025", type="budget", version=1)
+        BudgetArticle.add_root(company=self.company, code="A1", name="Article 1")
+
+    def make_task(self, rows):
+        task = ImportTask(company=self.company, scenario=self.scenario, file_type="csv")
+        content = "Статья,Период,Сумма\n" + "".join(rows)
+        task.file.save("import.csv", ContentFile(content.encode("utf-8")))
+        task.save()
+        return task
+
+    def test_shards_stage_rows_and_callback_merges_them(self, settings, monkeypatch):
+        settings.IMPORT_SHARD_MIN_ROWS = 1
+        settings.IMPORT_SHARD_COUNT = 3
+        settings.IMPORT_CHUNK_SIZE = 2
+        monkeypatch.setattr(tasks, "chord", EagerChord)
+        rows = [f"A1,2025-{m:02d},{m}\n" for m in range(1, 8)]
+        rows.append("B9,2025-01,1\n")
+        rows.append("A1,2025-01,100\n")  # повтор ключа в последнем шарде
+        task = self.make_task(rows)
+
+        tasks.process_import_task(task.id)
+
+        task.refresh_from_db()
+        assert task.status == "failed"
+        assert task.rows_total == 9
+        assert task.rows_success == 8
+        assert task.rows_failed == 1
+        assert "B9" in task.error_log
+        assert FinancialLine.objects.count() == 7
+        assert FinancialLine.objects.get(period__month=1).amount == Decimal("100")
+        assert not ImportStagingLine.objects.exists()
+
+    def test_shards_split_by_records_without_staging_rows_twice(self, settings, monkeypatch):
+        settings.IMPORT_SHARD_MIN_ROWS = 1
+        settings.IMPORT_SHARD_COUNT = 2
+        monkeypatch.setattr(tasks, "chord", EagerChord)
+        staged = []
+        write = tasks.StagingWriter.write
+        monkeypatch.setattr(
+            tasks.StagingWriter, "write",
+            lambda writer, frame: staged.extend(frame.index) or write(writer, frame))
+        task = self.make_task([
+            "A1,2025-01,1\n",
+            "\n",
+            "A1,2025-02,2\n",
+            "\"A1\",2025-03,\"3\n\"\n",
+            "A1,2025-04,4\n",
+        ])
+
+        tasks.process_import_task(task.id)
+
+        task.refresh_from_db()
+        assert sorted(staged) == [0, 1, 2, 3]
+        assert (task.rows_total, task.rows_success) == (4, 4)
+        assert FinancialLine.objects.count() == 4
+
+    def test_redelivery_redispatches_shards_once_lease_expires(self, settings, monkeypatch):
+        settings.IMPORT_SHARD_MIN_ROWS = 1
+        monkeypatch.setattr(tasks, "chord", EagerChord)
+        deferred = []
+        monkeypatch.setattr(
+            tasks.process_import_task, "apply_async",
+            lambda args, countdown: deferred.append(args))
+        task = self.make_task(["A1,2025-01,1\n", "A1,2025-02,2\n"])
+        ImportTask.objects.filter(id=task.id).update(status="processing", rows_total=2)
+        # Первая доставка успела запустить chord, один шард отработал
+        tasks.process_import_shard(task.id, 0, 1)
+
+        # Шард продлил аренду — повторная доставка ждёт, chord не дублируется
+        tasks.process_import_task(task.id)
+        assert deferred == [(task.id,)]
+        assert ImportStagingLine.objects.filter(task=task).count() == 1
+
+        # Аренда истекла — шарды запускаются заново с чистого staging
+        ImportTask.objects.filter(id=task.id).update(
+            heartbeat_at=timezone.now() - timedelta(hours=1))
+        tasks.process_import_task(task.id)
+
+        task.refresh_from_db()
+        assert task.status == "completed"
+        assert (task.rows_processed, task.rows_success) == (2, 2)
+        assert FinancialLine.objects.count() == 2
+        assert not ImportStagingLine.objects.exists()
+
+    def test_failed_shard_leaves_financial_lines_untouched(self):
+        task = self.make_task(["A1,2025-01,1\n", "A1,2025-02,2\n"])
+        first = tasks.process_import_shard(task.id, 0, 1)
+        assert ImportStagingLine.objects.filter(task=task).count() == 1
+
+        tasks.finalize_import_task([first, {"critical": "Строки 3+: boom"}], task.id)
+
+        task.refresh_from_db()
+        assert task.status == "failed"
+        assert "boom" in task.error_log
+        assert not FinancialLine.objects.exists()
+        assert not ImportStagingLine.objects.exists()
+
+    def test_cancelled_import_discards_staged_shards(self):
+        task = self.make_task(["A1,2025-01,1\n", "A1,2025-02,2\n"])
+        first = tasks.process_import_shard(task.id, 0, 1)
+        ImportTask.objects.filter(id=task.id).update(cancel_requested=True)
+        second = tasks.process_import_shard(task.id, 1, None)
+        assert second == {"cancelled": True}
+
+        tasks.finalize_import_task([first, second], task.id)
+
+        task.refresh_from_db()
+        assert task.status == "cancelled"
+        assert not FinancialLine.objects.exists()
+        assert not ImportStagingLine.objects.exists()
+
+    def test_chord_error_fails_task(self, settings, monkeypatch):
+        settings.IMPORT_SHARD_MIN_ROWS = 1
+        captured = {}
+        monkeypatch.setattr(tasks, "chord", lambda header: lambda body: captured.update(body=body))
+        task = self.make_task(["A1,2025-01,1\n", "A1,2025-02,2\n"])
+        tasks.process_import_task(task.id)
+
+        errback = captured["body"].options["link_error"][0]
+        assert errback.task == tasks.fail_import_task.name
+        tasks.process_import_shard(task.id, 0, 1)
+
+        tasks.fail_import_task(None, RuntimeError("shard lost"), None, *errback.args)
+
+        task.refresh_from_db()
+        assert task.status == "failed"
+        assert task.error_log == "Критическая ошибка: shard lost"
+        assert task.finished_at is not None
+        assert not ImportStagingLine.objects.exists()
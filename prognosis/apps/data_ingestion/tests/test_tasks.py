@@ -1,13 +1,19 @@
+import functools
+import io
+import zipfile
 import pytest
 from decimal import Decimal
 from django.core.files.base import ContentFile
 from django.contrib.auth import get_user_model
+from django.db import OperationalError
 
 from accounts.models import Company
 from core.models import Scenario
 from dimensions.models import BudgetArticle
 from financials.models import FinancialLine
-from data_ingestion.models import ImportTask
+from data_ingestion import tasks
+from data_ingestion.engine import ImportEngine
+from data_ingestion.models import ImportStagingLine, ImportTask
 from data_ingestion.tasks import process_import_task
 
 
@@ -80,3 +86,364 @@ def test_process_import_task_creates_financial_lines_csv():
     # Общие проверки
     assert monthly_line.article.code == "A1"
     assert yearly_line.article.code == "A1"
+
+
+@pytest.mark.django_db
+def test_process_import_task_streams_csv_in_chunks(settings):
+    settings.IMPORT_CHUNK_SIZE = 2
+    company = Company.objects.create(name="C1")
+    scenario = Scenario.objects.create(company=company, name="B2025", type="budget", version=1)
+    BudgetArticle.add_root(company=company, code="A1", name="Article 1")
+
+    rows = "".join(f"A1;2025-{m:02d};{m},5\n" for m in range(1, 6))
+    task = ImportTask(company=company, scenario=scenario, file_type="csv")
+    task.file.save("import.csv", ContentFile(("Статья;Период;Сумма\n" + rows).encode("utf-8")))
+    task.save()
+
+    process_import_task(task.id)
+
+    task.refresh_from_db()
+    assert task.status == "completed"
+    assert task.rows_total == 5
+    assert task.rows_processed == 5
+    assert task.rows_success == 5
+    assert task.peak_memory_mb > 0
+    assert FinancialLine.objects.get(period__month=5).amount == Decimal("5.5")
+
+
+@pytest.mark.django_db
+def test_process_import_task_resumes_from_checkpoint(settings, monkeypatch):
+    settings.IMPORT_CHUNK_SIZE = 2
+    company = Company.objects.create(name="C1")
+    scenario = Scenario.objects.create(company=company, name="B2025", type="budget", version=1)
+    BudgetArticle.add_root(company=company, code="A1", name="Article 1")
+
+    rows = "".join(f"A1,2025-{m:02d},{m}\n" for m in range(1, 6))
+    task = ImportTask(company=company, scenario=scenario, file_type="csv")
+    task.file.save("import.csv", ContentFile(("Статья,Период,Сумма\n" + rows).encode("utf-8")))
+    task.save()
+
+    # Второй чанк падает, как при потере соединения с БД
+    process_chunk = ImportEngine.process_chunk
+    calls = []
+
+    def flaky_process_chunk(engine, chunk):
+        calls.append(chunk.index[0])
+        if len(calls) == 2:
+            raise OperationalError("connection lost")
+        return process_chunk(engine, chunk)
+
+    monkeypatch.setattr(ImportEngine, "process_chunk", flaky_process_chunk)
+    with pytest.raises(OperationalError):
+        process_import_task(task.id)
+
+    task.refresh_from_db()
+    assert task.status == "processing"
+    assert task.checkpoint_row == 2
+    assert task.rows_processed == 2
+    assert ImportStagingLine.objects.filter(task=task).count() == 2
+    assert not FinancialLine.objects.exists()
+
+    # Повтор продолжает с третьей строки и переносит всё в FinancialLine
+    process_import_task(task.id)
+
+    task.refresh_from_db()
+    assert calls == [0, 2, 2, 4]
+    assert task.status == "completed"
+    assert task.rows_processed == 5
+    assert task.rows_success == 5
+    assert task.rows_inserted == 5
+    assert FinancialLine.objects.count() == 5
+    assert not ImportStagingLine.objects.exists()
+
+
+@pytest.mark.django_db
+def test_process_import_task_resumes_by_records(settings, monkeypatch):
+    settings.IMPORT_CHUNK_SIZE = 2
+    company = Company.objects.create(name="C1")
+    scenario = Scenario.objects.create(company=company, name="B2025", type="budget", version=1)
+    BudgetArticle.add_root(company=company, code="A1", name="Article 1")
+    BudgetArticle.add_root(company=company, code="B1", name="Article 2")
+
+    # Пустая строка и перевод строки в кавычках перед контрольной точкой
+    rows = "A1,2025-01,1\n\n\"A1\",2025-02,\"2\n\"\nB1,2025-01,3\nB1,2025-02,4\n"
+    task = ImportTask(company=company, scenario=scenario, file_type="csv")
+    task.file.save("import.csv", ContentFile(("Статья,Период,Сумма\n" + rows).encode("utf-8")))
+    task.save()
+
+    process_chunk = ImportEngine.process_chunk
+    seen = []
+
+    def flaky_process_chunk(engine, chunk):
+        if len(seen) == 2:
+            seen.append(None)
+            raise OperationalError("connection lost")
+        seen.extend(chunk["Статья"] + chunk["Период"])
+        return process_chunk(engine, chunk)
+
+    monkeypatch.setattr(ImportEngine, "process_chunk", flaky_process_chunk)
+    with pytest.raises(OperationalError):
+        process_import_task(task.id)
+    task.refresh_from_db()
+    assert task.checkpoint_row == 2
+
+    process_import_task(task.id)
+
+    task.refresh_from_db()
+    # Каждая запись обработана один раз, повтор начался с B1
+    assert seen == ["A12025-01", "A12025-02", None, "B12025-01", "B12025-02"]
+    assert (task.status, task.rows_processed, task.rows_success) == ("completed", 4, 4)
+    assert FinancialLine.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_process_import_task_resume_rebuilds_error_log(settings, monkeypatch):
+    settings.IMPORT_CHUNK_SIZE = 2
+    company = Company.objects.create(name="C1")
+    scenario = Scenario.objects.create(company=company, name="B2025", type="budget", version=1)
+    BudgetArticle.add_root(company=company, code="A1", name="Article 1")
+
+    rows = "ZZ,2025-01,1\nA1,2025-02,x\nA1,2025-03,3\nZZ,2025-04,4\n"
+    task = ImportTask(company=company, scenario=scenario, file_type="csv")
+    task.file.save("import.csv", ContentFile(("Статья,Период,Сумма\n" + rows).encode("utf-8")))
+    task.save()
+
+    process_chunk = ImportEngine.process_chunk
+    calls = []
+
+    def flaky_process_chunk(engine, chunk):
+        calls.append(chunk.index[0])
+        if len(calls) == 2:
+            raise OperationalError("connection lost")
+        return process_chunk(engine, chunk)
+
+    monkeypatch.setattr(ImportEngine, "process_chunk", flaky_process_chunk)
+    with pytest.raises(OperationalError):
+        process_import_task(task.id)
+    process_import_task(task.id)
+
+    task.refresh_from_db()
+    assert task.rows_failed == 3
+    # Сводка собрана из ImportRowError, без повторов строк прежнего лога
+    assert task.error_log.splitlines() == [
+        "Статья: код 'ZZ' не найден (строки 2, 5)",
+        "Строка 3: Некорректная сумма: x",
+    ]
+
+
+@pytest.mark.django_db
+def test_process_import_task_defers_redelivery_while_leased(monkeypatch):
+    from datetime import timedelta
+    from django.utils import timezone
+
+    company = Company.objects.create(name="C1")
+    scenario = Scenario.objects.create(company=company, name="B2025", type="budget", version=1)
+    BudgetArticle.add_root(company=company, code="A1", name="Article 1")
+    task = ImportTask(company=company, scenario=scenario, file_type="csv")
+    task.file.save("import.csv", ContentFile("Статья,Период,Сумма\nA1,2025-01,1\n".encode("utf-8")))
+    task.status = "processing"
+    task.heartbeat_at = timezone.now()
+    task.save()
+
+    deferred = []
+    monkeypatch.setattr(
+        tasks.process_import_task, "apply_async",
+        lambda args, countdown: deferred.append(args))
+
+    # Другой воркер ещё ведёт импорт — повторная доставка ждёт
+    process_import_task(task.id)
+    task.refresh_from_db()
+    assert deferred == [(task.id,)]
+    assert task.status == "processing"
+    assert not FinancialLine.objects.exists()
+
+    # Аренда истекла — импорт продолжается с контрольной точки
+    ImportTask.objects.filter(id=task.id).update(
+        heartbeat_at=timezone.now() - timedelta(hours=1))
+    process_import_task(task.id)
+    task.refresh_from_db()
+    assert task.status == "completed"
+    assert FinancialLine.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_process_import_task_cleans_staging_on_critical_error(monkeypatch):
+    company = Company.objects.create(name="C1")
+    scenario = Scenario.objects.create(company=company, name="B2025", type="budget", version=1)
+    BudgetArticle.add_root(company=company, code="A1", name="Article 1")
+    task = ImportTask(company=company, scenario=scenario, file_type="csv")
+    task.file.save("import.csv", ContentFile("Статья,Период,Сумма\nA1,2025-01,1\n".encode("utf-8")))
+    task.save()
+
+    def broken_merge(task, chunk_size):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(tasks, "merge_staging", broken_merge)
+    process_import_task(task.id)
+
+    task.refresh_from_db()
+    assert task.status == "failed"
+    assert task.error_log == "Критическая ошибка: boom"
+    assert not ImportStagingLine.objects.exists()
+    assert not FinancialLine.objects.exists()
+
+
+@pytest.mark.django_db
+def test_process_import_task_stores_all_row_errors(settings, monkeypatch):
+    settings.IMPORT_CHUNK_SIZE = 50
+    monkeypatch.setattr(tasks, "ImportEngine", functools.partial(ImportEngine, error_limit=5))
+    company = Company.objects.create(name="C1")
+    scenario = Scenario.objects.create(company=company, name="B2025", type="budget", version=1)
+    BudgetArticle.add_root(company=company, code="A1", name="Article 1")
+
+    rows = "".join(f"A1,2025-01,bad{i}\n" for i in range(300)) + "ZZ,2025-01,1\n"
+    task = ImportTask(company=company, scenario=scenario, file_type="csv")
+    task.file.save("import.csv", ContentFile(("Статья,Период,Сумма\n" + rows).encode("utf-8")))
+    task.save()
+
+    process_import_task(task.id)
+
+    task.refresh_from_db()
+    assert task.rows_failed == 301
+    assert task.row_errors.filter(code="invalid_amount").count() == 300
+    unknown = task.row_errors.get(code="unknown_code")
+    assert (unknown.row, unknown.column, unknown.message) == (302, "Статья", "Код 'ZZ' не найден")
+    # В лог — сводка по кодам и первые ошибки строк
+    assert task.error_log.splitlines() == [
+        "Статья: код 'ZZ' не найден (строки 302)",
+        *[f"Строка {i + 2}: Некорректная сумма: bad{i}" for i in range(5)],
+    ]
+
+
+@pytest.mark.django_db
+def test_process_import_task_replace_keeps_lines_when_rows_fail():
+    company = Company.objects.create(name="C1")
+    scenario = Scenario.objects.create(company=company, name="B2025", type="budget", version=1)
+    BudgetArticle.add_root(company=company, code="A1", name="Article 1")
+    BudgetArticle.add_root(company=company, code="A2", name="Article 2")
+
+    def run(mode, content):
+        task = ImportTask(company=company, scenario=scenario, file_type="csv", mode=mode)
+        task.file.save("import.csv", ContentFile(content.encode("utf-8")))
+        task.save()
+        process_import_task(task.id)
+        task.refresh_from_db()
+        return task
+
+    run("upsert", "Статья,Период,Сумма\nA1,2025-01,1\nA2,2025-01,2\n")
+    task = run("replace", "Статья,Период,Сумма\nA1,2025-01,1\nA2,2025-01,2x\n")
+
+    assert task.status == "failed"
+    assert task.rows_failed == 1
+    assert task.rows_deleted == 0
+    # Строка с опечаткой не удаляет существующую строку A2
+    assert sorted(FinancialLine.objects.values_list("article__code", flat=True)) == ["A1", "A2"]
+
+
+@pytest.mark.django_db
+def test_process_import_task_from_start_drops_stale_row_errors():
+    from data_ingestion.models import ImportRowError
+
+    company = Company.objects.create(name="C1")
+    scenario = Scenario.objects.create(company=company, name="B2025", type="budget", version=1)
+    BudgetArticle.add_root(company=company, code="A1", name="Article 1")
+    task = ImportTask(company=company, scenario=scenario, file_type="csv")
+    task.file.save("import.csv", ContentFile("Статья,Период,Сумма\nA1,2025-01,x\n".encode("utf-8")))
+    task.save()
+    # Ошибки прерванной попытки, после которой импорт начнётся с начала
+    ImportRowError.objects.create(task=task, row=9, code="unknown_code", column="Статья", message="Код 'ZZ' не найден")
+
+    process_import_task(task.id)
+
+    assert list(task.row_errors.values_list("row", "code")) == [(2, "invalid_amount")]
+
+
+def make_zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+@pytest.mark.django_db
+def test_process_import_task_imports_zip_archive(monkeypatch):
+    company = Company.objects.create(name="C1")
+    scenario = Scenario.objects.create(company=company, name="B2025", type="budget", version=1)
+    BudgetArticle.add_root(company=company, code="A1", name="Article 1")
+
+    header = "Статья,Период,Сумма\n"
+    task = ImportTask(company=company, scenario=scenario, file_type="zip")
+    task.file.save("close.zip", ContentFile(make_zip({
+        "cc1.csv": header + "A1,2025-01,1\nA1,2025-02,2\n",
+        "cc2/cc2.csv": header + "A1,2025-03,3\nZZ,2025-03,4\n",
+        "__MACOSX/._cc1.csv": "junk",
+        "readme.txt": "skip me",
+    })))
+    task.save()
+
+    resolvers = []
+    original = ImportEngine.__init__
+
+    def spy_init(engine, *args, **kwargs):
+        original(engine, *args, **kwargs)
+        resolvers.append((engine.resolver, engine.periods))
+
+    monkeypatch.setattr(ImportEngine, "__init__", spy_init)
+
+    process_import_task(task.id)
+
+    task.refresh_from_db()
+    children = list(task.children.order_by("id"))
+    assert [c.file_type for c in children] == ["csv", "csv"]
+    assert "cc2" in children[1].file.name
+    assert [c.status for c in children] == ["completed", "failed"]
+    assert [c.rows_success for c in children] == [2, 1]
+    assert children[1].row_errors.get().code == "unknown_code"
+
+    assert task.status == "failed"
+    assert (task.rows_total, task.rows_success, task.rows_failed) == (4, 3, 1)
+    assert task.rows_inserted == 3
+    assert task.error_log.startswith("cc2")
+    assert task.error_log.endswith(".csv: Статья: код 'ZZ' не найден (строки 3)")
+    assert FinancialLine.objects.count() == 3
+
+    # Справочники и карта периодов — одни на весь архив
+    assert len(resolvers) == 2
+    assert resolvers[0][0] is resolvers[1][0]
+    assert resolvers[0][1] is resolvers[1][1]
+
+
+@pytest.mark.django_db
+def test_process_import_task_stops_on_cancel(settings, monkeypatch):
+    settings.IMPORT_CHUNK_SIZE = 2
+    company = Company.objects.create(name="C1")
+    scenario = Scenario.objects.create(company=company, name="B2025", type="budget", version=1)
+    BudgetArticle.add_root(company=company, code="A1", name="Article 1")
+    rows = "".join(f"A1,2025-{month:02d},1\n" for month in range(1, 11))
+    task = ImportTask(company=company, scenario=scenario, file_type="csv")
+    task.file.save("import.csv", ContentFile(("Статья,Период,Сумма\n" + rows).encode("utf-8")))
+    task.save()
+
+    chunks = []
+    original = ImportEngine.process_chunk
+
+    def cancel_after_first_chunk(engine, chunk):
+        original(engine, chunk)
+        chunks.append(len(chunk))
+        ImportTask.objects.filter(id=task.id).update(cancel_requested=True)
+
+    monkeypatch.setattr(ImportEngine, "process_chunk", cancel_after_first_chunk)
+    process_import_task(task.id)
+
+    task.refresh_from_db()
+    assert chunks == [2]
+    assert task.status == "cancelled"
+    assert task.error_log == "Импорт отменён"
+    assert task.checkpoint_row == 0
+    assert not ImportStagingLine.objects.exists()
+    assert not FinancialLine.objects.exists()
+
+    # Повторная доставка отменённой задачи ничего не делает
+    process_import_task(task.id)
+    assert chunks == [2]
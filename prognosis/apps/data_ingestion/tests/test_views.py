@@ -1,3 +1,4 @@
+import hashlib
 import pytest
 from django.urls import reverse
 from rest_framework.test import APIClient
@@ -43,6 +44,92 @@ class TestImportTaskViews:
         assert task.file_type == "excel"
         assert task.slug
 
+    def test_post_same_file_returns_existing_task(self, monkeypatch):
+        from data_ingestion import views as ingestion_views
+
+        calls = []
+        monkeypatch.setattr(ingestion_views.process_import_task, "delay", calls.append)
+        url = reverse("data_ingestion:import-list-create")
+        content = "Статья,Период,Сумма\nA1,2025-01,1\n".encode()
+
+        first = self.client.post(url, {"file": SimpleUploadedFile("a.csv", content), "scenario": self.scenario1.id}, format="multipart")
+        second = self.client.post(url, {"file": SimpleUploadedFile("b.csv", content), "scenario": self.scenario1.id}, format="multipart")
+
+        assert first.status_code == 201
+        assert second.status_code == 200
+        assert second.data["id"] == first.data["id"]
+        assert calls == [first.data["id"]]
+        assert ImportTask.objects.get().content_hash == hashlib.sha256(content).hexdigest()
+
+        # После ошибки тот же файл можно загрузить заново
+        ImportTask.objects.update(status="failed")
+        third = self.client.post(url, {"file": SimpleUploadedFile("c.csv", content), "scenario": self.scenario1.id}, format="multipart")
+        assert third.status_code == 201
+        assert ImportTask.objects.count() == 2
+
+    def test_post_same_file_in_other_mode_creates_task(self, monkeypatch):
+        from data_ingestion import views as ingestion_views
+
+        calls = []
+        monkeypatch.setattr(ingestion_views.process_import_task, "delay", calls.append)
+        url = reverse("data_ingestion:import-list-create")
+        content = "Статья,Период,Сумма\nA1,2025-01,1\n".encode()
+
+        first = self.client.post(url, {"file": SimpleUploadedFile("a.csv", content), "scenario": self.scenario1.id}, format="multipart")
+        replace = self.client.post(url, {"file": SimpleUploadedFile("a.csv", content), "scenario": self.scenario1.id, "mode": "replace"}, format="multipart")
+        copy = self.client.post(url, {"file": SimpleUploadedFile("a.csv", content), "scenario": self.scenario1.id, "backend": "copy"}, format="multipart")
+
+        assert (first.status_code, replace.status_code, copy.status_code) == (201, 201, 201)
+        assert len({first.data["id"], replace.data["id"], copy.data["id"]}) == 3
+        assert ImportTask.objects.get(id=replace.data["id"]).mode == "replace"
+        assert len(calls) == 3
+
+    def test_post_dry_run_returns_report_without_writes(self):
+        from core.models import TimePeriod
+        from dimensions.models import BudgetArticle
+        from financials.models import FinancialLine
+
+        BudgetArticle.add_root(company=self.company1, code="A1", name="Article 1")
+        content = (
+            "Статья,Период,Сумма\n"
+            "A1,2025-01,1\n"
+            "A9,2025-01,2\n"
+            "A1,2025-13,3\n"
+            "A1,2025-02,\n"
+        ).encode()
+        url = reverse("data_ingestion:import-list-create")
+        resp = self.client.post(url, {"file": SimpleUploadedFile("a.csv", content), "scenario": self.scenario1.id, "dry_run": True}, format="multipart")
+
+        assert resp.status_code == 200, resp.data
+        assert resp.data["valid"] is False
+        assert (resp.data["rows_total"], resp.data["rows_valid"], resp.data["rows_failed"]) == (4, 1, 3)
+        assert resp.data["unknown_codes"] == [{"column": "Статья", "code": "A9", "count": 1, "rows": [3]}]
+        assert resp.data["errors"] == [
+            {"row": 4, "column": "Период", "code": "invalid_period", "message": "Некорректный месяц: 13"},
+            {"row": 5, "column": "Сумма", "code": "required", "message": "Колонка 'Сумма' обязательна"},
+        ]
+        assert not ImportTask.objects.exists()
+        assert not FinancialLine.objects.exists()
+        assert not TimePeriod.objects.exists()
+
+    def test_get_errors_filters_and_paginates(self):
+        from data_ingestion.models import ImportRowError
+
+        task = ImportTask.objects.create(company=self.company1, scenario=self.scenario1, created_by=self.user)
+        ImportRowError.objects.bulk_create([
+            ImportRowError(task=task, row=row, column="Сумма", code="invalid_amount", message=f"Некорректная сумма: x{row}")
+            for row in range(2, 7)
+        ] + [ImportRowError(task=task, row=7, column="Статья", code="unknown_code", message="Код 'Z' не найден")])
+        url = reverse("data_ingestion:import-errors", kwargs={"slug": task.slug})
+
+        resp = self.client.get(url, {"code": "invalid_amount", "page_size": 2, "page": 2})
+        assert resp.status_code == 200
+        assert resp.data["count"] == 5
+        assert [e["row"] for e in resp.data["results"]] == [4, 5]
+
+        resp = self.client.get(url, {"column": "Статья"})
+        assert resp.data["results"] == [{"row": 7, "column": "Статья", "code": "unknown_code", "message": "Код 'Z' не найден"}]
+
     def test_get_list_returns_user_tasks(self):
         ImportTask.objects.create(company=self.company1, scenario=self.scenario1, created_by=self.user)
         ImportTask.objects.create(company=self.company2, scenario=Scenario.objects.create(company=self.company2, name="B2026", type="budget", version=1), created_by=self.user)
@@ -57,3 +144,39 @@ class TestImportTaskViews:
         resp = self.client.get(url)
         assert resp.status_code == 200
         assert resp.data["slug"] == task.slug
+
+    def test_get_list_nests_archive_files(self):
+        archive = ImportTask.objects.create(company=self.company1, scenario=self.scenario1, created_by=self.user, file_type="zip")
+        ImportTask.objects.create(company=self.company1, scenario=self.scenario1, created_by=self.user, parent=archive, status="completed")
+        url = reverse("data_ingestion:import-list-create")
+        resp = self.client.get(url)
+        assert len(resp.data) == 1
+        assert [f["status"] for f in resp.data[0]["children"]] == ["completed"]
+
+    def test_post_dry_run_rejects_archive(self):
+        url = reverse("data_ingestion:import-list-create")
+        resp = self.client.post(url, {"file": SimpleUploadedFile("a.zip", b"PK"), "scenario": self.scenario1.id, "dry_run": True}, format="multipart")
+        assert resp.status_code == 400
+        assert "dry_run" in resp.data
+
+    def test_cancel_pending_and_processing_tasks(self):
+        pending = ImportTask.objects.create(company=self.company1, scenario=self.scenario1, created_by=self.user)
+        running = ImportTask.objects.create(company=self.company1, scenario=self.scenario1, created_by=self.user, status="processing")
+        done = ImportTask.objects.create(company=self.company1, scenario=self.scenario1, created_by=self.user, status="completed")
+
+        def cancel(task):
+            return self.client.post(reverse("data_ingestion:import-cancel", kwargs={"slug": task.slug}))
+
+        resp = cancel(pending)
+        assert resp.status_code == 200
+        assert resp.data["status"] == "cancelled"
+
+        # Идущий импорт остановит воркер перед следующим чанком
+        resp = cancel(running)
+        assert resp.status_code == 202
+        assert resp.data["status"] == "processing"
+        assert resp.data["cancel_requested"] is True
+
+        assert cancel(done).status_code == 409
+        done.refresh_from_db()
+        assert not done.cancel_requested
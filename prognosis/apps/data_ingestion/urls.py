@@ -1,5 +1,9 @@
 from django.urls import path
-from .views import ImportTaskListCreateView, ImportTaskDetailView
+from .streams import import_progress_events
+from .views import (
+	ImportTaskListCreateView, ImportTaskDetailView, ImportTaskErrorListView,
+	ImportTaskCancelView
+)
 
 app_name = 'data_ingestion'
 
@@ -12,4 +16,16 @@ urlpatterns = [
 		'v1/imports/<slug:slug>/',
 		ImportTaskDetailView.as_view(),
 		name='import-detail'),
+	path(
+		'v1/imports/<slug:slug>/errors/',
+		ImportTaskErrorListView.as_view(),
+		name='import-errors'),
+	path(
+		'v1/imports/<slug:slug>/cancel/',
+		ImportTaskCancelView.as_view(),
+		name='import-cancel'),
+	path(
+		'v1/imports/<slug:slug>/events/',
+		import_progress_events,
+		name='import-events'),
 ]
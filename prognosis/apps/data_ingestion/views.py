@@ -1,11 +1,21 @@
 from rest_framework.views import APIView
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from pathlib import Path
+from accounts.tenancy import get_tenant
 from .models import ImportTask
-from .serializers import ImportTaskSerializer, ImportTaskCreateSerializer
+from .cancellation import cancel_import
+from .serializers import (
+	ImportRowErrorSerializer, ImportTaskSerializer, ImportTaskCreateSerializer
+)
+from .progress import read_progress
+from .dryrun import dry_run
+from .readers import (
+	FILE_TYPES, file_sha256, file_type_for, uploaded_file_path
+)
 from .tasks import process_import_task
 
 
@@ -13,9 +23,11 @@ class ImportTaskListCreateView(APIView):
 	permission_classes = [IsAuthenticated]
 
 	def get(self, request):
+		# Файлы архива показываются внутри своей задачи-архива
 		tasks = ImportTask.objects.filter(
-			company__user_roles__user=request.user
-		).order_by("-created_at")
+			company_id__in=get_tenant(request).company_ids,
+			parent__isnull=True,
+		).prefetch_related("children").order_by("-created_at")
 		serializer = ImportTaskSerializer(tasks, many=True)
 		return Response(serializer.data)
 
@@ -25,31 +37,58 @@ class ImportTaskListCreateView(APIView):
 			return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 		# Проверяем привязку пользователя к компании
-		company_role = request.user.company_roles.first()
-		if not company_role:
+		company = get_tenant(request).company
+		if not company:
 			return Response(
 				{"detail": "Пользователь не привязан ни к одной компании"},
 				status=status.HTTP_403_FORBIDDEN
 			)
-		company = company_role.company
+
+		data = serializer.validated_data
+		if data["dry_run"]:
+			try:
+				report = self._dry_run(company, data)
+			except Exception as e:
+				# Файл не читается — как критическая ошибка импорта
+				return Response(
+					{"file": f"Критическая ошибка: {str(e)}"},
+					status=status.HTTP_400_BAD_REQUEST)
+			return Response(report)
+
+		# Тот же файл для того же сценария, в том же режиме и тем же
+		# способом уже загружен — возвращаем прежнюю задачу,
+		# строки повторно не читаются
+		content_hash = file_sha256(data["file"])
+		duplicate = ImportTask.objects.filter(
+			company=company,
+			scenario=data["scenario"],
+			sheet=data.get("sheet", ""),
+			mode=data.get("mode", "upsert"),
+			backend=data.get("backend", "orm"),
+			content_hash=content_hash,
+			status__in=ImportTask.DEDUPLICATED_STATUSES,
+		).order_by("-created_at").first()
+		if duplicate:
+			return Response(
+				ImportTaskSerializer(duplicate).data,
+				status=status.HTTP_200_OK)
 
 		# Сохраняем задачу импорта
-		task = serializer.save(created_by=request.user, company=company)
+		task = serializer.save(
+			created_by=request.user,
+			company=company,
+			content_hash=content_hash)
 
 		# Определяем и валидируем тип файла
-		allowed_extensions = {".xlsx", ".xls", ".csv"}
 		file_ext = Path(task.file.name).suffix.lower()
-		if file_ext not in allowed_extensions:
+		if file_ext not in FILE_TYPES:
 			return Response(
-				{"file": "Поддерживаются только файлы CSV, XLS, XLSX"},
+				{"file": "Поддерживаются только файлы CSV, XLS, XLSX, "
+					"Parquet, Arrow и ZIP-архивы"},
 				status=status.HTTP_400_BAD_REQUEST
 			)
 
-		if file_ext in {".xlsx", ".xls"}:
-			task.file_type = "excel"
-		else:
-			task.file_type = "csv"
-
+		task.file_type = file_type_for(task.file.name)
 		task.save(update_fields=["file_type"])
 
 		# Запускаем обработку в Celery
@@ -59,6 +98,17 @@ class ImportTaskListCreateView(APIView):
 			ImportTaskSerializer(task).data,
 			status=status.HTTP_201_CREATED)
 
+	def _dry_run(self, company, data):
+		upload = data["file"]
+		task = ImportTask(
+			company=company,
+			scenario=data["scenario"],
+			file_type=file_type_for(upload.name),
+			sheet=data.get("sheet", ""),
+		)
+		with uploaded_file_path(upload) as path:
+			return dry_run(task, path)
+
 
 class ImportTaskDetailView(APIView):
 	permission_classes = [IsAuthenticated]
@@ -67,10 +117,76 @@ class ImportTaskDetailView(APIView):
 		return get_object_or_404(
 			ImportTask,
 			slug=slug,
-			company__user_roles__user=self.request.user
+			company_id__in=get_tenant(self.request).company_ids
 		)
 
 	def get(self, request, slug):
+		# Пока импорт идёт, прогресс отдаётся из Redis без чтения ImportTask
+		snapshot = read_progress(get_tenant(request).company_ids, slug)
+		if snapshot is not None:
+			return Response(snapshot)
+
 		task = self.get_object(slug)
 		serializer = ImportTaskSerializer(task)
 		return Response(serializer.data)
+
+
+class ImportTaskCancelView(APIView):
+	"""
+	POST .../imports/<slug>/cancel/ — отмена импорта. Задача в очереди
+	отменяется сразу (200), идущая — после текущего чанка (202);
+	завершённую отменить нельзя (409).
+	"""
+	permission_classes = [IsAuthenticated]
+
+	def post(self, request, slug):
+		task = get_object_or_404(
+			ImportTask,
+			slug=slug,
+			company_id__in=get_tenant(request).company_ids,
+			parent__isnull=True,
+		)
+		cancelled = cancel_import(task.id)
+		if cancelled is None:
+			return Response(
+				{"detail": "Импорт уже завершён"},
+				status=status.HTTP_409_CONFLICT)
+
+		code = (
+			status.HTTP_200_OK if cancelled.status == "cancelled"
+			else status.HTTP_202_ACCEPTED)
+		return Response(ImportTaskSerializer(cancelled).data, status=code)
+
+
+class ImportRowErrorPagination(PageNumberPagination):
+	page_size = 100
+	page_size_query_param = "page_size"
+	max_page_size = 1000
+
+
+class ImportTaskErrorListView(APIView):
+	"""
+	Ошибки строк импорта постранично, по порядку строк файла.
+	Фильтры: ?column=Сумма, ?code=invalid_amount.
+	"""
+	permission_classes = [IsAuthenticated]
+
+	def get(self, request, slug):
+		task = get_object_or_404(
+			ImportTask,
+			slug=slug,
+			company_id__in=get_tenant(request).company_ids
+		)
+		queryset = task.row_errors.order_by("row", "id")
+
+		column_q = request.query_params.get("column")
+		code_q = request.query_params.get("code")
+		if column_q:
+			queryset = queryset.filter(column=column_q)
+		if code_q:
+			queryset = queryset.filter(code=code_q)
+
+		paginator = ImportRowErrorPagination()
+		page = paginator.paginate_queryset(queryset, request, view=self)
+		serializer = ImportRowErrorSerializer(page, many=True)
+		return paginator.get_paginated_response(serializer.data)
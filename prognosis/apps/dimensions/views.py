@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from accounts.tenancy import get_tenant
 from .models import (
 	ChartOfAccounts, BudgetArticle,
 	CostCenter, Department, Project
@@ -19,7 +20,8 @@ class BaseDimensionListCreateView(APIView):
 	serializer_class = None
 
 	def get_queryset(self):
-		return self.model.objects.filter(company__user_roles__user=self.request.user)
+		return self.model.objects.filter(
+			company_id__in=get_tenant(self.request).company_ids)
 
 	def get(self, request):
 		items = self.get_queryset()
@@ -29,13 +31,13 @@ class BaseDimensionListCreateView(APIView):
 	def post(self, request):
 		serializer = self.serializer_class(data=request.data)
 		if serializer.is_valid():
-			user_role = request.user.company_roles.first()
-			if not user_role:
+			company = get_tenant(request).company
+			if not company:
 				return Response(
 					{"detail": "Пользователь не привязан к компании"},
 					status=status.HTTP_400_BAD_REQUEST
 				)
-			serializer.save(company=user_role.company)
+			serializer.save(company=company)
 			return Response(serializer.data, status=status.HTTP_201_CREATED)
 		return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -81,7 +83,7 @@ class BaseDimensionDetailView(APIView):
 		return get_object_or_404(
 			self.model,
 			slug=slug,
-			company__user_roles__user=self.request.user
+			company_id__in=get_tenant(self.request).company_ids
 		)
 
 	def get(self, request, slug):
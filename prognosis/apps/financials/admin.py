@@ -51,8 +51,7 @@ class FinancialLineAdmin(ModelAdmin):
 	)
 
 	ordering = (
-		"-period__year",
-		"-period__month",
+		"-period_key",
 		"article__code",
 	)
 
@@ -0,0 +1,286 @@
+"""
+Пакетная запись FinancialLine (FinancialLineBulkView).
+
+Элементы приходят массивом JSON или NDJSON и обрабатываются пачками
+по FINANCIALS_BULK_BATCH_SIZE: ссылки на справочники разрешаются одним
+запросом на справочник, существующие строки — одним запросом,
+запись — одним bulk_create с update_conflicts. На каждый элемент
+запроса возвращается результат с тем же индексом.
+"""
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.parsers import BaseParser
+
+from core.models import Scenario, TimePeriod
+from dimensions.models import (
+	BudgetArticle, CostCenter,
+	Department, Project, ChartOfAccounts
+)
+from .models import FinancialLine
+from .serializers import FinancialLineBulkItemSerializer
+
+
+# Поле элемента -> (модель, поле поиска), как в FinancialLineSerializer
+REFERENCE_FIELDS = {
+	"scenario": (Scenario, "slug"),
+	"period": (TimePeriod, "pk"),
+	"article": (BudgetArticle, "slug"),
+	"cost_center": (CostCenter, "slug"),
+	"department": (Department, "slug"),
+	"project": (Project, "slug"),
+	"account": (ChartOfAccounts, "slug"),
+}
+# Набор измерений строки — поля unique_financial_line_key
+KEY_FIELDS = tuple(f"{field}_id" for field in REFERENCE_FIELDS)
+VALUE_FIELDS = ("amount", "comment", "source")
+DIMENSION_FIELDS = ("cost_center", "department", "project", "account")
+
+CENT = Decimal("0.01")
+# FinancialLine.amount: max_digits=19, decimal_places=2
+AMOUNT_LIMIT = Decimal(10) ** 17
+SOURCE_MAX_LENGTH = FinancialLine._meta.get_field("source").max_length
+
+
+class NDJSONParser(BaseParser):
+	"""
+	NDJSON: по объекту JSON на строку. Тело читается потоком —
+	request.data отдаёт генератор, и строки разбираются по мере записи.
+	Нечитаемая строка становится None и попадает в ошибки элемента.
+	"""
+	media_type = "application/x-ndjson"
+
+	def parse(self, stream, media_type=None, parser_context=None):
+		return _iter_ndjson(stream)
+
+
+def _iter_ndjson(stream):
+	if stream is None:
+		return
+	for line in stream:
+		line = line.strip()
+		if not line:
+			continue
+		try:
+			yield json.loads(line)
+		except ValueError:
+			yield None
+
+
+class BulkLineWriter:
+	"""
+	Проверка и запись элементов пакетного запроса. Вызывать внутри
+	transaction.atomic(). Повтор набора измерений внутри пачки —
+	последний элемент побеждает, как при последовательных запросах.
+	"""
+
+	def __init__(self, company, batch_size=None, max_items=None):
+		self.company = company
+		self.batch_size = batch_size or settings.FINANCIALS_BULK_BATCH_SIZE
+		self.max_items = max_items or settings.FINANCIALS_BULK_MAX_ITEMS
+		self.item_serializer = FinancialLineBulkItemSerializer()
+		self.results = []
+		self.counts = dict.fromkeys(
+			("created", "updated", "unchanged", "failed"), 0)
+		# Найденные ссылки: поле -> {значение: id}; общие на весь запрос
+		self._refs = {field: {} for field in REFERENCE_FIELDS}
+		# id периода -> period_key, грузится вместе со ссылками
+		self._period_keys = {}
+
+	def write(self, items):
+		"""items — итерируемый набор элементов; возвращает отчёт."""
+		batch = []
+		for item in items:
+			if len(self.results) + len(batch) >= self.max_items:
+				raise serializers.ValidationError({
+					"detail": f"Не больше {self.max_items} строк за запрос"})
+			batch.append(item)
+			if len(batch) == self.batch_size:
+				self._write_batch(batch)
+				batch = []
+		if batch:
+			self._write_batch(batch)
+		return {**self.counts, "results": self.results}
+
+	def _write_batch(self, batch):
+		valid = []
+		for item in batch:
+			result = {"index": len(self.results)}
+			self.results.append(result)
+			try:
+				valid.append((result, self._validate(item)))
+			except serializers.ValidationError as e:
+				self._fail(result, e.detail)
+
+		self._load_refs(values for _, values in valid)
+		lines = {}
+		for result, values in valid:
+			key, errors = self._key(values)
+			if errors:
+				self._fail(result, errors)
+				continue
+			# Повтор ключа: все элементы получают результат последнего
+			results, _ = lines.pop(key, ([], None))
+			lines[key] = (results + [result], values)
+
+		if lines:
+			self._upsert(lines)
+
+	def _validate(self, item):
+		if not isinstance(item, dict):
+			raise serializers.ValidationError({
+				"non_field_errors": ["Ожидается объект JSON"]})
+		values = _plain_values(item)
+		if values is None:
+			# Всё, что не прошло быструю проверку, — через сериализатор:
+			# он же формирует сообщения об ошибках
+			values = self.item_serializer.run_validation(item)
+		return values
+
+	def _fail(self, result, errors):
+		result.update(status="error", errors=errors)
+		self.counts["failed"] += 1
+
+	def _load_refs(self, items):
+		"""Одним запросом на справочник догружает ещё не найденные ссылки."""
+		wanted = {field: set() for field in REFERENCE_FIELDS}
+		for values in items:
+			for field, refs in wanted.items():
+				if values[field] is not None:
+					refs.add(values[field])
+
+		for field, (model, lookup) in REFERENCE_FIELDS.items():
+			known = self._refs[field]
+			missing = wanted[field] - known.keys()
+			if not missing:
+				continue
+			found = model.objects.filter(
+				company=self.company,
+				**{f"{lookup}__in": missing},
+			)
+			if field == "period":
+				found = found.values_list(lookup, "id", "period_key")
+				for value, pk, period_key in found:
+					known[value] = pk
+					self._period_keys[pk] = period_key
+			else:
+				known.update(found.values_list(lookup, "id"))
+
+	def _key(self, values):
+		key, errors = [], {}
+		for field, (_, lookup) in REFERENCE_FIELDS.items():
+			value = values[field]
+			pk = None if value is None else self._refs[field].get(value)
+			if value is not None and pk is None:
+				errors[field] = [f"Объект с {lookup}={value} не существует."]
+			key.append(pk)
+		return tuple(key), errors
+
+	def _upsert(self, lines):
+		existing = self._existing(lines)
+
+		objs, written = [], []
+		for key, (results, values) in lines.items():
+			current = existing.get(key)
+			new = tuple(values[field] for field in VALUE_FIELDS)
+			if current is None:
+				status = "created"
+			elif current[1:] == new:
+				self._succeed(results, "unchanged", current[0])
+				continue
+			else:
+				status = "updated"
+			obj = FinancialLine(
+				pk=None if current is None else current[0],
+				company=self.company,
+				period_key=self._period_keys[key[1]],
+				**dict(zip(KEY_FIELDS, key)),
+				**dict(zip(VALUE_FIELDS, new)),
+			)
+			objs.append(obj)
+			written.append((results, status, obj))
+
+		# Ключ unique_financial_line_key — выражения, ON CONFLICT
+		# по нему bulk_create не строит: строки сопоставлены по ключу
+		# выше, конфликт по pk
+		FinancialLine.objects.bulk_create(
+			objs,
+			batch_size=self.batch_size,
+			update_conflicts=True,
+			unique_fields=["id"],
+			update_fields=[*VALUE_FIELDS, "updated_at"],
+		)
+		for results, status, obj in written:
+			self._succeed(results, status, obj.pk)
+
+	def _succeed(self, results, status, pk):
+		for result in results:
+			result.update(status=status, id=pk)
+			self.counts[status] += 1
+
+	def _existing(self, lines):
+		"""Ключ -> (id, сумма, комментарий, источник) сохранённых строк."""
+		scenario_ids = {key[0] for key in lines}
+		period_ids = {key[1] for key in lines}
+		article_ids = {key[2] for key in lines}
+		rows = FinancialLine.objects.filter(
+			company=self.company,
+			scenario_id__in=scenario_ids,
+			period_id__in=period_ids,
+			article_id__in=article_ids,
+		).values_list("id", *VALUE_FIELDS, *KEY_FIELDS)
+		return {
+			tuple(row[len(VALUE_FIELDS) + 1:]): row[:len(VALUE_FIELDS) + 1]
+			for row in rows
+		}
+
+
+def _plain_values(item):
+	"""
+	Быстрая проверка типичного элемента без полей DRF. None — элемент
+	нужно проверить FinancialLineBulkItemSerializer: значение другого
+	типа, пробелы по краям, лишние знаки в сумме или ошибка.
+	"""
+	try:
+		values = {
+			"scenario": item["scenario"],
+			"period": item["period"],
+			"article": item["article"],
+			"comment": item.get("comment", ""),
+			"source": item.get("source", ""),
+		}
+		amount = item["amount"]
+	except KeyError:
+		return None
+	if type(values["period"]) is not int or type(amount) is not str:
+		return None
+	for field in ("scenario", "article"):
+		if not _trimmed(values[field]):
+			return None
+	for field in ("comment", "source"):
+		if not (values[field] == "" or _trimmed(values[field])):
+			return None
+	if len(values["source"]) > SOURCE_MAX_LENGTH:
+		return None
+	for field in DIMENSION_FIELDS:
+		value = values[field] = item.get(field)
+		if value is not None and not _trimmed(value):
+			return None
+
+	try:
+		amount = Decimal(amount)
+	except InvalidOperation:
+		return None
+	if not amount.is_finite() or amount.as_tuple().exponent < -2:
+		return None
+	amount = amount.quantize(CENT)
+	if abs(amount) >= AMOUNT_LIMIT:
+		return None
+	values["amount"] = amount
+	return values
+
+
+def _trimmed(value):
+	return type(value) is str and value != "" and value.strip() == value
@@ -0,0 +1,110 @@
+"""
+Быстрое представление списка FinancialLine.
+
+Строки списка собираются из словарей .values(), без экземпляров
+моделей и полей DRF на каждую строку. Выход совпадает
+с FinancialLineSerializer. ?fields= ограничивает набор полей —
+в запрос попадают только нужные колонки и соединения.
+"""
+from collections import namedtuple
+from operator import itemgetter
+
+from rest_framework import serializers
+
+from .pagination import KEY_FIELDS
+
+
+# lookups — колонки .values(), render(row) — значение поля
+ListField = namedtuple("ListField", ["lookups", "render"])
+
+# Форматирование как у полей FinancialLineSerializer
+AMOUNT = serializers.DecimalField(max_digits=19, decimal_places=2)
+DATETIME = serializers.DateTimeField()
+
+
+def _period_display(row):
+	# Как TimePeriod.__str__, без обращения к компании периода
+	year = row["period__year"]
+	month = row["period__month"]
+	quarter = row["period__quarter"]
+	company = row["period__company__name"]
+	if month:
+		return f"{year}-{month:02d} ({company})"
+	if quarter:
+		return f"{year}-Q{quarter} ({company})"
+	return f"{year} ({company})"
+
+
+def _field(lookup, render=None):
+	return ListField((lookup,), render or itemgetter(lookup))
+
+
+def _formatted(lookup, field):
+	def render(row):
+		value = row[lookup]
+		return None if value is None else field.to_representation(value)
+	return ListField((lookup,), render)
+
+
+LIST_FIELDS = {
+	"id": _field("id"),
+	"scenario": _field("scenario__slug"),
+	"scenario_name": _field("scenario__name"),
+	"period": _field("period_id"),
+	"period_display": ListField(
+		("period__year", "period__quarter", "period__month",
+			"period__company__name"),
+		_period_display),
+	"article": _field("article__slug"),
+	"article_name": _field("article__name"),
+	"cost_center": _field("cost_center__slug"),
+	"department": _field("department__slug"),
+	"project": _field("project__slug"),
+	"account": _field("account__slug"),
+	"amount": _formatted("amount", AMOUNT),
+	"comment": _field("comment"),
+	"source": _field("source"),
+	"company": _field("company_id"),
+	"created_at": _formatted("created_at", DATETIME),
+	"updated_at": _formatted("updated_at", DATETIME),
+}
+
+
+class FinancialLineListing:
+	"""
+	Список строк для FinancialLineListCreateView.get:
+	values() отбирает колонки полей, render() собирает ответ.
+	"""
+
+	def __init__(self, fields=None):
+		fields = fields or list(LIST_FIELDS)
+		unknown = [name for name in fields if name not in LIST_FIELDS]
+		if unknown:
+			raise serializers.ValidationError({
+				"fields": [
+					"Неизвестные поля: " + ", ".join(unknown)
+					+ ". Доступны: " + ", ".join(LIST_FIELDS)]})
+		self.fields = fields
+		self._renderers = [
+			(name, LIST_FIELDS[name].render) for name in fields]
+
+	@classmethod
+	def from_request(cls, request):
+		"""?fields=id,amount — только перечисленные поля."""
+		raw = request.query_params.get("fields", "")
+		fields = [name.strip() for name in raw.split(",") if name.strip()]
+		return cls(fields)
+
+	def values(self, queryset):
+		# Ключ курсора нужен всегда, даже если полей ключа нет в ответе
+		lookups = dict.fromkeys(KEY_FIELDS)
+		for name in self.fields:
+			lookups.update(dict.fromkeys(LIST_FIELDS[name].lookups))
+		return queryset.values(*lookups)
+
+	def render(self, rows):
+		renderers = self._renderers
+		return [
+			{name: render(row) for name, render in renderers}
+			for row in rows
+		]
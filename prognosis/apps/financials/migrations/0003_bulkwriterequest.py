@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('financials', '0002_remove_financialline_financials__article_e4b472_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkWriteRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('key', models.CharField(max_length=255, verbose_name='Ключ идемпотентности')),
+                ('response', models.JSONField(verbose_name='Ответ')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_set', to='accounts.company', verbose_name='Компания')),
+            ],
+            options={
+                'verbose_name': 'Пакетная запись строк',
+                'verbose_name_plural': 'Пакетные записи строк',
+                'constraints': [models.UniqueConstraint(fields=('company', 'key'), name='unique_bulk_write_request_key')],
+            },
+        ),
+    ]
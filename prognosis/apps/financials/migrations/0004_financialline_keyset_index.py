@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('core', '0002_scenario_core_scenar_company_1b4ad5_idx'),
+        ('dimensions', '0002_department_created_at_department_updated_at_and_more'),
+        ('financials', '0003_bulkwriterequest'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='financialline',
+            index=models.Index(fields=['company', 'period', 'article', 'id'], name='financials__company_7b2308_idx'),
+        ),
+    ]
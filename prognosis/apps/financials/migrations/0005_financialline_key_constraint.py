@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:58
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+LINE_KEY = (
+    'company', 'scenario', 'period', 'article',
+    'cost_center', 'department', 'project', 'account',
+)
+
+
+def remove_duplicate_lines(apps, schema_editor):
+    # Прежнее ограничение считало пустые измерения разными, поэтому
+    # дубли могли накопиться. Остаётся последняя записанная строка
+    FinancialLine = apps.get_model('financials', 'FinancialLine')
+    duplicates = FinancialLine.objects.values(*LINE_KEY).annotate(
+        keep=Max('id'), lines=Count('id')).filter(lines__gt=1)
+    for group in list(duplicates):
+        keep = group.pop('keep')
+        group.pop('lines')
+        FinancialLine.objects.filter(**group).exclude(id=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('core', '0002_scenario_core_scenar_company_1b4ad5_idx'),
+        ('dimensions', '0002_department_created_at_department_updated_at_and_more'),
+        ('financials', '0004_financialline_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='financialline',
+            name='unique_financial_line_with_nulls',
+        ),
+        migrations.RunPython(remove_duplicate_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='financialline',
+            constraint=models.UniqueConstraint(models.F('company'), models.F('scenario'), models.F('period'), models.F('article'), django.db.models.functions.comparison.Coalesce('cost_center', models.Value(0)), django.db.models.functions.comparison.Coalesce('department', models.Value(0)), django.db.models.functions.comparison.Coalesce('project', models.Value(0)), django.db.models.functions.comparison.Coalesce('account', models.Value(0)), name='unique_financial_line_key'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_period_key(apps, schema_editor):
+    FinancialLine = apps.get_model('financials', 'FinancialLine')
+    TimePeriod = apps.get_model('core', 'TimePeriod')
+    FinancialLine.objects.update(period_key=Subquery(
+        TimePeriod.objects.filter(pk=OuterRef('period_id')).values('period_key')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_timeperiod_period_key'),
+        ('financials', '0005_financialline_key_constraint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='financialline',
+            name='period_key',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='YYYYMM; заполняется из периода при сохранении', verbose_name='Ключ периода'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_period_key, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='financialline',
+            options={'ordering': ['-period_key', 'article__code'], 'verbose_name': 'Строка финансовых данных', 'verbose_name_plural': 'Финансовые данные'},
+        ),
+        migrations.AddIndex(
+            model_name='financialline',
+            index=models.Index(fields=['company', 'scenario', 'period_key'], name='financials__company_b24fbf_idx'),
+        ),
+    ]
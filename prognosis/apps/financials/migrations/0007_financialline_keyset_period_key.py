@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('core', '0003_timeperiod_period_key'),
+        ('dimensions', '0002_department_created_at_department_updated_at_and_more'),
+        ('financials', '0006_financialline_period_key'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='financialline',
+            name='financials__company_7b2308_idx',
+        ),
+        migrations.AddIndex(
+            model_name='financialline',
+            index=models.Index(fields=['company', '-period_key', 'article', 'id'], name='financials__company_9146da_idx'),
+        ),
+    ]
@@ -1,13 +1,49 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce
 from django.forms import ValidationError
 from django.utils.translation import gettext_lazy as _
-from core.models import CompanyRelatedModel
+from core.models import CompanyRelatedModel, TimePeriod
 from dimensions.models import (
 	BudgetArticle, CostCenter,
 	Department, Project, ChartOfAccounts
 )
 
 
+LINE_KEY_CONSTRAINT = "unique_financial_line_key"
+
+
+def fill_period_keys(lines):
+	"""
+	Копирует TimePeriod.period_key в строки без ключа: из загруженного
+	периода, остальные — одним запросом на все строки.
+	"""
+	missing = {}
+	for line in lines:
+		if line.period_key is not None:
+			continue
+		if FinancialLine.period.is_cached(line):
+			line.period_key = line.period.period_key
+		else:
+			missing.setdefault(line.period_id, []).append(line)
+	if not missing:
+		return
+	keys = dict(TimePeriod.objects.filter(
+		pk__in=missing).values_list("pk", "period_key"))
+	for period_id, period_lines in missing.items():
+		for line in period_lines:
+			line.period_key = keys.get(period_id)
+
+
+class FinancialLineQuerySet(models.QuerySet):
+
+	def bulk_create(self, objs, *args, **kwargs):
+		# bulk_create не вызывает save(): ключ периода заполняется здесь
+		objs = list(objs)
+		fill_period_keys(objs)
+		return super().bulk_create(objs, *args, **kwargs)
+
+
 class FinancialLine(CompanyRelatedModel):
 	"""
 	Основная строка финансовых данных: факт, план, бюджет, корректировка.
@@ -25,6 +61,12 @@ class FinancialLine(CompanyRelatedModel):
 		verbose_name=_("Период"),
 		related_name="financial_lines"
 	)
+	# Копия TimePeriod.period_key: фильтры и сортировка по периоду
+	# без соединения с core_timeperiod
+	period_key = models.PositiveIntegerField(
+		_("Ключ периода"),
+		editable=False,
+		help_text=_("YYYYMM; заполняется из периода при сохранении"))
 
 	# Основные измерения (dimensions)
 	article = models.ForeignKey(
@@ -78,47 +120,78 @@ class FinancialLine(CompanyRelatedModel):
 		blank=True,
 		help_text=_("Ручной ввод, Excel, ERP и т.д.)"))
 
+	objects = FinancialLineQuerySet.as_manager()
+
 	class Meta:
 		verbose_name = _("Строка финансовых данных")
 		verbose_name_plural = _("Финансовые данные")
-		ordering = ["-period__year", "-period__month", "article__code"]
+		ordering = ["-period_key", "article__code"]
 		indexes = [
 			models.Index(fields=["company", "scenario", "period"]),
+			# Диапазоны периодов (period_key__range) — одним сканом индекса
+			models.Index(fields=["company", "scenario", "period_key"]),
+			# Порядок постраничной выдачи по курсору (pagination)
+			models.Index(fields=["company", "-period_key", "article", "id"]),
 			models.Index(fields=["company", "article"]),
 			models.Index(fields=["company", "cost_center"]),
 			models.Index(fields=["company", "project"]),
 			models.Index(fields=["company", "department"]),
 		]
 		constraints = [
+			# Пустые измерения сравниваются как равные (COALESCE в 0):
+			# строка без ЦФО — одна на сценарий, период и статью
 			models.UniqueConstraint(
-				fields=[
-					"company",
-					"scenario",
-					"period",
-					"article",
-					"cost_center",
-					"department",
-					"project",
-					"account"],
-				name="unique_financial_line_with_nulls",
-				nulls_distinct=True,
+				"company",
+				"scenario",
+				"period",
+				"article",
+				*(Coalesce(field, Value(0)) for field in (
+					"cost_center", "department", "project", "account")),
+				name=LINE_KEY_CONSTRAINT,
 			)
 		]
 
 	def save(self, *args, **kwargs):
-		if self.pk is None:  # только при создании
-			if FinancialLine.objects.filter(
-				company=self.company,
-				scenario=self.scenario,
-				period=self.period,
-				article=self.article,
-				cost_center=self.cost_center,
-				department=self.department,
-				project=self.project,
-				account=self.account,
-			).exists():
-				raise ValidationError("Такая комбинация финансовых данных уже существует")
-		super().save(*args, **kwargs)
+		# Ключ всегда берётся из текущего периода строки
+		update_fields = kwargs.get("update_fields")
+		if update_fields is None or "period" in update_fields:
+			self.period_key = None
+			fill_period_keys([self])
+			if update_fields is not None:
+				kwargs["update_fields"] = [*update_fields, "period_key"]
+		# Уникальность проверяет БД. Savepoint — только для вставки,
+		# чтобы дубль не ломал внешнюю транзакцию; обновление идёт
+		# без него, и его ошибка откатывает внешнюю транзакцию
+		try:
+			with transaction.atomic(
+				using=kwargs.get("using"), savepoint=self._state.adding
+			):
+				super().save(*args, **kwargs)
+		except IntegrityError as e:
+			if LINE_KEY_CONSTRAINT not in str(e):
+				raise
+			raise ValidationError(
+				"Такая комбинация финансовых данных уже существует") from e
 
 	def __str__(self):
 		return f"{self.scenario} | {self.period} | {self.article} | {self.amount}"
+
+
+class BulkWriteRequest(CompanyRelatedModel):
+	"""
+	Результат пакетной записи строк по ключу идемпотентности.
+	Повтор запроса с тем же заголовком Idempotency-Key возвращает
+	сохранённый ответ, строки повторно не пишутся.
+	"""
+	key = models.CharField(_("Ключ идемпотентности"), max_length=255)
+	response = models.JSONField(_("Ответ"))
+
+	class Meta:
+		verbose_name = _("Пакетная запись строк")
+		verbose_name_plural = _("Пакетные записи строк")
+		constraints = [
+			models.UniqueConstraint(
+				fields=["company", "key"],
+				name="unique_bulk_write_request_key",
+			)
+		]
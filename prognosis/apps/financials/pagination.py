@@ -0,0 +1,100 @@
+"""
+Постраничная выдача FinancialLine по ключу (keyset).
+
+Страница — строки после курсора в порядке (-period_key, article, id):
+от новых периодов к старым, как в Meta.ordering. Порядок покрывает
+индекс (company, -period_key, article, id): любая страница читается
+диапазоном индекса, без OFFSET, и стоит как первая.
+Курсор — ключ последней строки страницы, поэтому вставки и удаления
+между запросами не сдвигают и не дублируют строки.
+"""
+import base64
+import binascii
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+ORDERING = ("-period_key", "article_id", "id")
+# Поля ключа курсора — колонки .values() в порядке ORDERING
+KEY_FIELDS = tuple(field.lstrip("-") for field in ORDERING)
+
+
+class FinancialLineCursorPagination(BasePagination):
+	"""Только вперёд: ?cursor= из поля next предыдущей страницы."""
+	cursor_query_param = "cursor"
+	page_size_query_param = "page_size"
+
+	def paginate_queryset(self, queryset, request, view=None):
+		self.request = request
+		self.page_size = self.get_page_size(request)
+
+		after = self.decode_cursor(request)
+		if after is not None:
+			queryset = queryset.filter(keyset_after(after))
+
+		rows = list(queryset.order_by(*ORDERING)[:self.page_size + 1])
+		self.has_next = len(rows) > self.page_size
+		page = rows[:self.page_size]
+		self.next_key = row_key(page[-1]) if self.has_next else None
+		return page
+
+	def get_paginated_response(self, data):
+		return Response({
+			"next": self.get_next_link(),
+			"results": data,
+		})
+
+	def get_page_size(self, request):
+		page_size = settings.FINANCIALS_PAGE_SIZE
+		value = request.query_params.get(self.page_size_query_param, "")
+		if value.isdigit() and int(value) > 0:
+			page_size = min(int(value), settings.FINANCIALS_MAX_PAGE_SIZE)
+		return page_size
+
+	def get_next_link(self):
+		if self.next_key is None:
+			return None
+		url = self.request.build_absolute_uri()
+		return replace_query_param(
+			url, self.cursor_query_param, encode_cursor(self.next_key))
+
+	def decode_cursor(self, request):
+		encoded = request.query_params.get(self.cursor_query_param)
+		if not encoded:
+			return None
+		try:
+			raw = base64.urlsafe_b64decode(encoded.encode("ascii")).decode()
+			key = tuple(int(part) for part in raw.split(":"))
+		except (UnicodeError, binascii.Error, ValueError):
+			raise NotFound("Некорректный курсор")
+		if len(key) != len(ORDERING):
+			raise NotFound("Некорректный курсор")
+		return key
+
+
+def encode_cursor(key):
+	raw = ":".join(str(part) for part in key)
+	return base64.urlsafe_b64encode(raw.encode()).decode("ascii")
+
+
+def row_key(row):
+	"""Ключ курсора строки .values() (см. listing)."""
+	return tuple(row[field] for field in KEY_FIELDS)
+
+
+def keyset_after(key):
+	"""
+	Строки после key в порядке ORDERING. Условие period_key <= задаёт
+	начало диапазона индекса, остальное отсекает строки до курсора.
+	"""
+	period_key, article, pk = key
+	return Q(period_key__lte=period_key) & (
+		Q(period_key__lt=period_key)
+		| Q(article_id__gt=article)
+		| Q(article_id=article, id__gt=pk)
+	)
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from accounts.tenancy import get_tenant
 from .models import FinancialLine
 from core.models import Scenario, TimePeriod
 from dimensions.models import (
@@ -66,8 +67,8 @@ class FinancialLineSerializer(serializers.ModelSerializer):
 	def __init__(self, *args, **kwargs):
 		super().__init__(*args, **kwargs)
 		request = self.context.get('request')
-		if request and hasattr(request.user, 'company_roles'):
-			company = request.user.company_roles.first().company
+		company = get_tenant(request).company if request else None
+		if company:
 			self.fields['scenario'].queryset = Scenario.objects.filter(
 				company=company)
 			self.fields['article'].queryset = BudgetArticle.objects.filter(
@@ -82,3 +83,40 @@ class FinancialLineSerializer(serializers.ModelSerializer):
 				company=company)
 			self.fields['account'].queryset = ChartOfAccounts.objects.filter(
 				company=company)
+
+
+class FinancialLineBulkItemSerializer(serializers.Serializer):
+	"""
+	Элемент пакетной записи (FinancialLineBulkView). Ссылки — те же,
+	что в FinancialLineSerializer (slug, период — id), но разрешаются
+	не здесь, а пачкой в financials.bulk — один запрос на справочник.
+	"""
+	scenario = serializers.CharField()
+	period = serializers.IntegerField()
+	article = serializers.CharField()
+	cost_center = serializers.CharField(
+		allow_null=True,
+		required=False,
+		default=None)
+	department = serializers.CharField(
+		allow_null=True,
+		required=False,
+		default=None)
+	project = serializers.CharField(
+		allow_null=True,
+		required=False,
+		default=None)
+	account = serializers.CharField(
+		allow_null=True,
+		required=False,
+		default=None)
+	amount = serializers.DecimalField(max_digits=19, decimal_places=2)
+	comment = serializers.CharField(
+		allow_blank=True,
+		required=False,
+		default="")
+	source = serializers.CharField(
+		max_length=100,
+		allow_blank=True,
+		required=False,
+		default="")
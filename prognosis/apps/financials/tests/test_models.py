@@ -53,3 +53,85 @@ def test_financialline_save_prevents_duplicate():
 	).count()
 
 	assert count == 1
+
+
+@pytest.mark.django_db
+def test_financialline_save_relies_on_unique_constraint(django_assert_num_queries):
+	from django.db import connection
+	from dimensions.models import CostCenter
+
+	company = Company.objects.create(name="ModelCo")
+	scenario = Scenario.objects.create(company=company, name="S1", type="budget")
+	period = TimePeriod.objects.create(company=company, year=2025, month=1)
+	article = BudgetArticle.add_root(company=company, code="A1", name="Article")
+	cost_center = CostCenter.objects.create(
+		company=company, code="CC1", name="CC 1", slug="cc1")
+	fields = dict(
+		company=company,
+		scenario=scenario,
+		period=period,
+		article=article,
+		cost_center=cost_center)
+
+	# Без запроса exists(): только INSERT (и savepoint вокруг него)
+	line = FinancialLine(amount="1.00", **fields)
+	with django_assert_num_queries(3 if connection.features.uses_savepoints else 1):
+		line.save()
+
+	with pytest.raises(ValidationError):
+		FinancialLine(amount="2.00", **fields).save()
+
+	# Транзакция после отказа остаётся рабочей
+	other = FinancialLine(amount="3.00", **{**fields, "cost_center": None})
+	other.save()
+	assert FinancialLine.objects.filter(company=company).count() == 2
+
+	# Обновление — один UPDATE, без savepoint
+	line.amount = "5.00"
+	with django_assert_num_queries(1):
+		line.save()
+
+
+@pytest.mark.django_db
+def test_financialline_period_key_follows_period():
+	company = Company.objects.create(name="KeyCo")
+	scenario = Scenario.objects.create(
+		company=company,
+		name="S1",
+		type="budget"
+	)
+	period = TimePeriod.objects.create(
+		company=company,
+		year=2025,
+		month=3
+	)
+	article = BudgetArticle.add_root(
+		company=company,
+		code="A1",
+		name="Article"
+	)
+	line = FinancialLine.objects.create(
+		company=company,
+		scenario=scenario,
+		period=period,
+		article=article,
+		amount="10.00"
+	)
+	assert line.period_key == 202503
+
+	period.month = 11
+	period.quarter = 4
+	period.save()
+
+	line.refresh_from_db()
+	assert line.period_key == 202511
+
+	# Правки мимо save() тоже обновляют ключ строк
+	TimePeriod.objects.filter(pk=period.pk).update(month=12)
+	line.refresh_from_db()
+	assert line.period_key == 202512
+
+	period.month, period.quarter = 1, 1
+	TimePeriod.objects.bulk_update([period], ["month", "quarter"])
+	line.refresh_from_db()
+	assert line.period_key == 202501
@@ -30,3 +30,24 @@ def test_financialline_serializer_accepts_slugs_and_scopes():
     instance = serializer.save(company=company)
     assert instance.company == company
     assert instance.amount == 10
+
+
+@pytest.mark.django_db
+def test_listing_matches_financialline_serializer():
+    from decimal import Decimal
+    from dimensions.models import CostCenter
+    from financials.listing import FinancialLineListing
+    from financials.models import FinancialLine
+
+    company = Company.objects.create(name='ListCo')
+    scenario = Scenario.objects.create(company=company, name='Budget 2026', type='budget')
+    month = TimePeriod.objects.create(company=company, year=2025, month=1)
+    quarter = TimePeriod.objects.create(company=company, year=2025, quarter=2)
+    article = BudgetArticle.add_root(company=company, code='RA', name='Revenue')
+    cost_center = CostCenter.objects.create(company=company, code='CC1', name='CC 1', slug='cc1')
+    FinancialLine.objects.create(company=company, scenario=scenario, period=month, article=article, amount=Decimal('10.5'), cost_center=cost_center, comment='note')
+    FinancialLine.objects.create(company=company, scenario=scenario, period=quarter, article=article, amount=Decimal('-3'))
+
+    queryset = FinancialLine.objects.order_by('id')
+    listing = FinancialLineListing()
+    assert listing.render(listing.values(queryset)) == FinancialLineSerializer(queryset, many=True).data
@@ -1,4 +1,6 @@
+import json
 import pytest
+from decimal import Decimal
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework import status
@@ -9,7 +11,9 @@ from accounts.models import Company
 from core.models import Scenario, TimePeriod
 from dimensions.models import BudgetArticle
 from financials.models import FinancialLine
-from financials.views import FinancialLineListCreateView, FinancialLineDetailView
+from financials.views import (
+	FinancialLineListCreateView, FinancialLineBulkView, FinancialLineDetailView
+)
 
 User = get_user_model()
 
@@ -74,23 +78,23 @@ class TestFinancialViews:
 		request = auth_client_factory(user, 'get', create_url)
 		response = FinancialLineListCreateView.as_view()(request)
 		assert response.status_code == status.HTTP_200_OK
-		assert len(response.data) == 2
+		assert len(response.data['results']) == 2
 
 		# Фильтр по scenario (slug)
 		request = auth_client_factory(user, 'get', f"{create_url}?scenario={s1.slug}")
 		response = FinancialLineListCreateView.as_view()(request)
-		assert len(response.data) == 1
+		assert len(response.data['results']) == 1
 
 		# Фильтр по period (YYYY-MM)
 		period_str = f"{p2.year}-{p2.month:02d}"
 		request = auth_client_factory(user, 'get', f"{create_url}?period={period_str}")
 		response = FinancialLineListCreateView.as_view()(request)
-		assert len(response.data) == 1
+		assert len(response.data['results']) == 1
 
 		# Фильтр по article (slug)
 		request = auth_client_factory(user, 'get', f"{create_url}?article={a1.slug}")
 		response = FinancialLineListCreateView.as_view()(request)
-		assert len(response.data) == 1
+		assert len(response.data['results']) == 1
 
 	def test_detail_update_delete_and_permissions(self, setup_user_company, auth_client_factory):
 		user, company = setup_user_company
@@ -176,3 +180,142 @@ class TestFinancialViews:
 		request = auth_client_factory(user, "post", create_url, data=data, format="json")
 		with pytest.raises(ValidationError):
 			FinancialLineListCreateView.as_view()(request)
+
+	def test_list_cursor_pagination(self, setup_user_company, auth_client_factory, settings):
+		settings.FINANCIALS_PAGE_SIZE = 2
+		user, company = setup_user_company
+		s = Scenario.objects.create(company=company, name='Budget 2026', type='budget')
+		# id периодов не совпадают с хронологией: порядок — по period_key
+		periods = [TimePeriod.objects.create(company=company, year=2025, month=m) for m in (1, 3, 2)]
+		articles = [BudgetArticle.add_root(company=company, code=f'A{n}', name=f'A{n}') for n in range(2)]
+		for p in periods:
+			for a in articles:
+				FinancialLine.objects.create(company=company, scenario=s, period=p, article=a, amount=Decimal('1'))
+		expected = list(FinancialLine.objects.order_by('-period_key', 'article_id', 'id').values_list('id', flat=True))
+		months = list(FinancialLine.objects.filter(id__in=expected).values_list('id', 'period__month'))
+		assert [dict(months)[pk] for pk in expected] == [3, 3, 2, 2, 1, 1]
+
+		def get(url):
+			request = auth_client_factory(user, 'get', url)
+			response = FinancialLineListCreateView.as_view()(request)
+			assert response.status_code == status.HTTP_200_OK
+			return response.data
+
+		url = reverse('financials:financialline-list-create')
+		first = get(url)
+		assert [row['id'] for row in first['results']] == expected[:2]
+
+		# Удаление строки до курсора не сдвигает следующие страницы
+		FinancialLine.objects.filter(id=expected[0]).delete()
+		second = get(first['next'])
+		assert [row['id'] for row in second['results']] == expected[2:4]
+
+		third = get(second['next'] + '&page_size=10')
+		assert [row['id'] for row in third['results']] == expected[4:]
+		assert third['next'] is None
+
+		request = auth_client_factory(user, 'get', f'{url}?cursor=broken')
+		response = FinancialLineListCreateView.as_view()(request)
+		assert response.status_code == status.HTTP_404_NOT_FOUND
+
+	def test_list_sparse_fields_and_query_count(self, setup_user_company, auth_client_factory, django_assert_num_queries):
+		user, company = setup_user_company
+		s = Scenario.objects.create(company=company, name='Budget 2026', type='budget')
+		a = BudgetArticle.add_root(company=company, code='RA', name='Revenue')
+		for month in range(1, 13):
+			p = TimePeriod.objects.create(company=company, year=2025, month=month)
+			FinancialLine.objects.create(company=company, scenario=s, period=p, article=a, amount=Decimal(month))
+		url = reverse('financials:financialline-list-create')
+
+		# Роли пользователя и одна страница — при любом числе строк
+		request = auth_client_factory(user, 'get', url)
+		with django_assert_num_queries(2):
+			response = FinancialLineListCreateView.as_view()(request)
+		assert len(response.data['results']) == 12
+		assert response.data['results'][0]['period_display'] == f'2025-12 ({company.name})'
+
+		request = auth_client_factory(user, 'get', f'{url}?fields=id,amount')
+		response = FinancialLineListCreateView.as_view()(request)
+		assert response.data['results'][0] == {'id': response.data['results'][0]['id'], 'amount': '12.00'}
+
+		request = auth_client_factory(user, 'get', f'{url}?fields=id,nope')
+		response = FinancialLineListCreateView.as_view()(request)
+		assert response.status_code == status.HTTP_400_BAD_REQUEST
+		assert 'nope' in str(response.data['fields'])
+
+
+@pytest.mark.django_db
+class TestFinancialLineBulkView:
+	def setup_data(self, company):
+		self.scenario = Scenario.objects.create(company=company, name='Budget 2026', type='budget')
+		self.periods = [TimePeriod.objects.create(company=company, year=2025, month=m) for m in (1, 2, 3)]
+		self.article = BudgetArticle.add_root(company=company, code='RA', name='Revenue')
+
+	def post(self, user, factory, body, content_type, **headers):
+		url = reverse('financials:financialline-bulk')
+		request = factory(user, 'post', url, data=body, content_type=content_type, **headers)
+		return FinancialLineBulkView.as_view()(request)
+
+	def item(self, period, amount, **extra):
+		return {'scenario': self.scenario.slug, 'period': period.pk, 'article': self.article.slug, 'amount': amount, **extra}
+
+	def test_ndjson_upserts_and_reports_each_item(self, setup_user_company, auth_client_factory):
+		user, company = setup_user_company
+		self.setup_data(company)
+		p1, p2, p3 = self.periods
+		FinancialLine.objects.create(company=company, scenario=self.scenario, period=p1, article=self.article, amount='1.00')
+		FinancialLine.objects.create(company=company, scenario=self.scenario, period=p2, article=self.article, amount='2.00')
+
+		lines = [
+			self.item(p1, '1.00'),
+			self.item(p2, 5),
+			self.item(p3, '3', comment='new'),
+			self.item(p3, '4'),
+			self.item(p1, '1', cost_center='missing'),
+			{'scenario': self.scenario.slug},
+		]
+		body = "\n".join(json.dumps(line) for line in lines) + "\nnot json\n"
+		response = self.post(user, auth_client_factory, body, 'application/x-ndjson')
+
+		assert response.status_code == status.HTTP_200_OK
+		results = response.data['results']
+		assert [r['status'] for r in results] == ['unchanged', 'updated', 'created', 'created', 'error', 'error', 'error']
+		assert results[2]['id'] == results[3]['id']
+		assert results[4]['errors'] == {'cost_center': ['Объект с slug=missing не существует.']}
+		assert 'amount' in results[5]['errors']
+		assert (response.data['created'], response.data['updated'], response.data['unchanged'], response.data['failed']) == (2, 1, 1, 3)
+		assert FinancialLine.objects.get(period=p2).amount == Decimal('5.00')
+		assert FinancialLine.objects.get(period=p3).amount == Decimal('4.00')
+
+	@pytest.mark.parametrize('body', ['5', '"x"', 'null', '{"amount": 1}'])
+	def test_non_array_json_body_is_rejected(self, setup_user_company, auth_client_factory, body):
+		user, company = setup_user_company
+		response = self.post(user, auth_client_factory, body, 'application/json')
+		assert response.status_code == status.HTTP_400_BAD_REQUEST
+		assert not FinancialLine.objects.exists()
+
+	def test_idempotency_key_replays_stored_response(self, setup_user_company, auth_client_factory):
+		user, company = setup_user_company
+		self.setup_data(company)
+		body = json.dumps([self.item(self.periods[0], '10')])
+
+		first = self.post(user, auth_client_factory, body, 'application/json', HTTP_IDEMPOTENCY_KEY='batch-1')
+		FinancialLine.objects.update(amount='99.00')
+		second = self.post(user, auth_client_factory, body, 'application/json', HTTP_IDEMPOTENCY_KEY='batch-1')
+
+		assert second.status_code == status.HTTP_200_OK
+		assert second['Idempotent-Replayed'] == 'true'
+		assert second.data == first.data
+		assert FinancialLine.objects.get().amount == Decimal('99.00')
+
+	def test_query_count_does_not_grow_with_items(self, setup_user_company, auth_client_factory, django_assert_max_num_queries):
+		user, company = setup_user_company
+		self.setup_data(company)
+		periods = [TimePeriod.objects.create(company=company, year=year, month=month) for year in range(2030, 2055) for month in range(1, 13)]
+		body = json.dumps([self.item(period, '1.5') for period in periods])
+
+		with django_assert_max_num_queries(12):
+			response = self.post(user, auth_client_factory, body, 'application/json')
+
+		assert response.data['created'] == 300
+		assert FinancialLine.objects.count() == 300
@@ -1,5 +1,7 @@
 from django.urls import path
-from .views import FinancialLineListCreateView, FinancialLineDetailView
+from .views import (
+	FinancialLineListCreateView, FinancialLineBulkView, FinancialLineDetailView
+)
 
 app_name = 'financials'
 
@@ -8,6 +10,10 @@ urlpatterns = [
 		'v1/lines/',
 		FinancialLineListCreateView.as_view(),
 		name='financialline-list-create'),
+	path(
+		'v1/lines/bulk/',
+		FinancialLineBulkView.as_view(),
+		name='financialline-bulk'),
 	path(
 		'v1/lines/<slug:pk>/',
 		FinancialLineDetailView.as_view(),
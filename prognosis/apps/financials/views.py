@@ -1,25 +1,38 @@
+from types import GeneratorType
+
 from rest_framework.views import APIView
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import serializers, status
 from rest_framework.permissions import IsAuthenticated
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
-from .models import FinancialLine
+from accounts.tenancy import get_tenant
+from core.models import period_key
+from .bulk import BulkLineWriter, NDJSONParser
+from .listing import FinancialLineListing
+from .models import BulkWriteRequest, FinancialLine
+from .pagination import FinancialLineCursorPagination
 from .serializers import FinancialLineSerializer
 
 
 class FinancialLineListCreateView(APIView):
+	"""
+	GET — строки постранично по курсору (см. pagination):
+	{"next": ссылка или null, "results": [...]}, ?page_size= до
+	FINANCIALS_MAX_PAGE_SIZE. Строки собираются из .values()
+	(см. listing); ?fields=id,period,amount — только эти поля.
+	"""
 	permission_classes = [IsAuthenticated]
 
 	def get_queryset(self):
 		return FinancialLine.objects.filter(
-			company__user_roles__user=self.request.user
-		).select_related(
-			"scenario", "period",
-			"article", "cost_center",
-			"department", "project", "account"
+			company_id__in=get_tenant(self.request).company_ids
 		)
 
 	def get(self, request):
+		listing = FinancialLineListing.from_request(request)
 		queryset = self.get_queryset()
 
 		# Filters (examples:
@@ -35,24 +48,30 @@ class FinancialLineListCreateView(APIView):
 			else:
 				queryset = queryset.filter(scenario__slug=scenario_q)
 
+		# Период — по period_key строки, без соединения с периодами
 		if period_q:
 			if period_q.isdigit():
 				if len(period_q) == 4:  # год
-					queryset = queryset.filter(period__year=int(period_q))
+					year = int(period_q)
+					queryset = queryset.filter(period_key__range=(
+						period_key(year), period_key(year) + 99))
 				else:
 					queryset = queryset.filter(period_id=int(period_q))
 			elif '-' in period_q and len(period_q) == 7:  # YYYY-MM
 				year, month = period_q.split('-')
 				if year.isdigit() and month.isdigit():
-					queryset = queryset.filter(
-						period__year=int(year),
-						period__month=int(month))
+					queryset = queryset.filter(period_key=period_key(
+						int(year), month=int(month)))
 			elif period_q.startswith('Q'):  # 2025-Q1
 				parts = period_q.split('-Q')
 				if len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
+					year, quarter = int(parts[0]), int(parts[1])
+					# Месяцы квартала и сам квартальный период
 					queryset = queryset.filter(
-						period__year=int(parts[0]),
-						period__quarter=int(parts[1]))
+						Q(period_key__range=(
+							period_key(year, month=quarter * 3 - 2),
+							period_key(year, month=quarter * 3)))
+						| Q(period_key=period_key(year, quarter=quarter)))
 
 		if article_q:
 			# accept either numeric id or slug
@@ -61,24 +80,87 @@ class FinancialLineListCreateView(APIView):
 			else:
 				queryset = queryset.filter(article__slug=article_q)
 
-		serializer = FinancialLineSerializer(queryset, many=True)
-		return Response(serializer.data)
+		# Соединения — только для запрошенных полей
+		paginator = FinancialLineCursorPagination()
+		page = paginator.paginate_queryset(
+			listing.values(queryset), request, view=self)
+		return paginator.get_paginated_response(listing.render(page))
 
 	def post(self, request):
 		serializer = FinancialLineSerializer(
 			data=request.data,
 			context={'request': request})
 		if serializer.is_valid():
-			user_role = request.user.company_roles.first()
-			if not user_role:
+			company = get_tenant(request).company
+			if not company:
 				return Response(
 					{"detail": "User not associated with any company."},
 					status=status.HTTP_400_BAD_REQUEST)
-			serializer.save(company=user_role.company)
+			serializer.save(company=company)
 			return Response(serializer.data, status=status.HTTP_201_CREATED)
 		return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class FinancialLineBulkView(APIView):
+	"""
+	Пакетная запись строк: массив JSON или NDJSON
+	(Content-Type: application/x-ndjson), элементы — как у POST /lines/.
+	Строка с тем же набором измерений обновляется. Ответ — счётчики
+	и результат по каждому элементу: created/updated/unchanged
+	с id строки или error с ошибками.
+
+	Заголовок Idempotency-Key: повтор запроса с тем же ключом
+	возвращает сохранённый ответ без повторной записи.
+	"""
+	permission_classes = [IsAuthenticated]
+	parser_classes = [JSONParser, NDJSONParser]
+
+	def post(self, request):
+		company = get_tenant(request).company
+		if not company:
+			return Response(
+				{"detail": "User not associated with any company."},
+				status=status.HTTP_400_BAD_REQUEST)
+
+		key = request.headers.get("Idempotency-Key", "")
+		max_key = BulkWriteRequest._meta.get_field("key").max_length
+		if len(key) > max_key:
+			return Response(
+				{"detail": f"Idempotency-Key длиннее {max_key} символов"},
+				status=status.HTTP_400_BAD_REQUEST)
+		if key:
+			done = BulkWriteRequest.objects.filter(
+				company=company, key=key).first()
+			if done:
+				return Response(
+					done.response, headers={"Idempotent-Replayed": "true"})
+
+		# Массив JSON — list, NDJSON — генератор (см. NDJSONParser);
+		# объект или скаляр в теле — ошибка запроса, а не 500
+		items = request.data
+		if not isinstance(items, (list, GeneratorType)):
+			return Response(
+				{"detail": "Ожидается массив строк или NDJSON"},
+				status=status.HTTP_400_BAD_REQUEST)
+
+		try:
+			# Запись и ключ идемпотентности фиксируются вместе
+			with transaction.atomic():
+				report = BulkLineWriter(company).write(items)
+				if key:
+					BulkWriteRequest.objects.create(
+						company=company, key=key, response=report)
+		except serializers.ValidationError as e:
+			return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+		except IntegrityError:
+			# Параллельная запись тех же строк или тот же ключ —
+			# запрос откатился целиком, повтор безопасен
+			return Response(
+				{"detail": "Конфликт параллельной записи, повторите запрос"},
+				status=status.HTTP_409_CONFLICT)
+		return Response(report)
+
+
 class FinancialLineDetailView(APIView):
 	permission_classes = [IsAuthenticated]
 
@@ -86,7 +168,7 @@ class FinancialLineDetailView(APIView):
 		return get_object_or_404(
 			FinancialLine,
 			pk=pk,
-			company__user_roles__user=self.request.user
+			company_id__in=get_tenant(self.request).company_ids
 		)
 
 	def get(self, request, pk):
@@ -7,9 +7,10 @@ def _base_queryset(company, scenario=None, start_period=None, end_period=None):
 	qs = FinancialLine.objects.filter(company=company)
 
 	if start_period and end_period:
+		# Годы периодов — диапазон ключей YYYY00..YYYY99
 		qs = qs.filter(
-			period__year__gte=start_period.year,
-			period__year__lte=end_period.year)
+			period_key__gte=start_period.year * 100,
+			period_key__lte=end_period.year * 100 + 99)
 	elif start_period:
 		qs = qs.filter(period=start_period)
 	elif end_period:
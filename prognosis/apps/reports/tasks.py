@@ -1,4 +1,7 @@
+from datetime import timedelta
+
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
 from django.core.files.base import ContentFile
 from django.db import transaction
@@ -12,15 +15,18 @@ from reportlab.platypus import (
 	SimpleDocTemplate, Table,
 	TableStyle, Paragraph, Spacer)
 
+from accounts.models import Company
 from .models import GeneratedReport
 from .financials.generators import get_financial_data_for_report
 
 
 @shared_task(bind=True, max_retries=5, default_retry_delay=60)
-def generate_report_task(self, report_id: int) -> None:
+def generate_report_task(self, report_id: int, deferrals: int = 0) -> None:
 	"""
 	Асинхронная задача генерации отчёта.
 	Поддерживает Excel для P&L / Plan-Fact / Custom и PDF для остальных типов.
+	Сверх REPORT_TENANT_CONCURRENCY отчётов компании задача откладывается,
+	но не больше TENANT_MAX_DEFERRALS раз.
 	"""
 	try:
 		with transaction.atomic():
@@ -31,8 +37,23 @@ def generate_report_task(self, report_id: int) -> None:
 			if report.status != "pending":
 				return
 
-			report.status = "generating"
-			report.save(update_fields=["status"])
+			deferred = _tenant_busy(report)
+			if deferred and deferrals >= settings.TENANT_MAX_DEFERRALS:
+				report.status = "failed"
+				report.error_message = "Не дождались очереди отчётов компании"
+				report.save(update_fields=[
+					"status", "error_message", "updated_at"])
+				return
+			if not deferred:
+				report.status = "generating"
+				# updated_at — начало генерации, по нему видны брошенные
+				report.save(update_fields=["status", "updated_at"])
+
+		if deferred:
+			generate_report_task.apply_async(
+				(report_id,), {"deferrals": deferrals + 1},
+				countdown=settings.TENANT_DEFER_SECONDS)
+			return
 
 		# Получаем данные для отчёта
 		data = get_financial_data_for_report(
@@ -133,3 +154,23 @@ def generate_report_task(self, report_id: int) -> None:
 			pass
 
 		raise self.retry(exc=exc, countdown=60 * (2 ** self.request.retries))
+
+
+def _tenant_busy(report):
+	"""
+	У компании уже генерируется REPORT_TENANT_CONCURRENCY отчётов.
+	Отчёт дольше REPORT_STALE_SECONDS в generating (воркер убит)
+	лимит не занимает.
+	"""
+	limit = settings.REPORT_TENANT_CONCURRENCY
+	if not limit:
+		return False
+	# Блокировка компании: параллельные воркеры считают по очереди
+	Company.objects.select_for_update().filter(id=report.company_id).first()
+	running = GeneratedReport.objects.filter(
+		company_id=report.company_id,
+		status="generating",
+		updated_at__gte=timezone.now() - timedelta(
+			seconds=settings.REPORT_STALE_SECONDS),
+	).count()
+	return running >= limit
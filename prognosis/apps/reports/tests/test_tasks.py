@@ -0,0 +1,48 @@
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+
+from accounts.models import Company
+from reports import tasks
+from reports.models import GeneratedReport, ReportTemplate
+
+
+@pytest.mark.django_db
+def test_generate_report_task_defers_over_tenant_limit(settings, monkeypatch):
+	settings.REPORT_TENANT_CONCURRENCY = 1
+	company = Company.objects.create(name="C1")
+	template = ReportTemplate.objects.create(company=company, name="P&L", code="PNL", report_type="pnl")
+	GeneratedReport.objects.create(company=company, template=template, name="Первый", status="generating")
+	report = GeneratedReport.objects.create(company=company, template=template, name="Второй")
+	deferred = []
+	monkeypatch.setattr(
+		tasks.generate_report_task, "apply_async",
+		lambda args, kwargs, countdown: deferred.append((args, kwargs, countdown)))
+
+	tasks.generate_report_task(report.id)
+
+	report.refresh_from_db()
+	assert report.status == "pending"
+	assert deferred == [((report.id,), {"deferrals": 1}, settings.TENANT_DEFER_SECONDS)]
+
+	# Лимит отложенных запусков исчерпан — отчёт завершается ошибкой
+	settings.TENANT_MAX_DEFERRALS = 1
+	tasks.generate_report_task(report.id, deferrals=1)
+
+	report.refresh_from_db()
+	assert report.status == "failed"
+	assert len(deferred) == 1
+
+
+@pytest.mark.django_db
+def test_stale_report_does_not_hold_tenant_limit(settings):
+	settings.REPORT_TENANT_CONCURRENCY = 1
+	company = Company.objects.create(name="C1")
+	template = ReportTemplate.objects.create(company=company, name="P&L", code="PNL", report_type="pnl")
+	stuck = GeneratedReport.objects.create(company=company, template=template, name="Первый", status="generating")
+	report = GeneratedReport.objects.create(company=company, template=template, name="Второй")
+
+	assert tasks._tenant_busy(report)
+	GeneratedReport.objects.filter(id=stuck.id).update(
+		updated_at=timezone.now() - timedelta(seconds=settings.REPORT_STALE_SECONDS + 1))
+	assert not tasks._tenant_busy(report)
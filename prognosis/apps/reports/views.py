@@ -5,7 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
-from accounts.models import Company
+from accounts.tenancy import get_tenant
 from .models import ReportTemplate, GeneratedReport
 from .serializers import ReportTemplateSerializer, GeneratedReportSerializer
 from .tasks import generate_report_task
@@ -15,23 +15,17 @@ class ReportTemplateListCreateView(APIView):
 	permission_classes = [IsAuthenticated]
 
 	def get_queryset(self):
-		user_companies = Company.objects.filter(
-			user_roles__user=self.request.user
-		).distinct()
-
-		return ReportTemplate.objects.filter(company__in=user_companies)
+		return ReportTemplate.objects.filter(
+			company_id__in=get_tenant(self.request).company_ids)
 
 	def get_current_company(self):
 		"""
-		Возвращает текущую компанию пользователя.
-		Логика: если у пользователя только одна компания — возвращаем её.
+		Возвращает текущую компанию пользователя: выбранную заголовком
+		X-Company, если у пользователя несколько компаний.
 		"""
-		user_companies = Company.objects.filter(
-			user_roles__user=self.request.user
-		).distinct()
-
-		if user_companies.count() == 1:
-			return user_companies.first()
+		tenant = get_tenant(self.request)
+		if len(tenant.company_ids) == 1:
+			return tenant.company
 		return None
 
 	def get(self, request):
@@ -55,7 +49,7 @@ class ReportTemplateDetailView(APIView):
 		return get_object_or_404(
 			ReportTemplate,
 			slug=slug,
-			company__user_roles__user=self.request.user)
+			company_id__in=get_tenant(self.request).company_ids)
 
 	def get(self, request, slug):
 		obj = self.get_object(slug)
@@ -87,7 +81,7 @@ class GenerateReportView(APIView):
 		template = get_object_or_404(
 			ReportTemplate,
 			slug=template_slug,
-			company__user_roles__user=request.user
+			company_id__in=get_tenant(request).company_ids
 		)
 
 		# Защита от дублирующихся запусков (опционально, но полезно)
@@ -3,6 +3,10 @@ ASGI config for prognosis project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The import progress stream (data_ingestion.streams) is an async view that
+holds the connection open; serve it through this application (uvicorn,
+daphne) rather than WSGI, where each watcher would occupy a worker.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
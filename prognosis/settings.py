@@ -167,6 +167,64 @@ USE_TZ = True
 
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+# Очереди: imports_heavy, imports_light, reports и default для остального.
+# Воркеры запускаются по очередям, например:
+#   celery -A prognosis worker -Q imports_heavy -c 2
+#   celery -A prognosis worker -Q imports_light,default -c 4
+#   celery -A prognosis worker -Q reports -c 2
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_ROUTES = (
+	'data_ingestion.routing.route_import_task',
+	{
+		'data_ingestion.tasks.process_import_shard': {'queue': 'imports_heavy'},
+		'data_ingestion.tasks.finalize_import_task': {'queue': 'imports_heavy'},
+		'reports.tasks.generate_report_task': {'queue': 'reports'},
+	},
+)
+# Длинные задачи с acks_late: воркер не забирает следующую, пока занят
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Импорт финансовых данных: размер чанка (строк на один bulk-запрос)
+IMPORT_CHUNK_SIZE = env.int('IMPORT_CHUNK_SIZE', default=2000)
+# Справочники до этого размера загружаются целиком один раз за импорт
+IMPORT_DIMENSION_PRELOAD_LIMIT = env.int('IMPORT_DIMENSION_PRELOAD_LIMIT', default=50000)
+# Прогресс импорта: запись счётчиков в БД не чаще N строк / T секунд,
+# живой прогресс — в Redis
+IMPORT_PROGRESS_EVERY_ROWS = env.int('IMPORT_PROGRESS_EVERY_ROWS', default=20000)
+IMPORT_PROGRESS_EVERY_SECONDS = env.float('IMPORT_PROGRESS_EVERY_SECONDS', default=5.0)
+IMPORT_PROGRESS_REDIS_URL = env('IMPORT_PROGRESS_REDIS_URL', default=CELERY_BROKER_URL)
+IMPORT_PROGRESS_TTL = env.int('IMPORT_PROGRESS_TTL', default=3600)
+# Поток событий прогресса (SSE): keepalive раз в N секунд без обновлений
+IMPORT_PROGRESS_HEARTBEAT = env.float('IMPORT_PROGRESS_HEARTBEAT', default=15.0)
+# CSV от IMPORT_SHARD_MIN_ROWS строк обрабатываются параллельно
+# IMPORT_SHARD_COUNT шардами (chord) через промежуточную таблицу
+IMPORT_SHARD_MIN_ROWS = env.int('IMPORT_SHARD_MIN_ROWS', default=200000)
+IMPORT_SHARD_COUNT = env.int('IMPORT_SHARD_COUNT', default=4)
+# Импорт от N строк (оценка по размеру файла) идёт в очередь imports_heavy
+IMPORT_HEAVY_MIN_ROWS = env.int('IMPORT_HEAVY_MIN_ROWS', default=200000)
+# Одновременных импортов и отчётов на компанию (0 — без ограничения);
+# задача сверх лимита откладывается на N секунд, но не больше
+# TENANT_MAX_DEFERRALS раз — дальше завершается ошибкой
+IMPORT_TENANT_CONCURRENCY = env.int('IMPORT_TENANT_CONCURRENCY', default=2)
+REPORT_TENANT_CONCURRENCY = env.int('REPORT_TENANT_CONCURRENCY', default=2)
+TENANT_DEFER_SECONDS = env.int('TENANT_DEFER_SECONDS', default=30)
+TENANT_MAX_DEFERRALS = env.int('TENANT_MAX_DEFERRALS', default=120)
+# Отчёт в generating дольше N секунд считается брошенным
+# и лимит компании не занимает
+REPORT_STALE_SECONDS = env.int('REPORT_STALE_SECONDS', default=1800)
+# Импорт в processing без отметки воркера дольше N секунд считается
+# брошенным: повторная доставка продолжает его с контрольной точки
+IMPORT_LEASE_SECONDS = env.int('IMPORT_LEASE_SECONDS', default=600)
+# ZIP-архив импорта: не больше N файлов и M МБ после распаковки
+IMPORT_ARCHIVE_MAX_FILES = env.int('IMPORT_ARCHIVE_MAX_FILES', default=500)
+IMPORT_ARCHIVE_MAX_SIZE_MB = env.int('IMPORT_ARCHIVE_MAX_SIZE_MB', default=2048)
+# Пакетная запись строк через API: строк на один bulk-запрос
+# и максимум строк в одном запросе
+FINANCIALS_BULK_BATCH_SIZE = env.int('FINANCIALS_BULK_BATCH_SIZE', default=5000)
+FINANCIALS_BULK_MAX_ITEMS = env.int('FINANCIALS_BULK_MAX_ITEMS', default=200000)
+# Список строк: размер страницы по умолчанию и максимум для ?page_size=
+FINANCIALS_PAGE_SIZE = env.int('FINANCIALS_PAGE_SIZE', default=500)
+FINANCIALS_MAX_PAGE_SIZE = env.int('FINANCIALS_MAX_PAGE_SIZE', default=5000)
 
 STATIC_URL = 'static/'
 MEDIA_URL = '/media/'